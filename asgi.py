@@ -0,0 +1,12 @@
+"""ASGI entry point: LLM-bound requests wait on an event loop instead of a thread.
+
+    uvicorn asgi:app --port 5000             # one process
+    GUNICORN_WORKER_CLASS=uvicorn gunicorn   # gunicorn.conf.py serves asgi:app
+
+Every route behaves as under wsgi.py; see utils/asgi.py for what changes.
+"""
+
+from llama_mindmap_backend import create_app
+from llama_mindmap_backend.utils.asgi import AsyncLLMApp
+
+app = AsyncLLMApp(create_app())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Concurrent open LLM requests per process: WSGI (gthread) build versus asgi.py.
+
+Starts stub_llm.py, then for each build runs one gunicorn worker from
+gunicorn.conf.py (GUNICORN_WORKER_CLASS=gthread serving wsgi:app, or
+uvicorn serving asgi:app) and opens --clients requests to
+/api/web/analyze at once, each for a distinct topic so none is served from
+the topic index. While they are open, the worker's thread count and RSS are
+sampled from /proc. Reports per build and level: status codes, latency
+percentiles, peak threads and peak RSS.
+
+Both builds use their configured admission limits (LLM_MAX_INFLIGHT_PER_PROCESS
+with its derived thread count for gthread, ASGI_MAX_INFLIGHT_PER_PROCESS for
+asgi) and the same LLM_DISPATCH_CONCURRENCY, i.e. the same provider
+concurrency; rate limits and the per-user queue cap are lifted, since every
+request comes from one address. Needs Linux (/proc) and uvicorn.
+
+Note that a gthread worker (gunicorn 21) stops making progress when more
+connections than worker_connections arrive at once: such levels show up as
+client timeouts in the sync build.
+
+Usage:
+    python benchmarks/bench_async_views.py [--clients 50,100,400] [--latency fixed:2]
+        [--dispatch 32] [--builds sync,asgi] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_llm import StubLLMServer  # noqa: E402
+
+WORKER_CLASSES = {'sync': 'gthread', 'asgi': 'uvicorn'}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def worker_pid(master_pid: int) -> Optional[int]:
+    """The gunicorn worker forked by a master (Linux only)."""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            children = f.read().split()
+    except OSError:
+        return None
+    return int(children[0]) if children else None
+
+
+def process_usage(pid: int) -> Dict[str, float]:
+    """Threads and resident memory (MB) of a process."""
+    usage = {'threads': 0, 'rss_mb': 0.0}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    usage['threads'] = int(line.split()[1])
+                elif line.startswith('VmRSS:'):
+                    usage['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+
+class Server:
+    """One gunicorn worker serving the app with a given worker class."""
+
+    def __init__(self, build: str, env: Dict[str, str]):
+        self.port = free_port()
+        env = dict(env, GUNICORN_WORKER_CLASS=WORKER_CLASSES[build], GUNICORN_WORKERS='1',
+                   GUNICORN_BIND=f'127.0.0.1:{self.port}')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--log-level', 'warning',
+             '--access-logfile', '/dev/null'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.pid: Optional[int] = None
+
+    def wait_ready(self, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{self.port}/', timeout=2).read()
+                self.pid = worker_pid(self.process.pid)
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("gunicorn did not become ready")
+
+    def stop(self) -> None:
+        self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+async def post_json(port: int, path: str, body: dict, timeout: float) -> tuple:
+    """POST over a fresh connection; returns (status or error name, seconds)."""
+    data = json.dumps(body).encode('utf-8')
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode('latin-1') + data
+        )
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+        status = status_line.split()[1].decode() if status_line else 'EmptyReply'
+    except (OSError, asyncio.TimeoutError) as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def run_level(server: Server, clients: int, timeout: float) -> dict:
+    """Open `clients` requests at once and wait for all of them."""
+    peak = {'threads': 0, 'rss_mb': 0.0}
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            usage = process_usage(server.pid)
+            peak['threads'] = max(peak['threads'], usage['threads'])
+            peak['rss_mb'] = max(peak['rss_mb'], usage['rss_mb'])
+            done.wait(0.05)
+
+    idle = process_usage(server.pid)
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    stamp = time.time_ns()
+
+    async def burst():
+        return await asyncio.gather(*[
+            post_json(server.port, '/api/web/analyze', {'topic': f"Benchmark topic {stamp} {index}"}, timeout)
+            for index in range(clients)
+        ])
+
+    started = time.perf_counter()
+    results = asyncio.run(burst())
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+
+    latencies = sorted(seconds for status, seconds in results if status == '200')
+    return {
+        'clients': clients,
+        'statuses': dict(Counter(status for status, _ in results)),
+        'ok': len(latencies),
+        'elapsed_seconds': round(elapsed, 2),
+        'p50_seconds': round(statistics.median(latencies), 3) if latencies else None,
+        'p95_seconds': round(latencies[int(len(latencies) * 0.95) - 1], 3) if latencies else None,
+        'idle_threads': idle['threads'],
+        'peak_threads': peak['threads'],
+        'idle_rss_mb': idle['rss_mb'],
+        'peak_rss_mb': peak['rss_mb'],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='50,100,400', help='Comma-separated numbers of requests opened at once')
+    parser.add_argument('--latency', default='fixed:2', help='Stub LLM latency (see stub_llm.py)')
+    parser.add_argument('--dispatch', type=int, default=32, help='LLM_DISPATCH_CONCURRENCY for both builds')
+    parser.add_argument('--builds', default='sync,asgi', help='Builds to measure: sync, asgi')
+    parser.add_argument('--timeout', type=float, default=60, help='Client timeout per request, seconds')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    levels = [int(value) for value in args.clients.split(',')]
+    builds = [build.strip() for build in args.builds.split(',')]
+    for build in builds:
+        if build not in WORKER_CLASSES:
+            parser.error(f"Unknown build: {build}")
+
+    stub = StubLLMServer(latency=args.latency).start()
+    env = dict(os.environ)
+    env.setdefault('FLASK_ENV', 'testing')
+    env.update({
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')])),
+        'HUGGINGFACE_API_URL': stub.url,
+        'HUGGINGFACE_TOKEN': 'stub-token',
+        'RATE_LIMIT_ENABLED': 'false',
+        'LLM_USER_QUEUE_DEPTH': str(max(levels) * 2),
+        'LLM_DISPATCH_CONCURRENCY': str(args.dispatch),
+        'LLM_TIMEOUT_SECONDS': str(int(args.timeout)),
+        'API_DOCS_ENABLED': 'false',
+    })
+
+    results = {'latency': args.latency, 'dispatch_concurrency': args.dispatch, 'builds': {}}
+    try:
+        for build in builds:
+            server = Server(build, env)
+            try:
+                server.wait_ready()
+                # Warm up: first-request setup and the provider connection
+                run_level(server, 4, args.timeout)
+                results['builds'][build] = [run_level(server, clients, args.timeout) for clients in levels]
+            finally:
+                server.stop()
+    finally:
+        stub.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Stub latency {args.latency}, LLM_DISPATCH_CONCURRENCY={args.dispatch}, one worker per build")
+    for build, rows in results['builds'].items():
+        print(f"\n{build} ({WORKER_CLASSES[build]}):")
+        for row in rows:
+            statuses = ' '.join(f"{status}x{count}" for status, count in sorted(row['statuses'].items()))
+            p50 = f"{row['p50_seconds']:.2f}" if row['p50_seconds'] is not None else '-'
+            p95 = f"{row['p95_seconds']:.2f}" if row['p95_seconds'] is not None else '-'
+            print(f"  {row['clients']:>5} open  ok {row['ok']:>5}  p50 {p50:>6} s  p95 {p95:>6} s  "
+                  f"threads {row['idle_threads']:>3} -> {row['peak_threads']:>4}  "
+                  f"rss {row['idle_rss_mb']:>6.1f} -> {row['peak_rss_mb']:>6.1f} MB  [{statuses}]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Benchmark the per-request cost of @jwt_required with the revocation check.
+
+Compares an unauthenticated route, an authenticated route with an empty
+revocation store and one with a large store, plus the raw is_revoked() cost.
+
+Usage:
+    python benchmarks/bench_auth_overhead.py [--requests 5000] [--revoked 100000] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+from flask import jsonify  # noqa: E402
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity  # noqa: E402
+
+from llama_mindmap_backend import create_app  # noqa: E402
+from llama_mindmap_backend.utils.token_revocation import get_revocation_store  # noqa: E402
+
+
+def time_requests(client, path: str, headers: dict, count: int) -> dict:
+    """Time sequential GET requests and summarize per-request latency."""
+    for _ in range(min(200, count)):
+        client.get(path, headers=headers)  # warmup
+
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+
+    timings.sort()
+    return {
+        'requests': count,
+        'mean_us': round(statistics.fmean(timings) * 1e6, 1),
+        'p50_us': round(timings[len(timings) // 2] * 1e6, 1),
+        'p99_us': round(timings[int(len(timings) * 0.99) - 1] * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--revoked', type=int, default=100000, help='Revoked tokens in the large-store run')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    @app.route('/bench/public')
+    def bench_public():
+        return jsonify({'ok': True})
+
+    @app.route('/bench/private')
+    @jwt_required()
+    def bench_private():
+        return jsonify({'user': get_jwt_identity()})
+
+    with app.app_context():
+        token = create_access_token(identity=str(uuid.uuid4()))
+    auth = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    store = get_revocation_store()
+
+    results = {
+        'public': time_requests(client, '/bench/public', {}, args.requests),
+        'jwt_empty_store': time_requests(client, '/bench/private', auth, args.requests),
+    }
+
+    expires_at = time.time() + 3600
+    for _ in range(args.revoked):
+        store.revoke_token(str(uuid.uuid4()), expires_at)
+    results['jwt_large_store'] = time_requests(client, '/bench/private', auth, args.requests)
+    results['jwt_large_store']['revoked_tokens'] = len(store)
+
+    payload = {'jti': str(uuid.uuid4()), 'sub': 'x', 'iat': int(time.time())}
+    loops = 200000
+    start = time.perf_counter()
+    for _ in range(loops):
+        store.is_revoked(payload)
+    results['is_revoked_ns'] = round((time.perf_counter() - start) / loops * 1e9, 1)
+    results['jwt_overhead_us'] = round(results['jwt_empty_store']['mean_us'] - results['public']['mean_us'], 1)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name in ('public', 'jwt_empty_store', 'jwt_large_store'):
+        row = results[name]
+        print(f"{name:<16} mean {row['mean_us']:>8} us  p50 {row['p50_us']:>8} us  p99 {row['p99_us']:>8} us")
+    print(f"jwt_required overhead: {results['jwt_overhead_us']} us/request")
+    print(f"is_revoked(): {results['is_revoked_ns']} ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for pure-Python code on per-request hot paths.
+
+Covers detect_device over a corpus of real-world user agents,
+build_node_tree and the JSON encoding of its result for small to huge
+conversation trees (full nodes and ?fields= outlines), node serialization
+with the precompiled serializer against marshmallow's Schema.dump,
+HuggingFaceClient.parse_list_response on typical model outputs, and
+validate_topic. Inputs are fixed and synthetic data is seeded, so
+runs are comparable. Each case is warmed up, calibrated to run for at least
+--min-time per repetition, and reported as the median (and min) time per call
+over --repeat repetitions.
+
+Baselines live in benchmarks/baselines/hot_paths.json. Compare against them
+with --compare (exit status 1 when a case is slower by more than
+--max-regression) and refresh them with --save-baseline. The comparison
+does not use the raw times: each repetition is divided by the time of a
+fixed pure-Python calibration loop run right after it, and the min of those
+ratios is compared, so background load (which only ever inflates times) and
+CPU frequency changes largely cancel out. The whole suite is run several
+times (--runs) and the median run of each case kept. On a shared one-CPU VM
+an unchanged tree still moved single cases by up to ~80% in one run and
+~35% as the median of three, hence the default threshold of a doubling:
+--compare catches gross regressions, not small ones.
+
+The committed baseline is machine-specific: it was recorded on one
+developer machine and says nothing about another. Run --save-baseline on
+the unchanged tree first and compare on the same machine.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--only tree] [--repeat 7] [--runs 3] [--compare] [--save-baseline] [--json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from flask import Flask  # noqa: E402
+
+from llama_mindmap_backend import detect_device  # noqa: E402
+from llama_mindmap_backend.routes.mindmap import build_node_tree  # noqa: E402
+from llama_mindmap_backend.routes.web_api import validate_topic  # noqa: E402
+from llama_mindmap_backend.schemas import NodeSchema  # noqa: E402
+from llama_mindmap_backend.utils.json_provider import FastJSONProvider  # noqa: E402
+from llama_mindmap_backend.utils.llama_api import HuggingFaceClient  # noqa: E402
+from llama_mindmap_backend.utils.serializers import node_serializer  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'hot_paths.json'
+
+USER_AGENTS = [
+    # Desktop browsers
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/120.0.0.0 Safari/537.36 Edg/120.0.2210.91',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0',
+    # Phones
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.2 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/120.0.6099.144 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1',
+    'Opera/9.80 (J2ME/MIDP; Opera Mini/9.80 (S60; SymbOS; Opera Mobi/23.348; U; en) Presto/2.5.25 Version/10.54',
+    # Tablets
+    'Mozilla/5.0 (iPad; CPU OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+    'Version/17.2 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 13; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 11; KFTRWI) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Silk/120.3.1 like Chrome/120.0.6099.115 Safari/537.36',
+    # Bots, tools and empty headers
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)',
+    'curl/8.4.0',
+    'python-requests/2.31.0',
+    '',
+]
+
+LIST_RESPONSES = {
+    'numbered': '1. Define the scope\n2. Gather requirements\n3. Draft a plan\n4. Review with the team\n5. Execute',
+    'bulleted': '\n• Define the scope\n\n- Gather requirements\n* Draft a plan\n\n• Review with the team\n- Execute\n',
+    'short': 'Define the scope\nGather requirements',
+    'long': '\n'.join(f"{i}) Step number {i} with a somewhat longer description of the work" for i in range(1, 51)),
+}
+
+TOPICS = {
+    'typical': 'Plan a product launch for a new mobile app',
+    'long': 'Organize ' + 'a very detailed international conference ' * 12,
+    'rejected': 'How to harm a competitor',
+    'blank': '   ',
+}
+
+
+def make_tree(depth: int, branching: int = 5, seed: int = 7) -> List[SimpleNamespace]:
+    """Nodes of a complete tree (root at level 1), in shuffled order like an unordered query."""
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1)
+    nodes = []
+    frontier = [None]
+    for level in range(1, depth + 1):
+        next_frontier = []
+        for parent_id in frontier:
+            for _ in range(1 if parent_id is None else branching):
+                node = SimpleNamespace(
+                    id=uuid.UUID(int=rng.getrandbits(128)),
+                    parent_id=parent_id,
+                    content=f"Sub-task {len(nodes)} about something worth doing",
+                    level=level,
+                    steps=[f"Step {i}" for i in range(1, 6)] if rng.random() < 0.3 else None,
+                    analysis='Short analysis of the task. ' * 8 if rng.random() < 0.2 else None,
+                    created_at=created + timedelta(seconds=len(nodes)),
+                )
+                nodes.append(node)
+                next_frontier.append(node.id)
+        frontier = next_frontier
+    rng.shuffle(nodes)
+    return nodes
+
+
+def calibration_loop() -> int:
+    """Fixed pure-Python work (loops, arithmetic, dict and string ops) used to gauge machine speed."""
+    counts = {}
+    total = 0
+    for i in range(200):
+        key = f"k{i % 17}"
+        counts[key] = counts.get(key, 0) + 1
+        total += i * i % 7
+    return total + len(counts)
+
+
+def run_loops(func: Callable[[], object], loops: int) -> float:
+    """Seconds per call over a number of back-to-back calls."""
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return (time.perf_counter() - start) / loops
+
+
+def calibrate_loops(func: Callable[[], object], min_time: float) -> int:
+    """Smallest power of two of calls that takes at least min_time."""
+    loops = 1
+    while run_loops(func, loops) * loops < min_time:
+        loops *= 2
+    return loops
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """
+    Time a callable: warm up, calibrate loops per repetition, then repeat.
+
+    Each repetition is followed by a shorter run of calibration_loop; the
+    ratio of the two ('relative') is what --compare checks, since both
+    see the same machine state.
+    """
+    for _ in range(3):
+        func()
+    loops = calibrate_loops(func, min_time)
+    reference_loops = calibrate_loops(calibration_loop, min_time / 4)
+
+    per_call = []
+    relative = []
+    for _ in range(repeat):
+        elapsed = run_loops(func, loops)
+        per_call.append(elapsed)
+        relative.append(elapsed / run_loops(calibration_loop, reference_loops))
+
+    median = statistics.median(per_call)
+    return {
+        'median_us': round(median * 1e6, 3),
+        'min_us': round(min(per_call) * 1e6, 3),
+        'spread_pct': round((max(per_call) - min(per_call)) / median * 100, 1) if median else 0.0,
+        'loops': loops,
+        'relative': round(min(relative), 6),
+    }
+
+
+def build_cases() -> Dict[str, Callable[[], object]]:
+    """Name -> zero-argument callable for every benchmark case."""
+    cases: Dict[str, Callable[[], object]] = {}
+
+    cases['detect_device.corpus'] = lambda: [detect_device(agent) for agent in USER_AGENTS]
+    cases['detect_device.desktop_chrome'] = lambda: detect_device(USER_AGENTS[0])
+    # Classification cost on a cache miss
+    cases['detect_device.corpus_uncached'] = lambda: [detect_device.__wrapped__(agent) for agent in USER_AGENTS]
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    for name, depth in (('small', 2), ('medium', 3), ('large', 4), ('huge', 5)):
+        nodes = make_tree(depth)
+        cases[f"build_node_tree.{name}_{len(nodes)}"] = lambda nodes=nodes: build_node_tree(nodes)
+        payload = {'id': 'x', 'root_topic': 'x', 'created_at': 'x', 'nodes': build_node_tree(nodes)}
+        cases[f"tree_json.{name}_{len(nodes)}"] = lambda payload=payload: app.json.dumps(payload)
+
+    # A ?fields=id,content,level outline of the same trees
+    outline = node_serializer.parse('id,content,level')
+    for name, depth in (('large', 4), ('huge', 5)):
+        nodes = make_tree(depth)
+        cases[f"build_node_tree.outline_{name}_{len(nodes)}"] = \
+            lambda nodes=nodes: build_node_tree(nodes, fields=outline)
+
+    nodes = make_tree(4)
+    schema = NodeSchema(only=node_serializer.default, many=True)
+    cases['serialize_nodes.marshmallow_156'] = lambda: schema.dump(nodes)
+    cases['serialize_nodes.compiled_156'] = lambda: node_serializer.dump_many(nodes)
+
+    # parse_list_response only needs the instance for method lookup, not a token
+    client = HuggingFaceClient.__new__(HuggingFaceClient)
+    for name, response in LIST_RESPONSES.items():
+        cases[f"parse_list_response.{name}"] = lambda response=response: client.parse_list_response(response, 5)
+
+    for name, topic in TOPICS.items():
+        cases[f"validate_topic.{name}"] = lambda topic=topic: validate_topic(topic)
+
+    return cases
+
+
+def median_run(rows: List[dict]) -> dict:
+    """The run with the median calibration-relative time."""
+    return sorted(rows, key=lambda row: row['relative'])[len(rows) // 2]
+
+
+def relative_change(row: dict, old: dict) -> float:
+    """Change of a case's calibration-relative min time against its baseline."""
+    if not old.get('relative'):
+        return 0.0
+    return row['relative'] / old['relative'] - 1
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], max_regression: float) -> List[str]:
+    """Names of cases slower than the baseline by more than max_regression."""
+    return [
+        name for name, row in results.items()
+        if name in baseline and relative_change(row, baseline[name]) > max_regression
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help='Run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed repetitions per case')
+    parser.add_argument('--runs', type=int,
+                        help='Runs of the whole suite, keeping the median run per case '
+                             '(default 5 with --save-baseline, 3 with --compare, else 1)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per repetition')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='Baseline file')
+    parser.add_argument('--compare', action='store_true', help='Compare against the baseline')
+    parser.add_argument('--max-regression', type=float, default=1.0,
+                        help='Allowed slowdown against the baseline before failing (1.0 = twice as slow)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to the baseline file')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    cases = build_cases()
+    selected = {name: func for name, func in cases.items() if not args.only or args.only in name}
+    runs: Dict[str, List[dict]] = {name: [] for name in selected}
+    for _ in range(args.runs or (5 if args.save_baseline else 3 if args.compare else 1)):
+        for name, func in selected.items():
+            runs[name].append(measure(func, args.repeat, args.min_time))
+    results = {name: median_run(rows) for name, rows in runs.items()}
+
+    baseline = {}
+    if (args.compare or args.save_baseline) and Path(args.baseline).exists():
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.max_regression) if args.compare else []
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'results': results,
+        'regressions': regressions,
+    }
+
+    if args.save_baseline:
+        saved = dict(report, results={**baseline, **results} if args.only else results)
+        del saved['regressions']
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2)
+            f.write('\n')
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, row in results.items():
+            line = f"{name:<36} median {row['median_us']:>12.3f} us  min {row['min_us']:>12.3f} us  " \
+                   f"±{row['spread_pct']:>5}%"
+            if name in baseline:
+                line += f"  vs baseline {relative_change(row, baseline[name]):+.1%}"
+            if name in regressions:
+                line += '  REGRESSION'
+            print(line)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
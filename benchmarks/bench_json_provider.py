@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark conversation tree serialization before and after the fast JSON provider.
+
+'before' nests the tree by scanning all nodes per parent, with str(uuid) /
+.isoformat() per field, and encodes it with Flask's stdlib provider, as
+get_conversation used to. 'after' nests it in one pass with native UUID and
+datetime values (build_node_tree) and encodes it with
+FastJSONProvider, which uses orjson when installed. 'after_stdlib' is the same
+with orjson unavailable. Times cover building the dicts plus encoding the
+response body, for the same seeded trees as bench_hot_paths.py.
+
+Usage:
+    python benchmarks/bench_json_provider.py [--repeat 7] [--min-time 0.2] [--json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from bench_hot_paths import make_tree, measure  # noqa: E402
+from llama_mindmap_backend.routes.mindmap import build_node_tree  # noqa: E402
+from llama_mindmap_backend.utils import json_provider  # noqa: E402
+from llama_mindmap_backend.utils.json_provider import FastJSONProvider  # noqa: E402
+
+
+def legacy_node_tree(nodes, parent_id=None):
+    """build_node_tree as it was before: a scan of every node per parent and string conversion per field."""
+    result = []
+    for node in nodes:
+        if node.parent_id == parent_id:
+            result.append({
+                'id': str(node.id),
+                'content': node.content,
+                'level': node.level,
+                'steps': node.steps,
+                'analysis': node.analysis,
+                'created_at': node.created_at.isoformat(),
+                'children': legacy_node_tree(nodes, node.id)
+            })
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    before_app = Flask('before')
+    before_app.json = DefaultJSONProvider(before_app)
+    after_app = Flask('after')
+    after_app.json = FastJSONProvider(after_app)
+    orjson = json_provider.orjson
+
+    results = {'orjson_installed': orjson is not None, 'trees': {}}
+    for name, depth in (('small', 2), ('medium', 3), ('large', 4), ('huge', 5)):
+        nodes = make_tree(depth)
+        with before_app.app_context():
+            before = measure(lambda: before_app.json.response(nodes=legacy_node_tree(nodes)),
+                             args.repeat, args.min_time)
+        with after_app.app_context():
+            after = measure(lambda: after_app.json.response(nodes=build_node_tree(nodes)),
+                            args.repeat, args.min_time)
+            json_provider.orjson = None
+            try:
+                after_stdlib = measure(lambda: after_app.json.response(nodes=build_node_tree(nodes)),
+                                       args.repeat, args.min_time)
+            finally:
+                json_provider.orjson = orjson
+            # Encoding alone, with the tree already built
+            tree = build_node_tree(nodes)
+            encode_only = measure(lambda: after_app.json.response(nodes=tree), args.repeat, args.min_time)
+        with before_app.app_context():
+            legacy_tree = legacy_node_tree(nodes)
+            encode_only_before = measure(lambda: before_app.json.response(nodes=legacy_tree),
+                                         args.repeat, args.min_time)
+
+        results['trees'][f"{name}_{len(nodes)}"] = {
+            'before_us': before['median_us'],
+            'after_us': after['median_us'],
+            'after_stdlib_us': after_stdlib['median_us'],
+            'encode_before_us': encode_only_before['median_us'],
+            'encode_after_us': encode_only['median_us'],
+            'speedup': round(before['median_us'] / after['median_us'], 2),
+            'encode_speedup': round(encode_only_before['median_us'] / encode_only['median_us'], 2),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"orjson installed: {results['orjson_installed']}")
+    for name, row in results['trees'].items():
+        print(f"{name:<11} before {row['before_us']:>11.1f} us  after {row['after_us']:>11.1f} us "
+              f"(x{row['speedup']})  stdlib fallback {row['after_stdlib_us']:>11.1f} us  "
+              f"encode only {row['encode_before_us']:>9.1f} -> {row['encode_after_us']:>9.1f} us "
+              f"(x{row['encode_speedup']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""End-to-end HTTP load test against a stub LLM server.
+
+Starts the app (create_app) on a local threaded WSGI server with its LLM
+client pointed at stub_llm.py, then runs concurrent virtual users over real
+HTTP. Each user registers and logs in, then until the duration is up picks
+actions from a weighted mix: create a conversation, expand a node, get steps
+or analysis for a node, fetch a conversation tree, or read their stats.
+Reports requests/sec and p50/p95/p99 latency per endpoint; --output saves the
+JSON and --compare prints the change against a previous run.
+
+The app uses its configured database (the testing config defaults to
+in-memory SQLite, which does not survive multiple threads), so pass
+--database-uri, e.g. a throwaway PostgreSQL database. Tables are created if
+missing.
+
+Usage:
+    python benchmarks/bench_load.py --database-uri postgresql://localhost/mindmap_load \\
+        [--users 20] [--duration 60] [--latency lognormal:0.8:0.4] [--error-rate 0.01] \\
+        [--mix create=10,expand=25,steps=15,analyze=15,tree=25,stats=10] [--output run.json] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stub_llm import add_stub_arguments, stub_from_args  # noqa: E402
+
+# Actions a virtual user can take; each is a VirtualUser method
+ACTIONS = ('create', 'expand', 'steps', 'analyze', 'tree', 'stats')
+DEFAULT_MIX = 'create=10,expand=25,steps=15,analyze=15,tree=25,stats=10'
+
+TOPICS = [
+    'Plan a product launch', 'Learn Python basics', 'Write a research paper', 'Organize a conference',
+    'Renovate a kitchen', 'Prepare for a marathon', 'Migrate a database', 'Start a podcast',
+]
+
+
+class Recorder:
+    """Collects per-endpoint latencies and status codes from all users."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def request(self, session: requests.Session, name: str, method: str, url: str,
+                **kwargs) -> Optional[requests.Response]:
+        """Send one request and record it under an endpoint name."""
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=120, **kwargs)
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.timings[name].append(elapsed)
+            self.statuses[name][status] += 1
+        return response
+
+    def summary(self, seconds: float) -> dict:
+        """Summarize throughput and latency per endpoint and overall."""
+        def describe(timings: List[float], statuses: Counter) -> dict:
+            timings = sorted(timings)
+            count = len(timings)
+            errors = sum(n for status, n in statuses.items() if not status.startswith(('2', '3')))
+            return {
+                'requests': count,
+                'errors': errors,
+                'error_rate': round(errors / count, 4) if count else 0.0,
+                'rps': round(count / seconds, 2) if seconds else 0.0,
+                'mean_ms': round(statistics.fmean(timings) * 1e3, 1) if count else 0.0,
+                'p50_ms': round(percentile(timings, 0.50) * 1e3, 1),
+                'p95_ms': round(percentile(timings, 0.95) * 1e3, 1),
+                'p99_ms': round(percentile(timings, 0.99) * 1e3, 1),
+                'max_ms': round(timings[-1] * 1e3, 1) if count else 0.0,
+                'statuses': dict(statuses),
+            }
+
+        with self._lock:
+            endpoints = {name: describe(self.timings[name], self.statuses[name]) for name in sorted(self.timings)}
+            every = [t for timings in self.timings.values() for t in timings]
+            statuses = sum(self.statuses.values(), Counter())
+        return {'overall': describe(every, statuses), 'endpoints': endpoints}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse 'action=weight,...' into weights for the known actions."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Unknown action '{name}' (expected {', '.join(ACTIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """One simulated user with their own session, token and known nodes."""
+
+    def __init__(self, base_url: str, recorder: Recorder, rng: random.Random):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.session = requests.Session()
+        self.conversations: List[str] = []
+        self.unexpanded: List[str] = []
+        self.nodes: List[dict] = []
+
+    def call(self, name: str, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        return self.recorder.request(self.session, name, method, self.base_url + path, **kwargs)
+
+    def sign_in(self) -> bool:
+        """Register a fresh account and log in."""
+        suffix = uuid.uuid4().hex[:12]
+        email = f"load-{suffix}@example.com"
+        password = f"Load-{suffix}"
+        self.call('auth.register', 'POST', '/api/auth/register',
+                  json={'username': f"load_{suffix}", 'email': email, 'password': password})
+        response = self.call('auth.login', 'POST', '/api/auth/login', json={'email': email, 'password': password})
+        if response is None or response.status_code != 200:
+            return False
+        self.session.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+        return True
+
+    def create(self) -> None:
+        topic = f"{self.rng.choice(TOPICS)} {self.rng.randint(1, 50)}"
+        response = self.call('conversation.create', 'POST', '/api/mindmap/conversations', json={'root_topic': topic})
+        if response is None or response.status_code != 201:
+            return
+        conversation_id = response.json()['id']
+        self.conversations.append(conversation_id)
+        tree = self.call('conversation.tree', 'GET', f"/api/mindmap/conversations/{conversation_id}")
+        if tree is not None and tree.status_code == 200:
+            for root in tree.json().get('nodes', []):
+                self.unexpanded.append(root['id'])
+                self.nodes.append(root)
+
+    def expand(self) -> None:
+        if not self.unexpanded:
+            return self.create()
+        node_id = self.unexpanded.pop(self.rng.randrange(len(self.unexpanded)))
+        response = self.call('node.expand', 'POST', f"/api/mindmap/nodes/{node_id}/expand")
+        if response is not None and response.status_code == 200:
+            children = response.json().get('children', [])
+            self.unexpanded.extend(child['id'] for child in children)
+            self.nodes.extend(children)
+
+    def steps(self) -> None:
+        if not self.nodes:
+            return self.create()
+        node = self.rng.choice(self.nodes)
+        self.call('node.steps', 'POST', f"/api/mindmap/nodes/{node['id']}/steps")
+
+    def analyze(self) -> None:
+        if not self.nodes:
+            return self.create()
+        node = self.rng.choice(self.nodes)
+        self.call('node.analyze', 'POST', f"/api/mindmap/nodes/{node['id']}/analyze")
+
+    def tree(self) -> None:
+        if not self.conversations:
+            return self.create()
+        conversation_id = self.rng.choice(self.conversations)
+        self.call('conversation.tree', 'GET', f"/api/mindmap/conversations/{conversation_id}")
+
+    def stats(self) -> None:
+        self.call('stats', 'GET', '/api/mindmap/stats')
+
+    def run(self, deadline: float, mix: Dict[str, float], think_time: float) -> None:
+        """Sign in, then perform weighted actions until the deadline."""
+        if not self.sign_in():
+            return
+        actions, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            if think_time:
+                time.sleep(self.rng.expovariate(1 / think_time))
+
+
+def run_user(user: VirtualUser, delay: float, deadline: float, mix: Dict[str, float], think_time: float) -> None:
+    """Start a user after its ramp-up delay."""
+    time.sleep(delay)
+    user.run(deadline, mix, think_time)
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    """Describe per-endpoint changes in throughput and tail latency."""
+    lines = []
+    for name, row in current['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(name)
+        if not old:
+            continue
+        changes = []
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if old[key]:
+                changes.append(f"{key} {(row[key] - old[key]) / old[key]:+.1%}")
+        lines.append(f"{name:<20} " + '  '.join(changes))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of load after sign-in starts')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Mean seconds between a user\'s actions')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Action weights (default {DEFAULT_MIX})")
+    parser.add_argument('--database-uri', help='Database for the app under test')
+    parser.add_argument('--password-hash-method', help='Override PASSWORD_HASH_METHOD (default: app setting)')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep rate limiting enabled')
+    add_stub_arguments(parser)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Previous JSON report to compare against')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    stub = stub_from_args(args).start()
+
+    # Configuration is read at import time, so set it up before importing the app
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    os.environ['HUGGINGFACE_API_URL'] = stub.url
+    os.environ['HUGGINGFACE_TOKEN'] = 'stub-token'
+    os.environ['RATE_LIMIT_ENABLED'] = 'true' if args.rate_limits else 'false'
+    if args.database_uri:
+        for name in ('DATABASE_URI', 'DEV_DATABASE_URI', 'PROD_DATABASE_URI', 'TEST_DATABASE_URI'):
+            os.environ[name] = args.database_uri
+    if args.password_hash_method:
+        os.environ['PASSWORD_HASH_METHOD'] = args.password_hash_method
+
+    from werkzeug.serving import make_server
+
+    from llama_mindmap_backend import create_app
+    from llama_mindmap_backend.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='app-server', daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    recorder = Recorder()
+    seed_rng = random.Random(args.seed)
+    users = [VirtualUser(base_url, recorder, random.Random(seed_rng.random())) for _ in range(args.users)]
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.users, thread_name_prefix='vu') as pool:
+        futures = [
+            pool.submit(run_user, user, args.ramp_up * index / max(1, args.users), deadline, args.mix, args.think_time)
+            for index, user in enumerate(users)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.monotonic() - start
+
+    server.shutdown()
+    stub.stop()
+
+    results = {
+        'config': {
+            'users': args.users, 'duration': args.duration, 'think_time': args.think_time, 'mix': args.mix,
+            'latency': args.latency, 'per_token_ms': args.per_token_ms, 'error_rate': args.error_rate,
+            'seed': args.seed,
+        },
+        'elapsed_seconds': round(elapsed, 2),
+        **recorder.summary(elapsed),
+        'stub_llm': stub.get_stats(),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.users} users for {results['elapsed_seconds']} s, "
+              f"{results['stub_llm']['calls']} LLM calls ({results['stub_llm']['errors']} injected errors)")
+        for name, row in [('overall', results['overall']), *results['endpoints'].items()]:
+            print(f"{name:<20} {row['requests']:>6} req  {row['rps']:>7} rps  err {row['error_rate']:>6.1%}  "
+                  f"p50 {row['p50_ms']:>8} ms  p95 {row['p95_ms']:>8} ms  p99 {row['p99_ms']:>8} ms")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nChange against {args.compare}:", file=sys.stderr if args.json else sys.stdout)
+        for line in compare(results, baseline):
+            print(line, file=sys.stderr if args.json else sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
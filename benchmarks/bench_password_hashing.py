@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Microbenchmark of password verification cost, reported as logins/sec per core.
+
+Usage:
+    python benchmarks/bench_password_hashing.py
+    python benchmarks/bench_password_hashing.py --method scrypt:32768:8:1 --workers 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llama_mindmap_backend.utils.passwords import PasswordHasher  # noqa: E402
+
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+]
+
+
+def bench_single_core(method: str, rounds: int) -> dict:
+    """Time inline verification on one core."""
+    hasher = PasswordHasher(method=method, workers=0)
+    pwhash = hasher.hash('correct horse battery staple')
+    hasher.verify(pwhash, 'correct horse battery staple')  # warmup
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.verify(pwhash, 'correct horse battery staple')
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        'method': method,
+        'hash_length': len(pwhash),
+        'verify_ms_median': round(median * 1000, 2),
+        'verify_ms_max': round(max(timings) * 1000, 2),
+        'logins_per_sec_per_core': round(1 / median, 1),
+    }
+
+
+def bench_pool(method: str, workers: int, logins: int) -> dict:
+    """Measure throughput of concurrent logins through the process pool."""
+    hasher = PasswordHasher(method=method, workers=workers, queue_size=logins)
+    pwhash = PasswordHasher(method=method, workers=0).hash('secret')
+    hasher.verify(pwhash, 'secret')  # start pool processes
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers * 2) as executor:
+        list(executor.map(lambda _: hasher.verify(pwhash, 'secret'), range(logins)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+
+    return {
+        'method': method,
+        'workers': workers,
+        'logins': logins,
+        'logins_per_sec': round(logins / elapsed, 1),
+        'logins_per_sec_per_core': round(logins / elapsed / workers, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', action='append', help='Hash method to test (repeatable)')
+    parser.add_argument('--rounds', type=int, default=20, help='Verifications per method on one core')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Also measure pool throughput with this many processes (default: off)')
+    parser.add_argument('--logins', type=int, default=100, help='Logins for the pool measurement')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    methods = args.method or DEFAULT_METHODS
+    results = {'cpu_count': os.cpu_count(), 'single_core': [], 'pool': []}
+    for method in methods:
+        results['single_core'].append(bench_single_core(method, args.rounds))
+        if args.workers:
+            results['pool'].append(bench_pool(method, args.workers, args.logins))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'method':<24} {'verify ms':>10} {'logins/s/core':>14} {'hash len':>9}")
+    for row in results['single_core']:
+        print(f"{row['method']:<24} {row['verify_ms_median']:>10} "
+              f"{row['logins_per_sec_per_core']:>14} {row['hash_length']:>9}")
+    for row in results['pool']:
+        print(f"pool {row['method']} x{row['workers']}: {row['logins_per_sec']} logins/s "
+              f"({row['logins_per_sec_per_core']} per core)")
+
+
+if __name__ == '__main__':
+    main()
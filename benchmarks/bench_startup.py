@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Measure cold start: import time per package and module, and create_app phases.
+
+Each run starts a fresh interpreter with ``-X importtime``, imports
+llama_mindmap_backend and calls create_app(). The report combines the phase
+timings create_app() records (app.extensions['startup']) with the interpreter's
+import log: self time summed per top-level package, and the slowest
+individual modules by cumulative time. Figures are medians over --runs.
+
+Children run from the repository root with FLASK_ENV=testing unless the
+environment says otherwise; pass settings such as API_DOCS_ENABLED=false
+through the environment to compare configurations.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15] [--json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from llama_mindmap_backend import create_app
+app = create_app()
+report = dict(app.extensions['startup'])
+report['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+sys.stdout.write('STARTUP ' + json.dumps(report))
+"""
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Entries of an -X importtime log: module, self and cumulative microseconds, nesting depth."""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+def run_once(python: str, env: Dict[str, str]) -> dict:
+    """Start one interpreter, create the app and collect its timings."""
+    completed = subprocess.run(
+        [python, '-X', 'importtime', '-c', CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    marker = completed.stdout.rfind('STARTUP ')
+    if completed.returncode != 0 or marker < 0:
+        tail = '\n'.join(completed.stderr.splitlines()[-20:])
+        raise RuntimeError(f"Child process failed ({completed.returncode}):\n{tail}")
+
+    report = json.loads(completed.stdout[marker + len('STARTUP '):])
+    report['imports'] = parse_importtime(completed.stderr)
+    return report
+
+
+def summarize(runs: List[dict], top: int) -> dict:
+    """Median timings across runs."""
+    def median_ms(values):
+        return round(statistics.median(values), 2)
+
+    phases = defaultdict(list)
+    packages = defaultdict(list)
+    modules = defaultdict(list)
+    for run in runs:
+        for name, ms in run['phases_ms'].items():
+            phases[name].append(ms)
+        per_package = defaultdict(int)
+        for entry in run['imports']:
+            per_package[entry['module'].split('.')[0]] += entry['self_us']
+            modules[entry['module']].append(entry['cumulative_us'] / 1000)
+        for name, us in per_package.items():
+            packages[name].append(us / 1000)
+
+    package_ms = {name: median_ms(values) for name, values in packages.items()}
+    module_ms = {name: median_ms(values) for name, values in modules.items()}
+    return {
+        'runs': len(runs),
+        'total_ms': median_ms([run['total_ms'] for run in runs]),
+        'import_ms': median_ms([run['import_ms'] for run in runs if run['import_ms'] is not None] or [0]),
+        'create_app_ms': median_ms([run['create_app_ms'] for run in runs]),
+        'phases_ms': {name: median_ms(values) for name, values in phases.items()},
+        'packages_ms': dict(sorted(package_ms.items(), key=lambda item: -item[1])[:top]),
+        'modules_ms': dict(sorted(module_ms.items(), key=lambda item: -item[1])[:top]),
+        'app_modules_ms': dict(sorted(
+            ((name, ms) for name, ms in module_ms.items() if name.startswith('llama_mindmap_backend.')),
+            key=lambda item: -item[1]
+        )[:top]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts to measure')
+    parser.add_argument('--top', type=int, default=15, help='Packages and modules to list')
+    parser.add_argument('--python', default=sys.executable, help='Interpreter to start')
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FLASK_ENV', 'testing')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+
+    # One unmeasured start so every run finds warm bytecode caches
+    run_once(args.python, env)
+    summary = summarize([run_once(args.python, env) for _ in range(args.runs)], args.top)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"Cold start (median of {summary['runs']}): {summary['total_ms']:.1f} ms "
+          f"= package import {summary['import_ms']:.1f} ms + create_app {summary['create_app_ms']:.1f} ms")
+    print("\ncreate_app phases:")
+    for name, ms in summary['phases_ms'].items():
+        print(f"  {name:<20} {ms:>9.1f} ms")
+    print("\nImport self time by package:")
+    for name, ms in summary['packages_ms'].items():
+        print(f"  {name:<40} {ms:>9.1f} ms")
+    print("\nSlowest modules (cumulative):")
+    for name, ms in summary['modules_ms'].items():
+        print(f"  {name:<40} {ms:>9.1f} ms")
+    print("\nApplication modules (cumulative):")
+    for name, ms in summary['app_modules_ms'].items():
+        print(f"  {name:<40} {ms:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
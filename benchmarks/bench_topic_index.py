@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark near-duplicate topic lookups in the MinHash/LSH topic index.
+
+Indexes synthetic topics of 2-6 words from a fixed vocabulary, then times
+lookups of exact repeats, reworded near-duplicates (case, stop-words, word
+order, plurals, one extra word) and unrelated topics. Also reports build
+time, memory growth and snapshot save/load time.
+
+Usage:
+    python benchmarks/bench_topic_index.py [--topics 1000000] [--lookups 20000] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llama_mindmap_backend.utils.topic_index import TopicIndex, normalize_topic  # noqa: E402
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    """Pronounceable fake words, so the vocabulary is large but deterministic."""
+    consonants, vowels = 'bcdfghklmnprstvz', 'aeiou'
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 4)
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words)
+
+
+def reword(rng: random.Random, words: list, vocabulary: list) -> str:
+    """Produce a near-duplicate phrasing of a topic."""
+    words = list(words)
+    rng.shuffle(words)
+    words = [word.capitalize() if rng.random() < 0.5 else word for word in words]
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(['the', 'of', 'for', 'and']))
+    if rng.random() < 0.3:
+        words.append(rng.choice(vocabulary))
+    return ' '.join(words) + rng.choice(['', '?', '!', '.'])
+
+
+def time_lookups(index: TopicIndex, topics: list) -> dict:
+    """Time normalize + query for each topic."""
+    timings = []
+    matched = 0
+    for topic in topics:
+        start = time.perf_counter()
+        match = index.query(normalize_topic(topic))
+        timings.append(time.perf_counter() - start)
+        matched += match is not None
+
+    timings.sort()
+    return {
+        'lookups': len(topics),
+        'match_rate': round(matched / len(topics), 4),
+        'mean_us': round(statistics.fmean(timings) * 1e6, 1),
+        'p50_us': round(timings[len(timings) // 2] * 1e6, 1),
+        'p99_us': round(timings[int(len(timings) * 0.99) - 1] * 1e6, 1),
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--topics', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--bands', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=2)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    index = TopicIndex(bands=args.bands, rows=args.rows, threshold=args.threshold,
+                       max_topics=args.topics)
+
+    rss_before = max_rss_mb()
+    topics = []
+    start = time.perf_counter()
+    for _ in range(args.topics):
+        words = rng.sample(vocabulary, rng.randint(2, 6))
+        topics.append(words)
+        index.add(normalize_topic(' '.join(words)))
+    build_seconds = time.perf_counter() - start
+
+    samples = rng.sample(topics, min(args.lookups, len(topics)))
+    time_lookups(index, [' '.join(words) for words in samples[:1000]])  # warmup
+
+    results = {
+        'topics': len(index),
+        'buckets': index.get_stats()['buckets'],
+        'build_seconds': round(build_seconds, 2),
+        'memory_growth_mb': round(max_rss_mb() - rss_before, 1),
+        'exact': time_lookups(index, [' '.join(words) for words in samples]),
+        'near_duplicate': time_lookups(index, [reword(rng, words, vocabulary) for words in samples]),
+        'unrelated': time_lookups(
+            index, [' '.join(rng.sample(vocabulary, rng.randint(2, 6))) for _ in samples]
+        ),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'topic_index.gz')
+        start = time.perf_counter()
+        index.save(path)
+        results['save_seconds'] = round(time.perf_counter() - start, 2)
+        results['snapshot_mb'] = round(os.path.getsize(path) / 1e6, 1)
+        start = time.perf_counter()
+        TopicIndex(bands=args.bands, rows=args.rows, max_topics=args.topics).load(path)
+        results['load_seconds'] = round(time.perf_counter() - start, 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"indexed {results['topics']} topics in {results['build_seconds']} s "
+          f"({results['buckets']} buckets, +{results['memory_growth_mb']} MB RSS)")
+    for name in ('exact', 'near_duplicate', 'unrelated'):
+        row = results[name]
+        print(f"{name:<15} match {row['match_rate']:>6.1%}  mean {row['mean_us']:>7} us  "
+              f"p50 {row['p50_us']:>7} us  p99 {row['p99_us']:>7} us")
+    print(f"snapshot {results['snapshot_mb']} MB: save {results['save_seconds']} s, "
+          f"load {results['load_seconds']} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Deterministic stand-in for the chat completions API used in load tests.
+
+Answers POST /v1/chat/completions in the shape the Hugging Face router
+returns, with content the app can parse: one item per line, a JSON array or a
+packed JSON object depending on what the prompt asks for, and a short
+paragraph for analysis prompts. Latency follows a configurable distribution
+(plus an optional per-token generation time) and a fraction of calls can be
+failed on purpose. All randomness comes from one seeded generator, so a run
+with the same seed and request order produces the same responses.
+
+Used by bench_load.py, or standalone:
+    python benchmarks/stub_llm.py [--port 8089] [--latency lognormal:0.8:0.4] [--error-rate 0.01]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+WORDS = (
+    'plan research outline draft review test measure compare document prepare schedule budget '
+    'collect analyze summarize design build deploy monitor refine present gather organize verify '
+    'requirements sources notes results goals milestones resources risks feedback metrics tools'
+).split()
+
+_JSON_ARRAY_RE = re.compile(r'JSON array of (?:exactly )?(\d+)')
+_LINES_RE = re.compile(r'Return exactly (\d+) .*one per line')
+_PACKED_KEY_RE = re.compile(r'^(t\d+): ', re.MULTILINE)
+_PACKED_COUNT_RE = re.compile(r'array of exactly (\d+) strings')
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution into a sampler returning seconds.
+
+    Specs: 'fixed:S', 'uniform:LO:HI', 'normal:MEAN:STD', 'lognormal:MEDIAN:SIGMA'
+    and 'exponential:MEAN' (all in seconds).
+    """
+    name, _, rest = spec.partition(':')
+    params = [float(value) for value in rest.split(':')] if rest else []
+    samplers = {
+        'fixed': (1, lambda rng, s: s),
+        'uniform': (2, lambda rng, lo, hi: rng.uniform(lo, hi)),
+        'normal': (2, lambda rng, mean, std: rng.gauss(mean, std)),
+        'lognormal': (2, lambda rng, median, sigma: median * rng.lognormvariate(0, sigma)),
+        'exponential': (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if name not in samplers or len(params) != samplers[name][0]:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    sample = samplers[name][1]
+    return lambda rng: max(0.0, sample(rng, *params))
+
+
+class StubLLMServer:
+    """Threaded HTTP server imitating the chat completions endpoint."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0',
+                 per_token_ms: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 think_rate: float = 0.0, seed: int = 42):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency: Base latency distribution, see parse_latency()
+            per_token_ms: Extra milliseconds per completion token
+            error_rate: Fraction of calls answered with error_status
+            error_status: HTTP status for injected errors
+            think_rate: Fraction of responses prefixed with a <think> block
+            seed: Seed for latency, errors and generated text
+        """
+        self.sample_latency = parse_latency(latency)
+        self.per_token_ms = per_token_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.think_rate = think_rate
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.completion_tokens = 0
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Full chat completions URL to point HUGGINGFACE_API_URL at."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> 'StubLLMServer':
+        """Serve from a daemon thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve from the calling thread."""
+        self._server.serve_forever()
+
+    def get_stats(self) -> dict:
+        """Get call, injected error and token counters."""
+        return {'calls': self.calls, 'errors': self.errors, 'completion_tokens': self.completion_tokens}
+
+    def respond(self, prompt: str) -> tuple:
+        """
+        Decide the outcome of one call.
+
+        Returns:
+            (status, body dict, seconds to wait before answering)
+        """
+        with self._lock:
+            self.calls += 1
+            delay = self.sample_latency(self._rng)
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                return self.error_status, {'error': 'Injected stub error'}, delay
+            content = self._content(prompt)
+            if self._rng.random() < self.think_rate:
+                content = f"<think>{self._sentence(40)}</think>\n{content}"
+
+        completion_tokens = max(1, len(content) // 4)
+        with self._lock:
+            self.completion_tokens += completion_tokens
+        body = {
+            'id': f"stub-{self.calls}",
+            'object': 'chat.completion',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': max(1, len(prompt) // 4), 'completion_tokens': completion_tokens},
+        }
+        return 200, body, delay + completion_tokens * self.per_token_ms / 1000
+
+    def _sentence(self, words: int) -> str:
+        return ' '.join(self._rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    def _items(self, count: int) -> list:
+        return [f"{self._sentence(self._rng.randint(3, 7))} ({index})" for index in range(1, count + 1)]
+
+    def _content(self, prompt: str) -> str:
+        packed_keys = _PACKED_KEY_RE.findall(prompt)
+        if packed_keys and 'JSON object' in prompt:
+            count = int((_PACKED_COUNT_RE.search(prompt) or [0, 5])[1])
+            return json.dumps({key: self._items(count) for key in packed_keys})
+        match = _JSON_ARRAY_RE.search(prompt)
+        if match:
+            return json.dumps(self._items(int(match.group(1))))
+        match = _LINES_RE.search(prompt)
+        if match:
+            return '\n'.join(self._items(int(match.group(1))))
+        return self._sentence(self._rng.randint(50, 90)) + '.'
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                    prompt = payload['messages'][-1]['content']
+                except (ValueError, KeyError, IndexError, TypeError):
+                    self._send(400, {'error': 'Invalid chat completion request'})
+                    return
+                status, body, delay = stub.respond(prompt)
+                time.sleep(delay)
+                self._send(status, body)
+
+            def _send(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the stub's latency/error options to a parser."""
+    parser.add_argument('--latency', default='lognormal:0.8:0.4',
+                        help='Base LLM latency: fixed:S, uniform:LO:HI, normal:MEAN:STD, '
+                             'lognormal:MEDIAN:SIGMA or exponential:MEAN (seconds)')
+    parser.add_argument('--per-token-ms', type=float, default=0.0, help='Extra LLM latency per completion token')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of LLM calls that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--think-rate', type=float, default=0.0, help='Fraction of responses with a <think> block')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def stub_from_args(args: argparse.Namespace, host: str = '127.0.0.1', port: int = 0) -> StubLLMServer:
+    """Create a stub server from parsed add_stub_arguments() options."""
+    return StubLLMServer(
+        host=host, port=port, latency=args.latency, per_token_ms=args.per_token_ms,
+        error_rate=args.error_rate, error_status=args.error_status, think_rate=args.think_rate, seed=args.seed
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = stub_from_args(args, host=args.host, port=args.port)
+    print(f"Stub LLM listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.get_stats()))
+
+
+if __name__ == '__main__':
+    main()
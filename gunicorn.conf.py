@@ -0,0 +1,127 @@
+"""gunicorn settings for production; values come from the GUNICORN_* settings in config.py / .env.
+
+    gunicorn                      # picks up this file and serves wsgi:app
+
+The app is preloaded in the master and workers are forked from it, so they
+share imported code, templates, fingerprinted assets and the topic index
+copy-on-write. Per-process state (database pools, background threads, the
+LLM client) is reset in post_fork; see utils/workers.py.
+
+Requests spend most of their time blocked on LLM calls, which ties up a
+thread, not a core: gthread workers get one process per core and enough
+threads for every LLM call admission control lets in or queues, plus
+headroom for cheap requests. gevent is used when configured and installed.
+With GUNICORN_WORKER_CLASS=uvicorn, workers serve asgi:app instead, where
+waiting on the LLM holds no thread at all (see utils/asgi.py).
+"""
+
+import logging
+import multiprocessing
+import os
+
+# gevent has to patch the standard library before the app (and the locks it
+# creates at import) exists, so it is chosen from the process environment,
+# ahead of loading .env
+if os.getenv('GUNICORN_WORKER_CLASS') == 'gevent':
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        pass
+
+from llama_mindmap_backend.config import get_config  # noqa: E402
+
+# Not named "config": gunicorn would read that as its own setting
+app_config = get_config()
+
+
+def select_worker_class(requested: str) -> str:
+    """uvicorn or gevent if requested and usable, else gthread."""
+    log = logging.getLogger('gunicorn.error')
+    if requested == 'uvicorn':
+        try:
+            import uvicorn.workers  # noqa: F401
+        except ImportError:
+            log.warning("uvicorn is not installed; using gthread workers")
+            return 'gthread'
+        return 'uvicorn.workers.UvicornWorker'
+    if requested != 'gevent':
+        return 'gthread'
+    try:
+        from gevent import monkey
+    except ImportError:
+        log.warning("gevent is not installed; using gthread workers")
+        return 'gthread'
+    if not monkey.is_module_patched('threading'):
+        log.warning("GUNICORN_WORKER_CLASS=gevent must be set in the environment, not only in .env; "
+                    "using gthread workers")
+        return 'gthread'
+    return 'gevent'
+
+
+worker_class = select_worker_class(app_config.GUNICORN_WORKER_CLASS)
+wsgi_app = 'asgi:app' if worker_class.startswith('uvicorn') else 'wsgi:app'
+bind = app_config.GUNICORN_BIND
+preload_app = app_config.GUNICORN_PRELOAD
+
+workers = app_config.GUNICORN_WORKERS or max(2, multiprocessing.cpu_count())
+# LLM calls admitted plus queued per process, and room for requests that never wait on the LLM
+threads = app_config.GUNICORN_THREADS or (
+    app_config.LLM_MAX_INFLIGHT_PER_PROCESS + app_config.LLM_ADMISSION_MAX_WAITING + 8
+)
+# Open connections per worker: busy threads plus idle keep-alive ones (gthread), or greenlets (gevent)
+worker_connections = threads * 4
+
+# Prefetched results are held by the worker that issued them, and the follow-up
+# click usually lands on another one: with several workers prefetch mostly
+# wastes tokens. Workers (forked or preloaded) inherit this setting.
+prefetch_disabled = app_config.PREFETCH_ENABLED and workers > 1
+if prefetch_disabled:
+    app_config.PREFETCH_ENABLED = False
+
+# An LLM call may take LLM_TIMEOUT_SECONDS; restarts and reloads let it finish
+timeout = app_config.LLM_TIMEOUT_SECONDS + 30
+graceful_timeout = app_config.LLM_TIMEOUT_SECONDS + 10
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth; jitter avoids restarting them all at once
+max_requests = app_config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Master is up (and the app preloaded): hand background jobs over to the workers."""
+    from llama_mindmap_backend.utils.workers import prepare_fork
+
+    if app_config.TOKEN_REVOCATION_BACKEND == 'memory' and workers > 1:
+        server.log.warning(
+            "TOKEN_REVOCATION_BACKEND=memory with %d workers: logout and password changes only revoke "
+            "tokens in the worker that handled them; use database or redis", workers
+        )
+    if prefetch_disabled:
+        server.log.warning(
+            "PREFETCH_ENABLED ignored with %d workers: prefetched results stay in the worker that "
+            "issued them and the follow-up request rarely reaches it", workers
+        )
+    if app_config.LOG_TO_FILE and app_config.LOG_ROTATION in ('size', 'time') and workers > 1:
+        server.log.warning(
+            "LOG_ROTATION=%s with %d workers: each worker rotates %s on its own, losing or overwriting "
+            "records; use LOG_ROTATION=watched with logrotate", app_config.LOG_ROTATION, workers,
+            app_config.LOG_FILE
+        )
+    prepare_fork()
+
+
+def post_fork(server, worker):
+    """Reset state the worker inherited from the master."""
+    if not preload_app:
+        # Each worker creates the app itself; nothing was inherited
+        return
+    from llama_mindmap_backend.utils.workers import reset_after_fork
+
+    application = worker.app.wsgi()
+    # asgi:app wraps the Flask app
+    reset_after_fork(getattr(application, 'flask_app', application))
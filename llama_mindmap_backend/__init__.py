@@ -1,12 +1,37 @@
 """Flask application factory with device detection and responsive templates."""
 
+import time
+
+# Package import time, reported with the create_app phases
+_import_started = time.perf_counter()
+
 import os
-import logging
 import re
+from functools import lru_cache
 from flask import Flask, render_template, request, jsonify
 from llama_mindmap_backend.config import get_config
-from llama_mindmap_backend.extensions import db, jwt, migrate
-from flasgger import Swagger
+from llama_mindmap_backend.extensions import db, jwt, limiter
+from llama_mindmap_backend.cli import register_commands
+from llama_mindmap_backend.utils.scheduler import init_scheduler
+from llama_mindmap_backend.utils.log_storage import init_log_storage
+from llama_mindmap_backend.utils.analytics import init_analytics
+from llama_mindmap_backend.utils.passwords import init_password_hasher
+from llama_mindmap_backend.utils.identity import init_identity_cache
+from llama_mindmap_backend.utils.token_revocation import init_token_revocation
+from llama_mindmap_backend.utils.admission import init_admission
+from llama_mindmap_backend.utils.llm_scheduler import init_llm_scheduler
+from llama_mindmap_backend.utils.prefetch import init_prefetch
+from llama_mindmap_backend.utils.topic_index import init_topic_index
+from llama_mindmap_backend.utils.token_usage import init_token_usage
+from llama_mindmap_backend.utils.page_cache import get_page_cache, init_page_cache, page_response
+from llama_mindmap_backend.utils.assets import init_assets, serve_asset
+from llama_mindmap_backend.utils.compression import init_compression
+from llama_mindmap_backend.utils.json_provider import init_json_provider
+from llama_mindmap_backend.utils.api_docs import load_prebuilt_spec
+from llama_mindmap_backend.utils.startup import StartupTimer
+from llama_mindmap_backend.utils.app_logging import init_request_ids, setup_logging
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 
 def create_app(config_name: str = None) -> Flask:
@@ -19,35 +44,82 @@ def create_app(config_name: str = None) -> Flask:
     Returns:
         Configured Flask application instance
     """
-    setup_logging()
+    timer = StartupTimer(IMPORT_SECONDS)
     
-    app = Flask(__name__, 
-                template_folder='../templates',
-                static_folder='../static')
+    with timer.phase('logging'):
+        setup_logging()
     
-    app.config.from_object(get_config()())
+    with timer.phase('config'):
+        app = Flask(__name__, 
+                    template_folder='../templates',
+                    static_folder='../static')
+        
+        app.config.from_object(get_config()())
+        init_json_provider(app)
     
     # Initialize extensions
-    db.init_app(app)
-    jwt.init_app(app)
-    migrate.init_app(app, db)
+    with timer.phase('extensions'):
+        init_request_ids(app)
+        db.init_app(app)
+        jwt.init_app(app)
+        limiter.init_app(app)
+        init_password_hasher(app)
+        init_identity_cache(app)
+        init_token_revocation(app)
+        init_admission(app)
+        init_llm_scheduler(app)
+        init_prefetch(app)
+        init_page_cache(app)
     
-    # Register blueprints
-    register_blueprints(app)
+    with timer.phase('assets'):
+        init_assets(app)
     
-    # Register main routes with device detection
-    register_main_routes(app)
+    # Register blueprints and main routes with device detection
+    with timer.phase('routes'):
+        register_blueprints(app)
+        register_main_routes(app)
     
     # Setup Swagger
-    setup_swagger(app)
+    with timer.phase('api_docs'):
+        setup_swagger(app)
     
+    # CLI commands and background jobs
+    with timer.phase('commands'):
+        register_commands(app)
+    with timer.phase('background'):
+        init_scheduler(app)
+        init_log_storage(app)
+        init_analytics(app)
+        init_topic_index(app)
+        init_token_usage(app)
+    
+    # Outermost WSGI layer
+    init_compression(app)
+    
+    timer.finish(app)
     return app
 
 
+# Checked in this order: tablet patterns are more specific than mobile ones
+TABLET_RE = re.compile(
+    r'ipad|tablet|kindle|silk|playbook|nexus (?:7|10)|galaxy tab|xoom|sch-i800'
+)
+MOBILE_RE = re.compile(
+    r'mobile|android|iphone|ipod|blackberry|windows phone|opera mini|palm|symbian|nokia|samsung'
+)
+
+# Distinct user agents remembered by detect_device
+UA_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=UA_CACHE_SIZE)
 def detect_device(user_agent: str) -> str:
     """
     Detect device type from User-Agent string.
     
+    Results are cached per user agent, since a handful of browser versions
+    account for most traffic.
+    
     Args:
         user_agent: HTTP User-Agent header
         
@@ -56,31 +128,10 @@ def detect_device(user_agent: str) -> str:
     """
     user_agent = user_agent.lower()
     
-    # Mobile device patterns
-    mobile_patterns = [
-        r'mobile', r'android', r'iphone', r'ipod',
-        r'blackberry', r'windows phone', r'opera mini',
-        r'palm', r'symbian', r'nokia', r'samsung'
-    ]
-    
-    # Tablet patterns
-    tablet_patterns = [
-        r'ipad', r'tablet', r'kindle', r'silk',
-        r'playbook', r'nexus (?:7|10)',
-        r'galaxy tab', r'xoom', r'sch-i800'
-    ]
-    
-    # Check for tablet first (more specific)
-    for pattern in tablet_patterns:
-        if re.search(pattern, user_agent):
-            return 'tablet'
-    
-    # Then check for mobile
-    for pattern in mobile_patterns:
-        if re.search(pattern, user_agent):
-            return 'mobile'
-    
-    # Default to desktop
+    if TABLET_RE.search(user_agent):
+        return 'tablet'
+    if MOBILE_RE.search(user_agent):
+        return 'mobile'
     return 'desktop'
 
 
@@ -103,22 +154,6 @@ def get_template_for_device(device_type: str) -> str:
     return template_map.get(device_type, 'index.html')
 
 
-def setup_logging() -> None:
-    """Configure application logging."""
-    log_level = os.getenv('LOG_LEVEL', 'INFO')
-    
-    os.makedirs('logs', exist_ok=True)
-    
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/app.log'),
-            logging.StreamHandler()
-        ]
-    )
-
-
 def register_blueprints(app: Flask) -> None:
     """Register application blueprints."""
     from .routes.auth import auth_bp
@@ -135,38 +170,33 @@ def register_blueprints(app: Flask) -> None:
 def register_main_routes(app: Flask) -> None:
     """Register main application routes with device detection."""
     
+    def render_landing_page(device_type: str) -> str:
+        """Render the template for a device type, falling back to index.html."""
+        template_name = get_template_for_device(device_type)
+        try:
+            return render_template(template_name, device_type=device_type)
+        except Exception as template_error:
+            if template_name == 'index.html':
+                raise
+            app.logger.warning(f"Template {template_name} not found: {template_error}")
+            app.logger.info("Falling back to index.html")
+            return render_template('index.html', device_type=device_type)
+    
     @app.route("/")
     def index():
         """Serve device-appropriate HTML page."""
+        device_type = 'unknown'
         try:
-            # Get User-Agent header
-            user_agent = request.headers.get('User-Agent', '')
-            
-            # Detect device type
-            device_type = detect_device(user_agent)
+            # Long user agents are only ever junk; keep the detection cache keys bounded
+            device_type = detect_device(request.headers.get('User-Agent', '')[:512])
             
-            # Get appropriate template
-            template_name = get_template_for_device(device_type)
-            
-            # Log device detection
-            app.logger.info(f"Device detected: {device_type} -> {template_name}")
-            
-            # Try to render the device-specific template
-            try:
-                return render_template(template_name, device_type=device_type)
-            except Exception as template_error:
-                app.logger.warning(f"Template {template_name} not found: {template_error}")
-                
-                # Fallback to default template
-                if template_name != 'index.html':
-                    app.logger.info("Falling back to index.html")
-                    return render_template('index.html', device_type=device_type)
-                else:
-                    raise template_error
+            # The page only depends on the device type, so it is rendered once per type
+            page = get_page_cache().get(device_type, lambda: render_landing_page(device_type))
+            return page_response(page, vary='User-Agent')
                     
         except Exception as e:
             app.logger.error(f"Error serving template: {e}")
-            return create_fallback_response(device_type if 'device_type' in locals() else 'unknown'), 200
+            return create_fallback_response(device_type), 200
     
     @app.route("/force/<device_type>")
     def force_device(device_type: str):
@@ -175,18 +205,17 @@ def register_main_routes(app: Flask) -> None:
             return jsonify({'error': 'Invalid device type'}), 400
         
         try:
-            template_name = get_template_for_device(device_type)
-            app.logger.info(f"Forced device: {device_type} -> {template_name}")
-            return render_template(template_name, device_type=device_type)
+            page = get_page_cache().get(device_type, lambda: render_landing_page(device_type))
+            return page_response(page)
         except Exception as e:
             app.logger.error(f"Error forcing device template: {e}")
-            return render_template('index.html', device_type=device_type)
+            return create_fallback_response(device_type), 200
     
     @app.route('/device-info')
     def device_info():
         """Get device detection information (for debugging)."""
         user_agent = request.headers.get('User-Agent', '')
-        device_type = detect_device(user_agent)
+        device_type = detect_device(user_agent[:512])
         template_name = get_template_for_device(device_type)
         
         return jsonify({
@@ -196,15 +225,17 @@ def register_main_routes(app: Flask) -> None:
             'available_templates': get_available_templates()
         })
     
-    @app.route('/static/<path:filename>')
     def serve_static(filename: str):
-        """Serve static files (CSS, JS, images)."""
+        """Serve static files (CSS, JS, images), fingerprinted names with immutable caching."""
         try:
-            return app.send_static_file(filename)
+            return serve_asset(app, filename)
         except Exception as e:
             app.logger.error(f"Static file not found: {filename} - {e}")
             return jsonify({'error': 'File not found'}), 404
     
+    # Replace Flask's handler so url_for('static', ...) keeps working
+    app.view_functions['static'] = serve_static
+    
     @app.errorhandler(404)
     def not_found(error):
         """Handle 404 errors."""
@@ -275,7 +306,13 @@ def create_fallback_response(device_type: str) -> str:
 
 
 def setup_swagger(app: Flask) -> None:
-    """Configure Swagger API documentation."""
+    """Configure Swagger API documentation, using a prebuilt spec file when it is current."""
+    if not app.config['API_DOCS_ENABLED']:
+        return
+    
+    # Imported here: flasgger and its YAML/JSON-schema dependencies are slow to load
+    from flasgger import Swagger
+    
     swagger_config = {
         "headers": [],
         "specs": [{
@@ -298,4 +335,6 @@ def setup_swagger(app: Flask) -> None:
         }
     }
 
-    Swagger(app, config=swagger_config, template=swagger_template)
\ No newline at end of file
+    swagger = Swagger(app, config=swagger_config, template=swagger_template)
+    if load_prebuilt_spec(app, swagger, app.config['API_SPEC_FILE']):
+        app.logger.info(f"Loaded prebuilt API spec from {app.config['API_SPEC_FILE']}")
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Flask CLI commands for maintenance tasks."""
+
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+
+logs_cli = AppGroup('logs', help='Log storage maintenance.')
+cache_cli = AppGroup('cache', help='Response store maintenance.')
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+apispec_cli = AppGroup('apispec', help='API documentation.')
+
+
+@logs_cli.command('maintain')
+def logs_maintain() -> None:
+    """Run partition upkeep, yesterday's rollup and retention."""
+    from llama_mindmap_backend.utils.log_storage import run_log_maintenance
+    from llama_mindmap_backend.utils.scheduler import exclusive_job
+
+    # Same lock as the scheduled job, so a cron run and a worker never overlap
+    with exclusive_job('log_maintenance') as acquired:
+        if not acquired:
+            raise click.ClickException("Log maintenance is already running")
+        run_log_maintenance()
+    click.echo("Log maintenance complete")
+
+
+@logs_cli.command('rollup')
+@click.option('--day', 'day', default=None, help='UTC day to aggregate (YYYY-MM-DD), defaults to yesterday.')
+@click.option('--days', default=1, show_default=True, help='Number of days to aggregate ending at --day.')
+def logs_rollup(day: str, days: int) -> None:
+    """Aggregate raw logs into daily summaries."""
+    from llama_mindmap_backend.utils.log_storage import rollup_day
+
+    end = date.fromisoformat(day) if day else datetime.utcnow().date() - timedelta(days=1)
+    for offset in range(days - 1, -1, -1):
+        target = end - timedelta(days=offset)
+        rows = rollup_day(target)
+        if rows:
+            click.echo(f"{target.isoformat()}: {rows} summary rows")
+        else:
+            click.echo(f"{target.isoformat()}: no raw logs, existing summary kept")
+
+
+@logs_cli.command('prune')
+@click.option('--retention-days', type=int, default=None, help='Override LOG_RETENTION_DAYS.')
+def logs_prune(retention_days: int) -> None:
+    """Drop log partitions past retention."""
+    from llama_mindmap_backend.utils.log_storage import archive_closed_months, enforce_retention
+
+    archive_closed_months()
+    dropped = enforce_retention(retention_days)
+    click.echo(f"Dropped {len(dropped)} partition(s): {', '.join(dropped) or '-'}")
+
+
+@cache_cli.command('warm')
+@click.option('--top', default=100, show_default=True, help='Number of popular root topics to warm.')
+@click.option('--days', default=30, show_default=True, help='Days of conversation_created logs to rank.')
+@click.option('--file', 'topics_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Read topics from a file (one per line) instead of the logs.')
+@click.option('--kinds', default='expand,steps,analysis', show_default=True,
+              help='Comma-separated kinds to generate.')
+@click.option('--workers', default=4, show_default=True, help='Concurrent LLM calls.')
+@click.option('--rate', default=1.0, show_default=True, help='Maximum LLM calls started per second (0 = unlimited).')
+@click.option('--dry-run', is_flag=True, help='Only list what would be generated.')
+def cache_warm(top: int, days: int, topics_file: str, kinds: str, workers: int, rate: float,
+               dry_run: bool) -> None:
+    """Pre-generate popular topics into the response store.
+
+    Pairs already stored are skipped, so an interrupted run can be resumed by
+    running the same command again.
+    """
+    from llama_mindmap_backend.utils.cache_warming import (
+        GENERATORS, pending_work, popular_topics, read_topics, warm_topics
+    )
+
+    kind_list = [kind.strip() for kind in kinds.split(',') if kind.strip()]
+    unknown = [kind for kind in kind_list if kind not in GENERATORS]
+    if unknown:
+        raise click.BadParameter(f"unknown kind(s): {', '.join(unknown)}", param_hint='--kinds')
+
+    topics = read_topics(topics_file) if topics_file else popular_topics(limit=top, days=days)
+    work = pending_work(topics, kind_list)
+    click.echo(f"{len(topics)} topic(s), {len(work)} generation(s) pending")
+    if dry_run:
+        for topic, kind in work:
+            click.echo(f"  {kind}: {topic}")
+        return
+    if not work:
+        return
+
+    started = time.monotonic()
+    last = {'failed': 0}
+
+    def report(done: int, failed: int, total: int, label: str) -> None:
+        finished = done + failed
+        status = 'FAIL' if failed > last['failed'] else 'ok'
+        last['failed'] = failed
+        eta = (time.monotonic() - started) / finished * (total - finished)
+        click.echo(f"[{finished}/{total}] {status:<4} {label} (eta {int(eta)}s)")
+
+    counts = warm_topics(work, workers=workers, rate=rate, pack_size=current_app.config['LLM_PACK_SIZE'],
+                         progress=report)
+    click.echo(f"Stored {counts['stored']}, failed {counts['failed']} in {time.monotonic() - started:.1f}s")
+
+
+@assets_cli.command('build')
+def assets_build() -> None:
+    """Write precompressed .br/.gz variants of compressible static files."""
+    from llama_mindmap_backend.utils.assets import build_precompressed
+
+    counts = build_precompressed(current_app.static_folder)
+    click.echo(f"Wrote {counts['files']} precompressed file(s), saving {counts['saved']} bytes")
+
+
+@apispec_cli.command('build')
+@click.option('--output', default=None, help='Override API_SPEC_FILE.')
+def apispec_build(output: str) -> None:
+    """Generate the Swagger spec once and write it for workers to load at startup."""
+    from llama_mindmap_backend.utils.api_docs import build_spec_file
+
+    if not hasattr(current_app, 'swag'):
+        raise click.ClickException("API docs are disabled (API_DOCS_ENABLED=false)")
+    path = output or current_app.config['API_SPEC_FILE']
+    count = build_spec_file(current_app, path)
+    click.echo(f"Wrote spec for {count} path(s) to {path}")
+
+
+def register_commands(app: Flask) -> None:
+    """Register CLI command groups."""
+    app.cli.add_command(logs_cli)
+    app.cli.add_command(cache_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(apispec_cli)
+    
+    # Migrations only ever run from the flask CLI; elsewhere this skips importing alembic
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        from flask_migrate import Migrate
+        from llama_mindmap_backend.extensions import db
+
+        Migrate(app, db)
@@ -5,22 +5,41 @@ from pathlib import Path
 from typing import Type
 
 
+# .env files already read by this process
+_loaded_env_files = set()
+
+
+def load_env_file(path: str = '.env') -> bool:
+    """
+    Load environment variables from a .env file, once per process.
+    
+    Variables already set in the environment take precedence. Called when
+    this module is imported, so the settings below see the file's values.
+    
+    Args:
+        path: File to read
+        
+    Returns:
+        True if the file was read by this call
+    """
+    env_path = Path(path).resolve()
+    if env_path in _loaded_env_files or not env_path.exists():
+        return False
+    _loaded_env_files.add(env_path)
+    with open(env_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                os.environ.setdefault(key.strip(), value.strip())
+    return True
+
+
+load_env_file()
+
+
 class BaseConfig:
-    """Base configuration class with environment auto-loading."""
-    
-    def __init__(self):
-        self._load_env_file()
-    
-    def _load_env_file(self) -> None:
-        """Load environment variables from .env file."""
-        env_path = Path('.env')
-        if env_path.exists():
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ.setdefault(key.strip(), value.strip())
+    """Base configuration class; values come from the environment and .env."""
     
     # Flask Core Settings
     SECRET_KEY: str = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -40,12 +59,129 @@ class BaseConfig:
     HUGGINGFACE_TOKEN: str = os.getenv('HUGGINGFACE_TOKEN', '')
     HUGGINGFACE_PROVIDER: str = os.getenv('HUGGINGFACE_PROVIDER', 'together')
     HUGGINGFACE_MODEL: str = os.getenv('HUGGINGFACE_MODEL', 'deepseek-ai/DeepSeek-R1')
+    HUGGINGFACE_API_URL: str = os.getenv('HUGGINGFACE_API_URL', 'https://router.huggingface.co/v1/chat/completions')
     HF_TIMEOUT_SECONDS: int = int(os.getenv('HF_TIMEOUT_SECONDS', '30'))
+    LLM_STRUCTURED_OUTPUT: bool = os.getenv('LLM_STRUCTURED_OUTPUT', 'false').lower() == 'true'
+    LLM_PACK_SIZE: int = int(os.getenv('LLM_PACK_SIZE', '5'))
+    WEB_BATCH_MAX_TOPICS: int = int(os.getenv('WEB_BATCH_MAX_TOPICS', '10'))
     
     # Application Settings
     DEBUG: bool = os.getenv('DEBUG', 'false').lower() == 'true'
     TESTING: bool = os.getenv('TESTING', 'false').lower() == 'true'
     JWT_ACCESS_TOKEN_EXPIRES: int = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', '86400'))
+    
+    # Identity Cache and Token Revocation
+    USER_CACHE_SIZE: int = int(os.getenv('USER_CACHE_SIZE', '10000'))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+    REDIS_URL: str = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    TOKEN_REVOCATION_BACKEND: str = os.getenv('TOKEN_REVOCATION_BACKEND', 'database')
+    TOKEN_REVOCATION_SYNC_SECONDS: float = float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', '5'))
+    
+    # Password Hashing
+    PASSWORD_HASH_METHOD: str = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_SALT_LENGTH: int = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', '32'))
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
+    
+    # Rate Limiting (public web API)
+    RATELIMIT_ENABLED: bool = os.getenv('RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+    RATELIMIT_STORAGE_URI: str = os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_HEADERS_ENABLED: bool = os.getenv('RATE_LIMIT_HEADERS_ENABLED', 'false').lower() == 'true'
+    RATE_LIMIT_WEB_PER_IP: str = os.getenv('RATE_LIMIT_WEB_PER_IP', f"{os.getenv('RATE_LIMIT_PER_MINUTE', '60')}/minute")
+    RATE_LIMIT_WEB_PER_USER: str = os.getenv('RATE_LIMIT_WEB_PER_USER', '30/minute;500/day')
+    
+    # LLM Admission Control
+    LLM_MAX_INFLIGHT_PER_PROCESS: int = int(os.getenv('LLM_MAX_INFLIGHT_PER_PROCESS', '8'))
+    LLM_MAX_INFLIGHT_GLOBAL: int = int(os.getenv('LLM_MAX_INFLIGHT_GLOBAL', '0'))
+    LLM_ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv('LLM_ADMISSION_QUEUE_TIMEOUT', '2'))
+    LLM_ADMISSION_MAX_WAITING: int = int(os.getenv('LLM_ADMISSION_MAX_WAITING', '16'))
+    LLM_ADMISSION_RETRY_AFTER: int = int(os.getenv('LLM_ADMISSION_RETRY_AFTER', '5'))
+    
+    # Fair-share LLM Scheduling
+    LLM_DISPATCH_CONCURRENCY: int = int(os.getenv('LLM_DISPATCH_CONCURRENCY', '4'))
+    LLM_USER_QUEUE_DEPTH: int = int(os.getenv('LLM_USER_QUEUE_DEPTH', '5'))
+    LLM_TIER_WEIGHTS: str = os.getenv('LLM_TIER_WEIGHTS', 'default:1,free:1,pro:4')
+    LLM_INTERACTIVE_RESERVED: int = int(os.getenv('LLM_INTERACTIVE_RESERVED', '1'))
+    LLM_BACKGROUND_QUEUE_SIZE: int = int(os.getenv('LLM_BACKGROUND_QUEUE_SIZE', '100'))
+    
+    # Speculative Prefetch
+    PREFETCH_ENABLED: bool = os.getenv('PREFETCH_ENABLED', 'false').lower() == 'true'
+    PREFETCH_KINDS: str = os.getenv('PREFETCH_KINDS', 'steps,analysis')
+    PREFETCH_USER_BUDGET: int = int(os.getenv('PREFETCH_USER_BUDGET', '30'))
+    PREFETCH_TTL_SECONDS: int = int(os.getenv('PREFETCH_TTL_SECONDS', '600'))
+    PREFETCH_MAX_ENTRIES: int = int(os.getenv('PREFETCH_MAX_ENTRIES', '5000'))
+    PREFETCH_MIN_HIT_RATE: float = float(os.getenv('PREFETCH_MIN_HIT_RATE', '0.2'))
+    PREFETCH_MIN_SAMPLES: int = int(os.getenv('PREFETCH_MIN_SAMPLES', '50'))
+    PREFETCH_PROBE_RATE: float = float(os.getenv('PREFETCH_PROBE_RATE', '0.1'))
+    
+    # Near-duplicate Topic Reuse
+    TOPIC_REUSE_ENABLED: bool = os.getenv('TOPIC_REUSE_ENABLED', 'false').lower() == 'true'
+    TOPIC_SIMILARITY_THRESHOLD: float = float(os.getenv('TOPIC_SIMILARITY_THRESHOLD', '0.8'))
+    TOPIC_INDEX_MAX_TOPICS: int = int(os.getenv('TOPIC_INDEX_MAX_TOPICS', '200000'))
+    TOPIC_INDEX_BANDS: int = int(os.getenv('TOPIC_INDEX_BANDS', '4'))
+    TOPIC_INDEX_ROWS: int = int(os.getenv('TOPIC_INDEX_ROWS', '2'))
+    TOPIC_INDEX_PATH: str = os.getenv('TOPIC_INDEX_PATH', 'instance/topic_index.gz')
+    TOPIC_INDEX_SYNC_SECONDS: int = int(os.getenv('TOPIC_INDEX_SYNC_SECONDS', '300'))
+    
+    # Token Usage Accounting
+    TOKEN_USAGE_FLUSH_SECONDS: int = int(os.getenv('TOKEN_USAGE_FLUSH_SECONDS', '60'))
+    TOKEN_BUDGET_DAILY_PER_USER: int = int(os.getenv('TOKEN_BUDGET_DAILY_PER_USER', '0'))
+    LLM_TOKEN_PRICES: str = os.getenv('LLM_TOKEN_PRICES', '')
+    
+    # Background Jobs
+    SCHEDULER_ENABLED: bool = os.getenv('SCHEDULER_ENABLED', 'false').lower() == 'true'
+    
+    # Application Logging
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'text')
+    LOG_TO_FILE: bool = os.getenv('LOG_TO_FILE', 'true').lower() == 'true'
+    LOG_FILE: str = os.getenv('LOG_FILE', 'logs/app.log')
+    LOG_ROTATION: str = os.getenv('LOG_ROTATION', 'size')
+    LOG_MAX_BYTES: int = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_ROTATE_WHEN: str = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+    LOG_BACKUP_COUNT: int = int(os.getenv('LOG_BACKUP_COUNT', '7'))
+    LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_SAMPLING: str = os.getenv('LOG_SAMPLING', 'llama_mindmap_backend.routes.web_api:0.1')
+    
+    # Log Storage
+    LOG_RETENTION_DAYS: int = int(os.getenv('LOG_RETENTION_DAYS', '90'))
+    LOG_PARTITION_MONTHS_AHEAD: int = int(os.getenv('LOG_PARTITION_MONTHS_AHEAD', '2'))
+    LOG_MAINTENANCE_HOUR: int = int(os.getenv('LOG_MAINTENANCE_HOUR', '3'))
+    
+    # Usage Analytics
+    ANALYTICS_ENABLED: bool = os.getenv('ANALYTICS_ENABLED', 'false').lower() == 'true'
+    ANALYTICS_FLUSH_SECONDS: int = int(os.getenv('ANALYTICS_FLUSH_SECONDS', '60'))
+    
+    # Page Caching (rendered landing pages per device type; off in debug mode)
+    PAGE_CACHE_ENABLED: bool = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    
+    # Static Assets (fingerprinted URLs with far-future caching; off in debug mode)
+    ASSET_FINGERPRINT_ENABLED: bool = os.getenv('ASSET_FINGERPRINT_ENABLED', 'true').lower() == 'true'
+    ASSET_MAX_AGE_SECONDS: int = int(os.getenv('ASSET_MAX_AGE_SECONDS', '31536000'))
+    
+    # Response Compression (complete responses of these types above the size threshold)
+    COMPRESSION_ENABLED: bool = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIMETYPES: str = os.getenv('COMPRESSION_MIMETYPES', 'application/json')
+    COMPRESSION_MIN_SIZE: int = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+    
+    # WSGI Server (read by gunicorn.conf.py; 0 derives workers from cores and threads from LLM admission limits)
+    GUNICORN_BIND: str = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+    GUNICORN_WORKERS: int = int(os.getenv('GUNICORN_WORKERS', '0'))
+    GUNICORN_WORKER_CLASS: str = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+    GUNICORN_THREADS: int = int(os.getenv('GUNICORN_THREADS', '0'))
+    GUNICORN_PRELOAD: bool = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+    GUNICORN_MAX_REQUESTS: int = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+    
+    # ASGI Mode (asgi.py; LLM-bound requests wait without a thread, so far more may be admitted per process)
+    ASGI_THREADS: int = int(os.getenv('ASGI_THREADS', '16'))
+    ASGI_MAX_INFLIGHT_PER_PROCESS: int = int(os.getenv('ASGI_MAX_INFLIGHT_PER_PROCESS', '1000'))
+    
+    # API Docs (flasgger is not even imported when disabled; the spec file is written by 'flask apispec build')
+    API_DOCS_ENABLED: bool = os.getenv('API_DOCS_ENABLED', 'true').lower() == 'true'
+    API_SPEC_FILE: str = os.getenv('API_SPEC_FILE', 'instance/apispec.json')
 
 
 class DevelopmentConfig(BaseConfig):
@@ -2,9 +2,10 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 
 # Initialize extensions
 db = SQLAlchemy()
 jwt = JWTManager()
-migrate = Migrate()
\ No newline at end of file
+limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
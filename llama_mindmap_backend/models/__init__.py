@@ -2,5 +2,9 @@ from .user import User
 from .conversation import Conversation
 from .node import Node
 from .log import Log
+from .log_summary import LogDailySummary
+from .analytics import UsageHourly, LlmLatencyHourly, TokenUsageHourly
+from .generated_response import GeneratedResponse
+from .token_revocation import TokenRevocation
 
-__all__ = ["User", "Conversation", "Node", "Log"]
+__all__ = ["User", "Conversation", "Node", "Log", "LogDailySummary", "UsageHourly", "LlmLatencyHourly", "TokenUsageHourly", "GeneratedResponse", "TokenRevocation"]
@@ -0,0 +1,32 @@
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from llama_mindmap_backend.extensions import db
+
+class UsageHourly(db.Model):
+    """Event counts per hour, event type and user, maintained as logs are written."""
+    __tablename__ = 'usage_hourly'
+    hour = Column(DateTime, primary_key=True)
+    event_type = Column(String(50), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class LlmLatencyHourly(db.Model):
+    """LLM call latency histogram per hour and operation."""
+    __tablename__ = 'llm_latency_hourly'
+    hour = Column(DateTime, primary_key=True)
+    operation = Column(String(50), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class TokenUsageHourly(db.Model):
+    """LLM token usage per hour, requester, endpoint, model and operation."""
+    __tablename__ = 'token_usage_hourly'
+    hour = Column(DateTime, primary_key=True)
+    user_key = Column(String(100), primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    model = Column(String(200), primary_key=True)
+    operation = Column(String(50), primary_key=True)
+    calls = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    latency_ms = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, String, DateTime, Index
+from llama_mindmap_backend.extensions import db
+
+class GeneratedResponse(db.Model):
+    """LLM output stored by normalized topic key for reuse across users."""
+    __tablename__ = 'generated_responses'
+    topic_key = Column(String(500), primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    topic = Column(String(500), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_generated_responses_created_at', 'created_at'),
+    )
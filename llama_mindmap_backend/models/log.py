@@ -1,13 +1,28 @@
 import uuid
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import DDL, Column, String, DateTime, ForeignKey, Index, event
 from llama_mindmap_backend.extensions import db
 
 class Log(db.Model):
     __tablename__ = 'logs'
+    __table_args__ = (
+        Index('ix_logs_timestamp', 'timestamp'),
+        # On Postgres the table is range-partitioned by month; see utils/log_storage.py
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+    # The partition key has to be part of the primary key on Postgres
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
     event_type = Column(String(50), nullable=False)
     event_data = Column(JSONB, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+
+
+# A partitioned table accepts no rows until it has a partition; the default
+# one takes months without their own (see utils/log_storage.py)
+event.listen(
+    Log.__table__, 'after_create',
+    DDL("CREATE TABLE IF NOT EXISTS logs_default PARTITION OF logs DEFAULT").execute_if(dialect='postgresql')
+)
@@ -0,0 +1,11 @@
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Date, Integer, ForeignKey
+from llama_mindmap_backend.extensions import db
+
+class LogDailySummary(db.Model):
+    """Per-day event counts kept after raw log rows age out."""
+    __tablename__ = 'log_daily_summaries'
+    day = Column(Date, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), primary_key=True)
+    event_type = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
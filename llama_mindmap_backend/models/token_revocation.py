@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Float, Index
+from llama_mindmap_backend.extensions import db
+
+class TokenRevocation(db.Model):
+    """Token revocations shared between processes, pulled by each one's revocation store."""
+    __tablename__ = 'token_revocations'
+    entry = Column(String(200), primary_key=True)
+    # Unix time the entry was published, which processes sync from
+    revoked_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_token_revocations_revoked_at', 'revoked_at'),
+    )
@@ -1,16 +1,26 @@
 import uuid
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from llama_mindmap_backend.extensions import db
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Pattern-ops indexes let Postgres serve `LIKE 'prefix%'` searches from the index
+        Index('ix_users_username_prefix', 'username', postgresql_ops={'username': 'varchar_pattern_ops'}),
+        Index('ix_users_email_prefix', 'email', postgresql_ops={'email': 'varchar_pattern_ops'}),
+        # Keyset pagination order for the admin listing
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+    # Never part of a user's JSON form
+    __json_exclude__ = ('password_hash',)
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String(80), unique=True, nullable=False)
     email = Column(String(120), unique=True, nullable=False)
-    password_hash = Column(String(128), nullable=False)
+    password_hash = Column(String(255), nullable=False)
     profile_data = Column(JSONB, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -1,27 +1,337 @@
-from flask import Blueprint, jsonify
+import csv
+import io
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required
+from sqlalchemy import or_, select
+from llama_mindmap_backend.extensions import db
 from llama_mindmap_backend.models import Log, User
+from llama_mindmap_backend.utils.analytics import (
+    event_counts, flush_analytics, latency_percentiles, parse_window, top_users
+)
+from llama_mindmap_backend.utils.token_usage import (
+    GROUP_COLUMNS, flush_token_usage, get_token_tracker, token_usage_report
+)
+from llama_mindmap_backend.utils.pagination import (
+    InvalidCursor, apply_keyset, parse_page_size, split_page
+)
+from llama_mindmap_backend.utils.serializers import InvalidFields, log_serializer, user_list_serializer
 
 admin_bp = Blueprint('admin', __name__)
 
+# Columns of the user export; profile_data is deliberately excluded
+USER_LIST_COLUMNS = (User.id, User.username, User.email, User.created_at)
+EXPORT_BATCH_SIZE = 1000
+
 @admin_bp.route('/logs', methods=['GET'])
 @jwt_required()
 def get_logs():
-    logs = Log.query.order_by(Log.timestamp.desc()).limit(100).all()
-    return jsonify([{
-        'user_id': str(log.user_id),
-        'event_type': log.event_type,
-        'event_data': log.event_data,
-        'timestamp': log.timestamp.isoformat()
-    } for log in logs]), 200
+    try:
+        fields = log_serializer.parse(request.args.get('fields'))
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+    logs = db.session.query(*log_serializer.columns(fields)).order_by(Log.timestamp.desc()).limit(100).all()
+    return jsonify(log_serializer.dump_many(logs, fields)), 200
+
+def user_prefix_filter(search):
+    """Build a filter matching usernames or emails that start with search."""
+    return or_(
+        User.username.startswith(search, autoescape=True),
+        User.email.startswith(search.lower(), autoescape=True)
+    )
 
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
-    users = User.query.all()
-    return jsonify([{
-        'id': str(user.id),
-        'username': user.username,
-        'email': user.email,
-        'created_at': user.created_at.isoformat()
-    } for user in users]), 200
+    """
+    List users, newest first, one page at a time
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        description: Page size (1-500, default 50)
+      - in: query
+        name: cursor
+        type: string
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: q
+        type: string
+        description: Username or email prefix
+      - in: query
+        name: fields
+        type: string
+        description: Comma-separated fields (id, username, email, profile_data, created_at; default all but profile_data)
+    responses:
+      200:
+        description: Page of users
+      400:
+        description: Invalid cursor or unknown field
+    """
+    limit = parse_page_size(request.args.get('limit'))
+    search = request.args.get('q', '').strip()
+    try:
+        fields = user_list_serializer.parse(request.args.get('fields'))
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
+
+    # The keyset columns are always selected so the next cursor can be built
+    query = db.session.query(*user_list_serializer.columns(fields, required=('id', 'created_at')))
+    if search:
+        query = query.filter(user_prefix_filter(search))
+    try:
+        query = apply_keyset(query, User.created_at, User.id, request.args.get('cursor'), limit)
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+
+    users, next_cursor = split_page(query.all(), limit)
+    return jsonify({
+        'users': user_list_serializer.dump_many(users, fields),
+        'next_cursor': next_cursor
+    }), 200
+
+@admin_bp.route('/users/export', methods=['GET'])
+@jwt_required()
+def export_users():
+    """
+    Stream all users as CSV
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: q
+        type: string
+        description: Username or email prefix
+    produces:
+      - text/csv
+    responses:
+      200:
+        description: CSV file with id, username, email, created_at
+    """
+    search = request.args.get('q', '').strip()
+    statement = select(*USER_LIST_COLUMNS).order_by(User.created_at, User.id)
+    if search:
+        statement = statement.where(user_prefix_filter(search))
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['id', 'username', 'email', 'created_at'])
+
+        # yield_per streams rows through a server-side cursor in fixed-size batches
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            for user in batch:
+                writer.writerow([
+                    str(user.id),
+                    user.username,
+                    user.email,
+                    user.created_at.isoformat() if user.created_at else ''
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=users.csv'}
+    )
+
+def parse_event_types(value):
+    """Split a comma-separated ?event_type= value."""
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+@admin_bp.route('/analytics/events', methods=['GET'])
+@jwt_required()
+def analytics_events():
+    """
+    Event counts over time from pre-aggregated hourly buckets
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: start
+        type: string
+        description: ISO timestamp (default 24 hours before end)
+      - in: query
+        name: end
+        type: string
+        description: ISO timestamp (default now)
+      - in: query
+        name: granularity
+        type: string
+        enum: [hour, day]
+      - in: query
+        name: event_type
+        type: string
+        description: Comma-separated event types
+      - in: query
+        name: user_id
+        type: string
+    responses:
+      200:
+        description: Time series of event counts
+      400:
+        description: Invalid parameters
+    """
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ('hour', 'day'):
+        return jsonify({'message': 'granularity must be hour or day'}), 400
+
+    try:
+        start, end = parse_window(request.args.get('start'), request.args.get('end'))
+        flush_analytics()
+        series = event_counts(
+            start, end, granularity,
+            event_types=parse_event_types(request.args.get('event_type')),
+            user_id=request.args.get('user_id')
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': series
+    }), 200
+
+@admin_bp.route('/analytics/users', methods=['GET'])
+@jwt_required()
+def analytics_users():
+    """
+    Most active users in a time window
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: start
+        type: string
+      - in: query
+        name: end
+        type: string
+      - in: query
+        name: event_type
+        type: string
+      - in: query
+        name: limit
+        type: integer
+    responses:
+      200:
+        description: Users ordered by event count
+    """
+    try:
+        start, end = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    flush_analytics()
+    users = top_users(
+        start, end,
+        event_types=parse_event_types(request.args.get('event_type')),
+        limit=parse_page_size(request.args.get('limit'), default=20)
+    )
+    return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'users': users}), 200
+
+@admin_bp.route('/analytics/latency', methods=['GET'])
+@jwt_required()
+def analytics_latency():
+    """
+    LLM latency percentiles per operation
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: start
+        type: string
+      - in: query
+        name: end
+        type: string
+      - in: query
+        name: operation
+        type: string
+        enum: [expand, breakdown, analyze, test]
+    responses:
+      200:
+        description: Call count and p50/p90/p95/p99 latency in seconds
+    """
+    try:
+        start, end = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    flush_analytics()
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'operations': latency_percentiles(start, end, request.args.get('operation'))
+    }), 200
+
+@admin_bp.route('/analytics/tokens', methods=['GET'])
+@jwt_required()
+def analytics_tokens():
+    """
+    LLM token usage and estimated cost
+    ---
+    tags:
+      - Admin
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: query
+        name: start
+        type: string
+      - in: query
+        name: end
+        type: string
+      - in: query
+        name: group_by
+        type: string
+        enum: [user, endpoint, model, operation]
+      - in: query
+        name: limit
+        type: integer
+    responses:
+      200:
+        description: Calls, prompt/completion tokens, average latency and estimated cost per group
+      400:
+        description: Invalid parameters
+    """
+    group_by = request.args.get('group_by', 'user')
+    if group_by not in GROUP_COLUMNS:
+        return jsonify({'message': f"group_by must be one of {', '.join(GROUP_COLUMNS)}"}), 400
+
+    try:
+        start, end = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    flush_token_usage()
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group_by': group_by,
+        'usage': token_usage_report(
+            start, end, group_by, limit=parse_page_size(request.args.get('limit'), default=50)
+        ),
+        'process_totals': get_token_tracker().get_stats()
+    }), 200
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from llama_mindmap_backend.extensions import db
 from llama_mindmap_backend.models import User, Log
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from llama_mindmap_backend.utils.passwords import PasswordHasherBusy, get_password_hasher
+from llama_mindmap_backend.utils.identity import get_cached_user, invalidate_user
+from llama_mindmap_backend.utils.serializers import InvalidFields, profile_serializer
+from llama_mindmap_backend.utils.token_revocation import get_revocation_store
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from datetime import datetime
 import uuid
 import re
 
@@ -19,6 +23,12 @@ def validate_password(password):
         return False, "Password must be at least 6 characters long"
     return True, "Valid password"
 
+def hasher_busy_response():
+    """Response for when password hashing is saturated"""
+    response = jsonify({'message': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """
@@ -106,7 +116,7 @@ def register():
             id=user_id,
             username=username,
             email=email,
-            password_hash=generate_password_hash(password)
+            password_hash=get_password_hasher().hash(password)
         )
         
         db.session.add(new_user)
@@ -123,9 +133,12 @@ def register():
         
         return jsonify({
             'message': 'User registered successfully',
-            'user_id': str(user_id)
+            'user_id': user_id
         }), 201
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Registration failed. Please try again.'}), 500
@@ -192,9 +205,18 @@ def login():
         # Find user
         user = User.query.filter_by(email=email).first()
         
-        if not user or not check_password_hash(user.password_hash, password):
+        hasher = get_password_hasher()
+        if not user or not hasher.verify(user.password_hash, password):
             return jsonify({'message': 'Invalid credentials'}), 401
         
+        # Upgrade hashes created with outdated parameters while the plaintext is at hand
+        if hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hasher.hash(password)
+            except PasswordHasherBusy:
+                # Best effort: the user already verified; upgrade on a later login
+                pass
+        
         # Create access token
         access_token = create_access_token(identity=str(user.id))
         
@@ -210,12 +232,15 @@ def login():
         return jsonify({
             'access_token': access_token,
             'user': {
-                'id': str(user.id),
+                'id': user.id,
                 'username': user.username,
                 'email': user.email
             }
         }), 200
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         return jsonify({'message': 'Login failed. Please try again.'}), 500
 
@@ -229,6 +254,11 @@ def get_profile():
       - Auth
     security:
       - bearerAuth: []
+    parameters:
+      - in: query
+        name: fields
+        type: string
+        description: Comma-separated fields to return (default all)
     responses:
       200:
         description: User profile
@@ -245,22 +275,22 @@ def get_profile():
               type: object
             created_at:
               type: string
+      400:
+        description: Unknown field
     """
     try:
+        fields = profile_serializer.parse(request.args.get('fields'))
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_cached_user(user_id)
         
         if not user:
             return jsonify({'message': 'User not found'}), 404
         
-        return jsonify({
-            'id': str(user.id),
-            'username': user.username,
-            'email': user.email,
-            'profile_data': user.profile_data,
-            'created_at': user.created_at.isoformat()
-        }), 200
+        # The cached snapshot holds exactly the public profile fields
+        return jsonify(profile_serializer.dump(user, fields)), 200
         
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to get profile'}), 500
 
@@ -315,6 +345,7 @@ def update_profile():
             user.profile_data = data['profile_data']
         
         db.session.commit()
+        invalidate_user(user_id)
         
         # Log the update
         log = Log(
@@ -356,7 +387,14 @@ def change_password():
               type: string
     responses:
       200:
-        description: Password changed successfully
+        description: Password changed successfully; previously issued tokens are revoked
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            access_token:
+              type: string
     """
     try:
         user_id = get_jwt_identity()
@@ -374,7 +412,8 @@ def change_password():
         new_password = data['new_password']
         
         # Verify current password
-        if not check_password_hash(user.password_hash, current_password):
+        hasher = get_password_hasher()
+        if not hasher.verify(user.password_hash, current_password):
             return jsonify({'message': 'Current password is incorrect'}), 401
         
         # Validate new password
@@ -383,8 +422,13 @@ def change_password():
             return jsonify({'message': message}), 400
         
         # Update password
-        user.password_hash = generate_password_hash(new_password)
+        user.password_hash = hasher.hash(new_password)
         db.session.commit()
+        invalidate_user(user_id)
+        
+        # Sign out every existing session and hand this client a fresh token
+        get_revocation_store().revoke_user_tokens(user_id)
+        access_token = create_access_token(identity=str(user.id))
         
         # Log the password change
         log = Log(
@@ -395,8 +439,14 @@ def change_password():
         db.session.add(log)
         db.session.commit()
         
-        return jsonify({'message': 'Password changed successfully'}), 200
+        return jsonify({
+            'message': 'Password changed successfully',
+            'access_token': access_token
+        }), 200
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Failed to change password'}), 500
@@ -405,7 +455,7 @@ def change_password():
 @jwt_required()
 def logout():
     """
-    User logout (mainly for logging purposes)
+    User logout, revoking the current access token
     ---
     tags:
       - Auth
@@ -417,6 +467,8 @@ def logout():
     """
     try:
         user_id = get_jwt_identity()
+        token = get_jwt()
+        get_revocation_store().revoke_token(token['jti'], token['exp'])
         
         # Log the logout
         log = Log(
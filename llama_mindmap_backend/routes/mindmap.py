@@ -2,12 +2,27 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from llama_mindmap_backend.extensions import db
 from llama_mindmap_backend.models import User, Conversation, Node, Log
-from llama_mindmap_backend.utils.llama_api import expand_topic, breakdown_topic, analyze_topic
+from llama_mindmap_backend.utils.llama_api import (
+    GenerationFailed, fallback_analysis, fallback_steps, fallback_subtopics,
+    generate_analysis, generate_breakdown, generate_subtopics
+)
+from llama_mindmap_backend.utils.admission import AdmissionRejected, admission_rejected_response
+from llama_mindmap_backend.utils.llm_scheduler import LANE_INTERACTIVE
+from llama_mindmap_backend.utils.llm_views import LLMCall, expand_in_packs, llm_view
+from llama_mindmap_backend.utils.prefetch import get_prefetcher
+from llama_mindmap_backend.utils.serializers import InvalidFields, conversation_serializer, node_serializer
+from llama_mindmap_backend.utils.topic_index import find_response, store_response
+from sqlalchemy import func, select
 import uuid
 from datetime import datetime
 
 mindmap_bp = Blueprint('mindmap', __name__)
 
+@mindmap_bp.errorhandler(AdmissionRejected)
+def handle_admission_rejected(error):
+    """Answer 503 when LLM capacity is exhausted"""
+    return admission_rejected_response(error, key='message')
+
 @mindmap_bp.route('/conversations', methods=['GET'])
 @jwt_required()
 def get_conversations():
@@ -18,6 +33,11 @@ def get_conversations():
       - MindMap
     security:
       - bearerAuth: []
+    parameters:
+      - in: query
+        name: fields
+        type: string
+        description: Comma-separated fields to return (id, user_id, root_topic, created_at, node_count; default all but user_id)
     responses:
       200:
         description: List of conversations
@@ -34,20 +54,23 @@ def get_conversations():
                 type: string
               node_count:
                 type: integer
+      400:
+        description: Unknown field
     """
     user_id = get_jwt_identity()
-    conversations = Conversation.query.filter_by(user_id=user_id).order_by(Conversation.created_at.desc()).all()
+    try:
+        fields = conversation_serializer.parse(request.args.get('fields'))
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
     
-    result = []
-    for conv in conversations:
-        result.append({
-            'id': str(conv.id),
-            'root_topic': conv.root_topic,
-            'created_at': conv.created_at.isoformat(),
-            'node_count': len(conv.nodes)
-        })
+    query = db.session.query(*conversation_serializer.columns(fields)).select_from(Conversation)
+    if 'node_count' in fields:
+        # Counted in the same query instead of loading every conversation's nodes
+        node_count = select(func.count(Node.id)).where(Node.conversation_id == Conversation.id).scalar_subquery()
+        query = query.add_columns(node_count.label('node_count'))
+    conversations = query.filter(Conversation.user_id == user_id).order_by(Conversation.created_at.desc()).all()
     
-    return jsonify(result), 200
+    return jsonify(conversation_serializer.dump_many(conversations, fields)), 200
 
 @mindmap_bp.route('/conversations', methods=['POST'])
 @jwt_required()
@@ -120,7 +143,7 @@ def create_conversation():
         db.session.commit()
         
         return jsonify({
-            'id': str(conversation.id),
+            'id': conversation.id,
             'message': 'Conversation created successfully'
         }), 201
         
@@ -128,6 +151,23 @@ def create_conversation():
         db.session.rollback()
         return jsonify({'message': 'Failed to create conversation'}), 500
 
+def build_node_tree(nodes, parent_id=None, fields=None):
+    """Nest a conversation's nodes under their parents as dicts; fields limits each node's keys."""
+    dump = node_serializer.compile(node_serializer.default if fields is None else fields)
+    children_of = {}
+    for node in nodes:
+        children_of.setdefault(node.parent_id, []).append(node)
+
+    def subtree(parent):
+        result = []
+        for node in children_of.get(parent, ()):
+            item = dump(node)
+            item['children'] = subtree(node.id)
+            result.append(item)
+        return result
+
+    return subtree(parent_id)
+
 @mindmap_bp.route('/conversations/<conversation_id>', methods=['GET'])
 @jwt_required()
 def get_conversation(conversation_id):
@@ -143,6 +183,10 @@ def get_conversation(conversation_id):
         name: conversation_id
         type: string
         required: true
+      - in: query
+        name: fields
+        type: string
+        description: Comma-separated node fields (e.g. id,content,level for an outline without steps or analysis)
     responses:
       200:
         description: Conversation with nodes
@@ -157,10 +201,14 @@ def get_conversation(conversation_id):
               type: array
               items:
                 type: object
+      400:
+        description: Unknown field
     """
     user_id = get_jwt_identity()
     
     try:
+        fields = node_serializer.parse(request.args.get('fields'))
+        
         conversation = Conversation.query.filter_by(
             id=conversation_id, 
             user_id=user_id
@@ -169,36 +217,26 @@ def get_conversation(conversation_id):
         if not conversation:
             return jsonify({'message': 'Conversation not found'}), 404
         
-        nodes = Node.query.filter_by(conversation_id=conversation_id).all()
-        
-        def build_node_tree(nodes, parent_id=None):
-            result = []
-            for node in nodes:
-                if node.parent_id == parent_id:
-                    node_data = {
-                        'id': str(node.id),
-                        'content': node.content,
-                        'level': node.level,
-                        'steps': node.steps,
-                        'analysis': node.analysis,
-                        'created_at': node.created_at.isoformat(),
-                        'children': build_node_tree(nodes, node.id)
-                    }
-                    result.append(node_data)
-            return result
+        # Only the requested columns, plus the keys needed to nest them
+        nodes = db.session.query(*node_serializer.columns(fields, required=('id', 'parent_id'))).filter(
+            Node.conversation_id == conversation_id
+        ).all()
         
         return jsonify({
-            'id': str(conversation.id),
+            'id': conversation.id,
             'root_topic': conversation.root_topic,
-            'created_at': conversation.created_at.isoformat(),
-            'nodes': build_node_tree(nodes)
+            'created_at': conversation.created_at,
+            'nodes': build_node_tree(nodes, fields=fields)
         }), 200
         
+    except InvalidFields as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to retrieve conversation'}), 500
 
 @mindmap_bp.route('/nodes/<node_id>/expand', methods=['POST'])
 @jwt_required()
+@llm_view
 def expand_node(node_id):
     """
     Expand a node into subtopics
@@ -246,8 +284,19 @@ def expand_node(node_id):
         if node.level >= 25:
             return jsonify({'message': 'Maximum level reached'}), 400
         
-        # Call LLaMA API to expand
-        subtopics = expand_topic(node.content)
+        # Reuse an expansion of the same or a near-duplicate topic, else call LLaMA API
+        subtopics = find_response('expand', node.content)
+        if subtopics is None:
+            # The session is released while waiting; node stays readable, detached
+            try:
+                subtopics = yield LLMCall(
+                    f"user:{user_id}", generate_subtopics, node.content, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                # Placeholders for this node only; never stored for reuse
+                subtopics = fallback_subtopics(node.content)
+            else:
+                store_response('expand', node.content, subtopics)
         
         # Create child nodes
         children = []
@@ -261,7 +310,7 @@ def expand_node(node_id):
             )
             db.session.add(child_node)
             children.append({
-                'id': str(child_node.id),
+                'id': child_node.id,
                 'content': child_node.content,
                 'level': child_node.level,
                 'steps': None,
@@ -285,18 +334,159 @@ def expand_node(node_id):
         db.session.add(log)
         db.session.commit()
         
+        # Speculatively generate steps/analysis the user is likely to ask for next
+        get_prefetcher().schedule(user_id, [(child['id'], child['content']) for child in children])
+        
         return jsonify({
             'message': 'Node expanded successfully',
             'children': children
         }), 200
         
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return admission_rejected_response(e, key='message')
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error expanding node: {str(e)}")
         return jsonify({'message': 'Failed to expand node'}), 500
 
+@mindmap_bp.route('/nodes/<node_id>/expand-children', methods=['POST'])
+@jwt_required()
+@llm_view
+def expand_children(node_id):
+    """
+    Expand every unexpanded child of a node at once
+    ---
+    tags:
+      - MindMap
+    security:
+      - bearerAuth: []
+    parameters:
+      - in: path
+        name: node_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Children expanded successfully
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            expanded:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: string
+                  children:
+                    type: array
+                    items:
+                      type: object
+    """
+    user_id = get_jwt_identity()
+    
+    try:
+        # Get the node and verify ownership
+        node = Node.query.join(Conversation).filter(
+            Node.id == node_id,
+            Conversation.user_id == user_id
+        ).first()
+        
+        if not node:
+            return jsonify({'message': 'Node not found'}), 404
+        
+        children = Node.query.filter_by(parent_id=node.id).order_by(Node.created_at).all()
+        if not children:
+            return jsonify({'message': 'Node has no children'}), 400
+        
+        # Skip children that are already expanded or at the level limit
+        expanded_ids = {
+            row[0] for row in db.session.query(Node.parent_id)
+            .filter(Node.parent_id.in_([child.id for child in children]))
+            .distinct()
+        }
+        targets = [child for child in children if child.id not in expanded_ids and child.level < 25]
+        if not targets:
+            return jsonify({'message': 'Children already expanded'}), 400
+        
+        # Reuse stored expansions, and pack the rest into as few LLaMA API calls as possible,
+        # each queued and timed out on its own
+        results = {child.content: find_response('expand', child.content) for child in targets}
+        missing = [topic for topic, subtopics in results.items() if subtopics is None]
+        if missing:
+            generated = yield from expand_in_packs(
+                f"user:{user_id}", missing, lane=LANE_INTERACTIVE, user_id=user_id
+            )
+            for topic in missing:
+                if topic in generated:
+                    store_response('expand', topic, generated[topic])
+                    results[topic] = generated[topic]
+                else:
+                    results[topic] = fallback_subtopics(topic)
+        
+        # Create grandchild nodes
+        expanded = []
+        for child in targets:
+            grandchildren = []
+            for subtopic in results[child.content]:
+                grandchild = Node(
+                    id=uuid.uuid4(),
+                    conversation_id=child.conversation_id,
+                    parent_id=child.id,
+                    content=subtopic,
+                    level=child.level + 1
+                )
+                db.session.add(grandchild)
+                grandchildren.append({
+                    'id': grandchild.id,
+                    'content': grandchild.content,
+                    'level': grandchild.level,
+                    'steps': None,
+                    'analysis': None,
+                    'children': []
+                })
+            expanded.append({'id': child.id, 'children': grandchildren})
+        
+        db.session.commit()
+        
+        # Log the activity
+        for child, entry in zip(targets, expanded):
+            db.session.add(Log(
+                user_id=user_id,
+                event_type='node_expanded',
+                event_data={
+                    'node_id': str(child.id),
+                    'content': child.content,
+                    'level': child.level,
+                    'subtopics_count': len(entry['children'])
+                }
+            ))
+        db.session.commit()
+        
+        get_prefetcher().schedule(user_id, [
+            (grandchild['id'], grandchild['content'])
+            for entry in expanded for grandchild in entry['children']
+        ])
+        
+        return jsonify({
+            'message': 'Children expanded successfully',
+            'expanded': expanded
+        }), 200
+        
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return admission_rejected_response(e, key='message')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error expanding children: {str(e)}")
+        return jsonify({'message': 'Failed to expand children'}), 500
+
 @mindmap_bp.route('/nodes/<node_id>/steps', methods=['POST'])
 @jwt_required()
+@llm_view
 def generate_steps(node_id):
     """
     Generate steps for a node
@@ -335,11 +525,21 @@ def generate_steps(node_id):
         if not node:
             return jsonify({'message': 'Node not found'}), 404
         
-        # Generate steps using LLaMA API
-        steps = breakdown_topic(node.content)
-        
-        # Update node with steps
-        node.steps = steps
+        # Generate steps using LLaMA API, unless they were prefetched or
+        # generated before for a near-duplicate topic
+        steps = get_prefetcher().take(user_id, node.id, 'steps') or find_response('steps', node.content)
+        if steps is None:
+            try:
+                steps = yield LLMCall(
+                    f"user:{user_id}", generate_breakdown, node.content, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                steps = fallback_steps(node.content)
+            else:
+                store_response('steps', node.content, steps)
+        
+        # Update node with steps (node may be detached after waiting on the LLM)
+        Node.query.filter_by(id=node.id).update({'steps': steps})
         db.session.commit()
         
         # Log the activity
@@ -360,6 +560,9 @@ def generate_steps(node_id):
             'steps': steps
         }), 200
         
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return admission_rejected_response(e, key='message')
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error generating steps: {str(e)}")
@@ -367,6 +570,7 @@ def generate_steps(node_id):
 
 @mindmap_bp.route('/nodes/<node_id>/analyze', methods=['POST'])
 @jwt_required()
+@llm_view
 def analyze_node(node_id):
     """
     Analyze a node
@@ -403,11 +607,21 @@ def analyze_node(node_id):
         if not node:
             return jsonify({'message': 'Node not found'}), 404
         
-        # Generate analysis using LLaMA API
-        analysis = analyze_topic(node.content)
-        
-        # Update node with analysis
-        node.analysis = analysis
+        # Generate analysis using LLaMA API, unless it was prefetched or
+        # generated before for a near-duplicate topic
+        analysis = get_prefetcher().take(user_id, node.id, 'analysis') or find_response('analysis', node.content)
+        if analysis is None:
+            try:
+                analysis = yield LLMCall(
+                    f"user:{user_id}", generate_analysis, node.content, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                analysis = fallback_analysis(node.content)
+            else:
+                store_response('analysis', node.content, analysis)
+        
+        # Update node with analysis (node may be detached after waiting on the LLM)
+        Node.query.filter_by(id=node.id).update({'analysis': analysis})
         db.session.commit()
         
         # Log the activity
@@ -428,6 +642,9 @@ def analyze_node(node_id):
             'analysis': analysis
         }), 200
         
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return admission_rejected_response(e, key='message')
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error generating analysis: {str(e)}")
@@ -1,16 +1,41 @@
 """Simplified web API routes for public access."""
 
 import logging
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from llama_mindmap_backend.extensions import limiter
 from llama_mindmap_backend.utils.llama_api import (
-    expand_topic, breakdown_topic, analyze_topic, 
+    GenerationFailed, fallback_analysis, fallback_steps, fallback_subtopics,
+    generate_analysis, generate_breakdown, generate_subtopics,
     test_api_connection, get_api_stats
 )
+from llama_mindmap_backend.utils.admission import (
+    AdmissionRejected, admission_rejected_response, get_admission_controller,
+    llm_bound, rate_limit_key
+)
+from llama_mindmap_backend.utils.llm_scheduler import LANE_INTERACTIVE, request_identity
+from llama_mindmap_backend.utils.llm_views import LLMCall, expand_in_packs, llm_view
+from llama_mindmap_backend.utils.compression import get_compression_stats
+from llama_mindmap_backend.utils.app_logging import get_logging_stats
+from llama_mindmap_backend.utils.prefetch import get_prefetcher
+from llama_mindmap_backend.utils.topic_index import find_response, get_topic_index, store_response
 
 
 logger = logging.getLogger(__name__)
 web_api_bp = Blueprint('web_api', __name__)
 
+# Public endpoints: limit per client IP, and per user when a token is sent
+limiter.limit(lambda: current_app.config['RATE_LIMIT_WEB_PER_IP'])(web_api_bp)
+limiter.limit(
+    lambda: current_app.config['RATE_LIMIT_WEB_PER_USER'], key_func=rate_limit_key,
+    exempt_when=lambda: not rate_limit_key().startswith('user:')
+)(web_api_bp)
+
+
+@web_api_bp.errorhandler(AdmissionRejected)
+def handle_admission_rejected(error):
+    """Answer 503 when LLM capacity is exhausted."""
+    return admission_rejected_response(error, key='error')
+
 
 def validate_topic(topic: str) -> tuple[bool, str]:
     """Validate topic input."""
@@ -28,6 +53,7 @@ def validate_topic(topic: str) -> tuple[bool, str]:
 
 
 @web_api_bp.route('/expand', methods=['POST'])
+@llm_view
 def expand_topic_endpoint():
     """Expand a topic into subtopics."""
     try:
@@ -38,8 +64,19 @@ def expand_topic_endpoint():
         if not is_valid:
             return jsonify({'error': error_msg}), 400
         
-        logger.info(f"Expanding topic: {topic}")
-        subtopics = expand_topic(topic)
+        logger.info("Expanding topic: %s", topic)
+        subtopics = find_response('expand', topic)
+        if subtopics is None:
+            user_key, user_id = request_identity()
+            try:
+                subtopics = yield LLMCall(
+                    user_key, generate_subtopics, topic, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                # Answer this request only; a placeholder is never stored for reuse
+                subtopics = fallback_subtopics(topic)
+            else:
+                store_response('expand', topic, subtopics)
         
         return jsonify({
             'success': True,
@@ -47,12 +84,62 @@ def expand_topic_endpoint():
             'subtopics': subtopics
         })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e, key='error')
     except Exception as e:
         logger.error(f"Error expanding topic: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@web_api_bp.route('/expand/batch', methods=['POST'])
+@llm_view
+def expand_topics_endpoint():
+    """Expand several topics at once; misses are packed into shared provider calls."""
+    try:
+        data = request.get_json()
+        topics = data.get('topics')
+        if not isinstance(topics, list) or not topics:
+            return jsonify({'error': 'topics must be a non-empty list'}), 400
+        
+        max_topics = current_app.config['WEB_BATCH_MAX_TOPICS']
+        if len(topics) > max_topics:
+            return jsonify({'error': f'Too many topics (max {max_topics})'}), 400
+        
+        topics = [str(topic).strip() for topic in topics]
+        for topic in topics:
+            is_valid, error_msg = validate_topic(topic)
+            if not is_valid:
+                return jsonify({'error': f'{error_msg}: {topic[:50]}'}), 400
+        
+        logger.info("Expanding %d topics", len(topics))
+        results = {topic: find_response('expand', topic) for topic in topics}
+        missing = [topic for topic, subtopics in results.items() if subtopics is None]
+        if missing:
+            user_key, user_id = request_identity()
+            generated = yield from expand_in_packs(
+                user_key, missing, lane=LANE_INTERACTIVE, user_id=user_id
+            )
+            for topic in missing:
+                if topic in generated:
+                    store_response('expand', topic, generated[topic])
+                    results[topic] = generated[topic]
+                else:
+                    results[topic] = fallback_subtopics(topic)
+        
+        return jsonify({
+            'success': True,
+            'results': [{'topic': topic, 'subtopics': results[topic]} for topic in topics]
+        })
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e, key='error')
+    except Exception as e:
+        logger.error(f"Error expanding topics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @web_api_bp.route('/breakdown', methods=['POST'])
+@llm_view
 def breakdown_topic_endpoint():
     """Break down a topic into steps."""
     try:
@@ -63,8 +150,18 @@ def breakdown_topic_endpoint():
         if not is_valid:
             return jsonify({'error': error_msg}), 400
         
-        logger.info(f"Breaking down topic: {topic}")
-        steps = breakdown_topic(topic)
+        logger.info("Breaking down topic: %s", topic)
+        steps = find_response('steps', topic)
+        if steps is None:
+            user_key, user_id = request_identity()
+            try:
+                steps = yield LLMCall(
+                    user_key, generate_breakdown, topic, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                steps = fallback_steps(topic)
+            else:
+                store_response('steps', topic, steps)
         
         return jsonify({
             'success': True,
@@ -72,12 +169,15 @@ def breakdown_topic_endpoint():
             'steps': steps
         })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e, key='error')
     except Exception as e:
         logger.error(f"Error breaking down topic: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 @web_api_bp.route('/analyze', methods=['POST'])
+@llm_view
 def analyze_topic_endpoint():
     """Analyze a topic."""
     try:
@@ -88,8 +188,18 @@ def analyze_topic_endpoint():
         if not is_valid:
             return jsonify({'error': error_msg}), 400
         
-        logger.info(f"Analyzing topic: {topic}")
-        analysis = analyze_topic(topic)
+        logger.info("Analyzing topic: %s", topic)
+        analysis = find_response('analysis', topic)
+        if analysis is None:
+            user_key, user_id = request_identity()
+            try:
+                analysis = yield LLMCall(
+                    user_key, generate_analysis, topic, lane=LANE_INTERACTIVE, user_id=user_id
+                )
+            except GenerationFailed:
+                analysis = fallback_analysis(topic)
+            else:
+                store_response('analysis', topic, analysis)
         
         return jsonify({
             'success': True,
@@ -97,12 +207,15 @@ def analyze_topic_endpoint():
             'analysis': analysis
         })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e, key='error')
     except Exception as e:
         logger.error(f"Error analyzing topic: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 @web_api_bp.route('/test', methods=['GET'])
+@llm_bound
 def test_api_endpoint():
     """Test API connection."""
     try:
@@ -120,6 +233,7 @@ def test_api_endpoint():
 
 
 @web_api_bp.route('/status', methods=['GET'])
+@llm_bound
 def api_status():
     """Get API status and statistics."""
     try:
@@ -129,7 +243,13 @@ def api_status():
         return jsonify({
             'success': True,
             'connected': is_connected,
-            'stats': stats
+            'stats': stats,
+            'admission': get_admission_controller().get_stats(),
+            'prefetch': get_prefetcher().get_stats(),
+            'compression': get_compression_stats().get_stats(),
+            'startup': current_app.extensions.get('startup'),
+            'logging': get_logging_stats(),
+            'topic_index': get_topic_index().get_stats() if get_topic_index() else None
         })
         
     except Exception as e:
@@ -0,0 +1,6 @@
+from .user_schema import UserSchema
+from .conversation_schema import ConversationSchema
+from .node_schema import NodeSchema
+from .log_schema import LogSchema
+
+__all__ = ["UserSchema", "ConversationSchema", "NodeSchema", "LogSchema"]
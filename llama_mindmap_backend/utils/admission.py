@@ -0,0 +1,234 @@
+"""Admission control for LLM-bound endpoints.
+
+Caps how many LLM-bound requests run at once, per process and optionally
+across all processes (via Redis leases). Excess requests wait briefly for a
+slot and are then rejected with 503 and Retry-After, so a slow provider
+cannot tie up every worker and starve cheap endpoints.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from typing import Iterator, Optional
+
+from flask import Flask, jsonify
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+
+from llama_mindmap_backend.extensions import limiter
+
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'mindmap:llm_inflight'
+
+# Atomically drop expired leases and take a new one if below the limit
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when no LLM slot became free before the deadline."""
+    status = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded concurrency with a short wait queue and a deadline."""
+
+    def __init__(self, local_limit: int = 8, global_limit: int = 0, queue_timeout: float = 2.0,
+                 max_waiting: int = 16, retry_after: int = 5, lease_seconds: float = 300,
+                 redis_client=None):
+        """
+        Args:
+            local_limit: In-flight LLM requests allowed in this process
+            global_limit: In-flight LLM requests allowed across processes (0 disables)
+            queue_timeout: Seconds a request may wait for a slot
+            max_waiting: Requests allowed to wait at once; more are rejected immediately
+            retry_after: Retry-After value sent with rejections
+            lease_seconds: Lifetime of a global lease, so crashed processes cannot leak slots
+            redis_client: redis.Redis used for the global limit
+        """
+        self.local_limit = local_limit
+        self.global_limit = global_limit if redis_client is not None else 0
+        self.queue_timeout = queue_timeout
+        self.max_waiting = max_waiting
+        self.retry_after = retry_after
+        self.lease_seconds = lease_seconds
+        self._redis = redis_client
+        self._slots = threading.BoundedSemaphore(local_limit)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold an LLM slot for the duration of the block."""
+        deadline = time.monotonic() + self.queue_timeout
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise AdmissionRejected("Server busy: LLM queue is full", self.retry_after)
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.rejected += 1
+                raise AdmissionRejected("Server busy: LLM capacity exhausted", self.retry_after)
+
+        lease = None
+        try:
+            if self.global_limit:
+                lease = self._acquire_global(deadline)
+                if lease is None:
+                    with self._lock:
+                        self.rejected += 1
+                    raise AdmissionRejected("Server busy: LLM capacity exhausted across servers", self.retry_after)
+
+            with self._lock:
+                self.in_flight += 1
+                self.admitted += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        finally:
+            if lease is not None:
+                self._release_global(lease)
+            self._slots.release()
+
+    def _acquire_global(self, deadline: float) -> Optional[str]:
+        lease = uuid.uuid4().hex
+        while True:
+            now = time.time()
+            try:
+                granted = self._redis.eval(
+                    _ACQUIRE_SCRIPT, 1, GLOBAL_KEY, now, now + self.lease_seconds, self.global_limit, lease
+                )
+            except Exception as e:
+                # Fail open: the per-process limit still applies
+                logger.warning(f"Global admission check failed: {e}")
+                return ''
+            if granted:
+                return lease
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.05)
+
+    def _release_global(self, lease: str) -> None:
+        if not lease:
+            return
+        try:
+            self._redis.zrem(GLOBAL_KEY, lease)
+        except Exception as e:
+            logger.warning(f"Failed to release global admission lease: {e}")
+
+    def get_stats(self) -> dict:
+        """Get current admission counters."""
+        return {
+            'in_flight': self.in_flight,
+            'waiting': self._waiting,
+            'local_limit': self.local_limit,
+            'global_limit': self.global_limit,
+            'admitted': self.admitted,
+            'rejected': self.rejected
+        }
+
+
+# Global controller instance
+_controller = AdmissionController()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the global admission controller."""
+    return _controller
+
+
+def llm_bound(view):
+    """Decorate a view that waits on the LLM so it runs under admission control."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with _controller.admit():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def rate_limit_key() -> str:
+    """Rate limit by user when a valid token is sent, otherwise by client IP."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{get_remote_address()}"
+
+
+def admission_rejected_response(error: AdmissionRejected, key: str = 'message'):
+    """Build a 503 (or 429) response with Retry-After for a rejected request."""
+    response = jsonify({key: f"{error}. Please retry shortly."})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+
+def init_admission(app: Flask) -> None:
+    """Create the admission controller and register the rate limit error handler."""
+    configure_admission(app, app.config['LLM_MAX_INFLIGHT_PER_PROCESS'])
+
+    @app.errorhandler(429)
+    def rate_limited(error):
+        """Handle rate limit errors."""
+        response = jsonify({'error': f'Rate limit exceeded: {error.description}'})
+        current_limit = limiter.current_limit
+        if current_limit is not None:
+            response.headers['Retry-After'] = str(max(1, int(current_limit.reset_at - time.time())))
+        return response, 429
+
+
+def configure_admission(app: Flask, local_limit: int) -> None:
+    """
+    Replace the admission controller.
+
+    Args:
+        app: Application whose LLM_* admission settings apply
+        local_limit: In-flight LLM requests allowed in this process
+    """
+    global _controller
+
+    redis_client = None
+    if app.config['LLM_MAX_INFLIGHT_GLOBAL'] > 0:
+        try:
+            import redis
+            redis_client = redis.Redis.from_url(app.config['REDIS_URL'])
+        except ImportError:
+            logger.warning("redis not installed - global LLM admission limit disabled")
+
+    _controller = AdmissionController(
+        local_limit=local_limit,
+        global_limit=app.config['LLM_MAX_INFLIGHT_GLOBAL'],
+        queue_timeout=app.config['LLM_ADMISSION_QUEUE_TIMEOUT'],
+        max_waiting=app.config['LLM_ADMISSION_MAX_WAITING'],
+        retry_after=app.config['LLM_ADMISSION_RETRY_AFTER'],
+        lease_seconds=app.config['LLM_TIMEOUT_SECONDS'] + 30,
+        redis_client=redis_client
+    )
@@ -0,0 +1,345 @@
+"""Incremental usage analytics maintained as events are logged.
+
+Every committed ``Log`` row bumps an in-memory counter for its
+(hour, event_type, user_id), and every LLM call adds its latency to an
+hourly histogram. Counters are flushed to ``usage_hourly`` and
+``llm_latency_hourly`` with additive upserts, so admin queries read a few
+pre-aggregated rows instead of scanning ``logs``.
+"""
+
+import atexit
+import bisect
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import Log, UsageHourly, LlmLatencyHourly
+from llama_mindmap_backend.utils.scheduler import schedule_flush
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of latency histogram buckets: 50ms growing by 25% up to ~5 minutes
+LATENCY_BUCKETS: List[float] = [round(0.05 * 1.25 ** i, 4) for i in range(40)]
+PERCENTILES = (50, 90, 95, 99)
+
+_PENDING_KEY = 'analytics_pending'
+
+
+def hour_floor(moment: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def latency_bucket(seconds: float) -> int:
+    """Get the histogram bucket index for a latency."""
+    return min(bisect.bisect_left(LATENCY_BUCKETS, seconds), len(LATENCY_BUCKETS) - 1)
+
+
+def percentile_from_histogram(buckets: Dict[int, int], percentile: float) -> Optional[float]:
+    """
+    Estimate a percentile from bucket counts.
+
+    Args:
+        buckets: Mapping of bucket index to count
+        percentile: Percentile between 0 and 100
+
+    Returns:
+        Upper bound of the bucket containing the percentile, or None if empty
+    """
+    total = sum(buckets.values())
+    if total == 0:
+        return None
+
+    threshold = total * percentile / 100.0
+    cumulative = 0
+    for index in sorted(buckets):
+        cumulative += buckets[index]
+        if cumulative >= threshold:
+            return LATENCY_BUCKETS[index]
+    return LATENCY_BUCKETS[max(buckets)]
+
+
+class UsageAggregator:
+    """Thread-safe in-memory counters flushed periodically to the database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[Tuple[datetime, str, uuid.UUID], int] = defaultdict(int)
+        self._latency: Dict[Tuple[datetime, str, int], int] = defaultdict(int)
+
+    def add_events(self, events: Iterable[Tuple[datetime, str, uuid.UUID]]) -> None:
+        """Count (timestamp, event_type, user_id) events."""
+        with self._lock:
+            for timestamp, event_type, user_id in events:
+                self._events[(hour_floor(timestamp), event_type, user_id)] += 1
+
+    def add_latency(self, operation: str, seconds: float, when: Optional[datetime] = None) -> None:
+        """Record one LLM call latency."""
+        hour = hour_floor(when or datetime.utcnow())
+        with self._lock:
+            self._latency[(hour, operation, latency_bucket(seconds))] += 1
+
+    def flush(self) -> int:
+        """
+        Write buffered counters to the database.
+
+        On failure the counters are merged back so they are retried on the
+        next flush.
+
+        Returns:
+            Number of aggregate rows upserted
+        """
+        with self._lock:
+            events, self._events = self._events, defaultdict(int)
+            latency, self._latency = self._latency, defaultdict(int)
+
+        if not events and not latency:
+            return 0
+
+        try:
+            _upsert_counts(UsageHourly, ['hour', 'event_type', 'user_id'], events)
+            _upsert_counts(LlmLatencyHourly, ['hour', 'operation', 'bucket'], latency)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Analytics flush failed: {e}")
+            with self._lock:
+                for key, count in events.items():
+                    self._events[key] += count
+                for key, count in latency.items():
+                    self._latency[key] += count
+            return 0
+
+        return len(events) + len(latency)
+
+
+def _upsert_counts(model, key_columns: List[str], counts: Dict[tuple, int]) -> None:
+    """Add counts to existing aggregate rows, inserting missing ones."""
+    upsert_totals(model, key_columns, {key: {'count': count} for key, count in counts.items()})
+
+
+def upsert_totals(model, key_columns: List[str], totals: Dict[tuple, Dict[str, int]]) -> None:
+    """
+    Add values to existing aggregate rows, inserting missing ones.
+
+    Args:
+        model: Aggregate model whose primary key is key_columns
+        key_columns: Primary key column names, in the order of the dict keys
+        totals: Mapping of key tuple to {column: amount to add}
+    """
+    if not totals:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _merge_totals(model, key_columns, totals)
+        return
+
+    rows = [dict(zip(key_columns, key), **values) for key, values in totals.items()]
+    value_columns = list(rows[0].keys() - set(key_columns))
+    statement = insert(model).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: model.__table__.c[column] + statement.excluded[column] for column in value_columns}
+    )
+    db.session.execute(statement)
+
+
+def _merge_totals(model, key_columns: List[str], totals: Dict[tuple, Dict[str, int]]) -> None:
+    """Portable read-modify-write fallback for databases without ON CONFLICT."""
+    for key, values in totals.items():
+        row = db.session.get(model, key)
+        if row is None:
+            db.session.add(model(**dict(zip(key_columns, key)), **values))
+        else:
+            for column, amount in values.items():
+                setattr(row, column, getattr(row, column) + amount)
+
+
+# Global aggregator instance, None when analytics are disabled
+_aggregator: Optional[UsageAggregator] = None
+
+
+def get_aggregator() -> Optional[UsageAggregator]:
+    """Get the aggregator, or None when analytics are disabled."""
+    return _aggregator
+
+
+def record_llm_latency(operation: str, seconds: float) -> None:
+    """Record an LLM call latency if analytics are enabled."""
+    if _aggregator is not None:
+        _aggregator.add_latency(operation, seconds)
+
+
+def flush_analytics() -> int:
+    """Flush buffered aggregates (requires an application context)."""
+    if _aggregator is None:
+        return 0
+    return _aggregator.flush()
+
+
+def _on_log_insert(mapper, connection, target: Log) -> None:
+    """Remember inserted log rows until their transaction commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append(
+            (target.timestamp or datetime.utcnow(), target.event_type, uuid.UUID(str(target.user_id)))
+        )
+
+
+def _on_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and _aggregator is not None:
+        _aggregator.add_events(pending)
+
+
+def _on_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_analytics(app: Flask) -> None:
+    """Install event hooks and schedule periodic flushes when enabled."""
+    global _aggregator
+
+    if not app.config.get('ANALYTICS_ENABLED'):
+        return
+
+    if _aggregator is None:
+        _aggregator = UsageAggregator()
+        event.listen(Log, 'after_insert', _on_log_insert)
+        event.listen(Session, 'after_commit', _on_commit)
+        event.listen(Session, 'after_soft_rollback', _on_rollback)
+
+        def flush_on_exit():
+            with app.app_context():
+                flush_analytics()
+
+        atexit.register(flush_on_exit)
+
+    schedule_flush(app, flush_analytics, 'analytics_flush', app.config['ANALYTICS_FLUSH_SECONDS'])
+
+
+def _bucket_start(hour: datetime, granularity: str) -> datetime:
+    return hour.replace(hour=0) if granularity == 'day' else hour
+
+
+def event_counts(start: datetime, end: datetime, granularity: str = 'hour',
+                 event_types: Optional[List[str]] = None,
+                 user_id: Optional[str] = None) -> List[dict]:
+    """
+    Get event counts per time bucket and event type.
+
+    Args:
+        start: Window start (inclusive, truncated to the hour)
+        end: Window end (exclusive)
+        granularity: 'hour' or 'day'
+        event_types: Restrict to these event types
+        user_id: Restrict to one user
+
+    Returns:
+        List of {'time', 'event_type', 'count'} ordered by time
+    """
+    query = select(
+        UsageHourly.hour, UsageHourly.event_type, func.sum(UsageHourly.count)
+    ).where(
+        UsageHourly.hour >= hour_floor(start),
+        UsageHourly.hour < end
+    ).group_by(UsageHourly.hour, UsageHourly.event_type)
+
+    if event_types:
+        query = query.where(UsageHourly.event_type.in_(event_types))
+    if user_id:
+        query = query.where(UsageHourly.user_id == uuid.UUID(str(user_id)))
+
+    series: Dict[Tuple[datetime, str], int] = defaultdict(int)
+    for hour, event_type, count in db.session.execute(query):
+        series[(_bucket_start(hour, granularity), event_type)] += int(count)
+
+    return [
+        {'time': time.isoformat(), 'event_type': event_type, 'count': count}
+        for (time, event_type), count in sorted(series.items())
+    ]
+
+
+def top_users(start: datetime, end: datetime, event_types: Optional[List[str]] = None,
+              limit: int = 20) -> List[dict]:
+    """Get the most active users in a window."""
+    total = func.sum(UsageHourly.count).label('total')
+    query = select(UsageHourly.user_id, total).where(
+        UsageHourly.hour >= hour_floor(start),
+        UsageHourly.hour < end
+    ).group_by(UsageHourly.user_id).order_by(total.desc()).limit(limit)
+
+    if event_types:
+        query = query.where(UsageHourly.event_type.in_(event_types))
+
+    return [
+        {'user_id': str(user_id), 'count': int(count)}
+        for user_id, count in db.session.execute(query)
+    ]
+
+
+def latency_percentiles(start: datetime, end: datetime,
+                        operation: Optional[str] = None) -> Dict[str, dict]:
+    """
+    Get LLM latency percentiles per operation from the hourly histograms.
+
+    Returns:
+        Mapping of operation to {'count', 'p50', 'p90', 'p95', 'p99'} in seconds
+    """
+    query = select(
+        LlmLatencyHourly.operation, LlmLatencyHourly.bucket, func.sum(LlmLatencyHourly.count)
+    ).where(
+        LlmLatencyHourly.hour >= hour_floor(start),
+        LlmLatencyHourly.hour < end
+    ).group_by(LlmLatencyHourly.operation, LlmLatencyHourly.bucket)
+
+    if operation:
+        query = query.where(LlmLatencyHourly.operation == operation)
+
+    histograms: Dict[str, Dict[int, int]] = defaultdict(dict)
+    for name, bucket, count in db.session.execute(query):
+        histograms[name][bucket] = int(count)
+
+    result = {}
+    for name, buckets in histograms.items():
+        summary = {'count': sum(buckets.values())}
+        for percentile in PERCENTILES:
+            summary[f'p{percentile}'] = percentile_from_histogram(buckets, percentile)
+        result[name] = summary
+    return result
+
+
+def parse_window(start: Optional[str], end: Optional[str],
+                 default: timedelta = timedelta(hours=24)) -> Tuple[datetime, datetime]:
+    """
+    Parse ISO start/end query values into a UTC window.
+
+    Raises:
+        ValueError: If a value is not an ISO timestamp or start is after end
+    """
+    end_time = _as_naive_utc(datetime.fromisoformat(end)) if end else datetime.utcnow()
+    start_time = _as_naive_utc(datetime.fromisoformat(start)) if start else end_time - default
+    if start_time > end_time:
+        raise ValueError("start must be before end")
+    return start_time, end_time
+
+
+def _as_naive_utc(moment: datetime) -> datetime:
+    """Convert an aware timestamp to naive UTC, matching stored timestamps."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,80 @@
+"""Prebuilt OpenAPI spec for the Swagger docs.
+
+flasgger builds /apispec.json by parsing the YAML in every view docstring,
+on the first request for it in each worker (and on every request in debug
+mode). ``flask apispec build`` runs that once and writes the result to
+API_SPEC_FILE together with a fingerprint of the routes and their
+docstrings. At startup a spec file whose fingerprint still matches the
+running code is loaded into flasgger's cache instead; a stale one is ignored.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any
+
+from flask import Flask
+
+
+logger = logging.getLogger(__name__)
+
+# flasgger endpoint serving the spec (see setup_swagger)
+SPEC_ENDPOINT = 'apispec'
+
+
+def spec_fingerprint(app: Flask) -> str:
+    """Digest of every route, its methods and its view docstrings."""
+    digest = hashlib.blake2b(digest_size=16)
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: (rule.rule, rule.endpoint)):
+        view = app.view_functions.get(rule.endpoint)
+        docs = [getattr(view, '__doc__', None) or '']
+        view_class = getattr(view, 'view_class', None)
+        if view_class is not None:
+            docs += [getattr(getattr(view_class, method.lower(), None), '__doc__', None) or ''
+                     for method in sorted(getattr(view_class, 'methods', None) or ())]
+        digest.update(json.dumps([rule.rule, rule.endpoint, sorted(rule.methods or ()), docs]).encode('utf-8'))
+    template = getattr(getattr(app, 'swag', None), 'template', None)
+    digest.update(json.dumps(template, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_spec_file(app: Flask, path: str) -> int:
+    """
+    Generate the spec and write it with the current fingerprint.
+
+    Returns:
+        Number of documented paths
+    """
+    with app.test_request_context():
+        spec = app.swag.get_apispecs(SPEC_ENDPOINT)
+        payload = app.json.dumps({'fingerprint': spec_fingerprint(app), 'spec': spec})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return len(spec.get('paths', {}))
+
+
+def load_prebuilt_spec(app: Flask, swagger: Any, path: str) -> bool:
+    """
+    Seed flasgger's spec cache from a prebuilt file if it matches the routes.
+
+    Returns:
+        True if the prebuilt spec is in use
+    """
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'rb') as f:
+            data = app.json.loads(f.read())
+    except Exception as e:
+        logger.error(f"Could not read API spec file {path}: {e}")
+        return False
+
+    if data.get('fingerprint') != spec_fingerprint(app):
+        logger.info(f"API spec file {path} is out of date; the spec will be generated on first request")
+        return False
+    swagger.apispecs[SPEC_ENDPOINT] = data['spec']
+    return True
@@ -0,0 +1,237 @@
+"""Application logging: queued handlers, rotation, JSON output, request ids and sampling.
+
+Loggers hand records to a QueueHandler on the root logger, which only
+enqueues them; a QueueListener thread does the formatting and the file and
+console I/O, so a slow disk never stalls a request thread. The queue is
+bounded (LOG_QUEUE_SIZE) and records arriving while it is full are dropped
+and counted rather than waited on.
+
+Every request gets an id (the client's X-Request-ID when it sends a sane
+one), echoed in the response and attached to each record it logs.
+LOG_SAMPLING keeps only a fraction of INFO and DEBUG records from chatty
+loggers; the decision is made per request id, so a request's records are
+kept or dropped together. Warnings and errors are never sampled.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from logging.handlers import WatchedFileHandler
+from typing import Dict, List, Optional
+
+from flask import Flask, g, has_request_context, request
+
+from llama_mindmap_backend.config import get_config
+
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s'
+JSON_FIELDS = '%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s'
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+# Installed queue handler and listener (None until setup_logging runs)
+_handler: Optional['DroppingQueueHandler'] = None
+_listener: Optional[QueueListener] = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id (or '-') to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = getattr(g, 'request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO and DEBUG records from selected loggers."""
+
+    def __init__(self, rates: Dict[str, float]):
+        """
+        Args:
+            rates: Fraction of records to keep by logger name; applies to child loggers too
+        """
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+        self.sampled_out = 0
+
+    def rate_for(self, name: str) -> float:
+        """Rate of the most specific configured logger covering name."""
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1:
+            return True
+        request_id = getattr(record, 'request_id', '-')
+        if request_id != '-':
+            keep = zlib.crc32(request_id.encode('utf-8')) % 10000 < rate * 10000
+        else:
+            keep = random.random() < rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """Parse 'logger.name:0.1,other:0.5' into {'logger.name': 0.1, 'other': 0.5}."""
+    rates = {}
+    for item in value.split(','):
+        if ':' in item:
+            name, rate = item.rsplit(':', 1)
+            try:
+                rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+            except ValueError:
+                logging.getLogger(__name__).warning(f"Ignoring invalid log sampling rate: {item}")
+    return rates
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == 'json':
+        try:
+            from pythonjsonlogger import jsonlogger
+        except ImportError:
+            logging.getLogger(__name__).warning("python-json-logger not installed - using text logs")
+        else:
+            return jsonlogger.JsonFormatter(
+                JSON_FIELDS,
+                rename_fields={'asctime': 'time', 'levelname': 'level', 'name': 'logger'},
+                json_ensure_ascii=False
+            )
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def _build_file_handler(config) -> logging.Handler:
+    directory = os.path.dirname(config.LOG_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if config.LOG_ROTATION == 'time':
+        return TimedRotatingFileHandler(
+            config.LOG_FILE, when=config.LOG_ROTATE_WHEN, backupCount=config.LOG_BACKUP_COUNT,
+            encoding='utf-8', delay=True
+        )
+    if config.LOG_ROTATION == 'watched':
+        # Rotated externally (logrotate); reopened when the file is moved
+        return WatchedFileHandler(config.LOG_FILE, encoding='utf-8', delay=True)
+    if config.LOG_ROTATION == 'none':
+        return logging.FileHandler(config.LOG_FILE, encoding='utf-8', delay=True)
+    return RotatingFileHandler(
+        config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True
+    )
+
+
+def setup_logging() -> None:
+    """Route the root logger through a queue to the configured handlers (once per process)."""
+    global _handler, _listener
+
+    if _listener is not None:
+        return
+
+    config = get_config()
+    formatter = _build_formatter(config.LOG_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if config.LOG_TO_FILE:
+        handlers.append(_build_file_handler(config))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _handler = DroppingQueueHandler(queue.Queue(config.LOG_QUEUE_SIZE))
+    _handler.addFilter(RequestIdFilter())
+    _handler.addFilter(SamplingFilter(parse_sampling(config.LOG_SAMPLING)))
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, config.LOG_LEVEL.upper(), logging.INFO))
+    root.addHandler(_handler)
+
+    _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_logging_after_fork() -> None:
+    """
+    Give a forked worker its own listener thread.
+
+    The parent's thread does not exist in the child, so records would pile up
+    in the inherited queue unwritten; the child starts over with a new queue.
+    """
+    global _listener
+
+    if _listener is None:
+        return
+    log_queue = queue.Queue(_handler.queue.maxsize)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def get_logging_stats() -> dict:
+    """Get queue depth and counts of dropped and sampled-out records."""
+    if _handler is None:
+        return {'enabled': False}
+    sampling = next((f for f in _handler.filters if isinstance(f, SamplingFilter)), None)
+    return {
+        'enabled': True,
+        'queued': _handler.queue.qsize(),
+        'queue_size': _handler.queue.maxsize,
+        'dropped': _handler.dropped,
+        'sampled_out': sampling.sampled_out if sampling else 0
+    }
+
+
+def init_request_ids(app: Flask) -> None:
+    """Give every request an id, taken from X-Request-ID when valid, and echo it back."""
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = getattr(g, 'request_id', None)
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
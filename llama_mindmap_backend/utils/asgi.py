@@ -0,0 +1,259 @@
+"""ASGI adapter: requests waiting on the LLM do not hold a thread.
+
+    uvicorn asgi:app                          # or GUNICORN_WORKER_CLASS=uvicorn
+
+Under a threaded WSGI server a request waiting on the LLM holds its thread
+(and, before llm_view, its database connection) for up to
+LLM_TIMEOUT_SECONDS, so open requests per process are capped by the thread
+count. AsyncLLMApp serves the same Flask app from an event loop: llm_view
+views (utils/llm_views.py) run their reads and writes on a small thread pool
+and are suspended in between, so waiting on the fair-share scheduler costs a
+coroutine. Provider calls still run on the scheduler's dispatch threads,
+bounded by LLM_DISPATCH_CONCURRENCY as before.
+
+All other requests run through the WSGI app unchanged on the same pool.
+Request and response bodies are buffered; the app streams nothing.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, List, Optional, Tuple
+
+from flask import Flask, request_started
+from werkzeug.exceptions import HTTPException
+
+from llama_mindmap_backend.utils.admission import configure_admission
+from llama_mindmap_backend.utils.llm_views import SuspendedView, dispatch_suspended
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """Translate an ASGI HTTP scope and its request body into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{name}"
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    # The body is already buffered (and de-chunked): describe it, not the client's framing
+    environ['CONTENT_LENGTH'] = str(len(body))
+    environ['wsgi.input_terminated'] = True
+    environ.pop('HTTP_TRANSFER_ENCODING', None)
+    return environ
+
+
+def call_wsgi(wsgi_app: Callable, environ: dict) -> Tuple[int, List[tuple], bytes]:
+    """
+    Run a WSGI app to completion.
+
+    Returns:
+        Tuple of (status code, ASGI header list, body)
+    """
+    started = {}
+    written = []
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+        return written.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(written) + b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in started['headers']]
+    return int(started['status'].split(' ', 1)[0]), headers, body
+
+
+class _SuspendableRequest:
+    """
+    One request to an llm_view view, dispatched in steps.
+
+    Mirrors Flask.wsgi_app/full_dispatch_request, except that the view is
+    returned suspended at each LLM call. Every step runs in the same
+    contextvars.Context (so the request context pushed in start() is current
+    again in whichever pool thread runs the next step), one at a time.
+    """
+
+    def __init__(self, app: Flask, environ: dict):
+        self.app = app
+        self.environ = environ
+        self.ctx = app.request_context(environ)
+        self.view: Optional[SuspendedView] = None
+        self.rv = None
+        self.result: Optional[Tuple[int, List[tuple], bytes]] = None
+        self.started = False
+
+    def start(self) -> Optional[Future]:
+        """Push the request context and run the view up to its first LLM call."""
+        self.ctx.push()
+        self.started = True
+        dispatch_suspended()
+        return self._step(self._dispatch)
+
+    def resume(self, result, error: Optional[BaseException]) -> Optional[Future]:
+        """Hand the view the outcome of its call and run it up to the next one."""
+        return self._step(self._advance, result, error)
+
+    def abandon(self) -> None:
+        """Close the view and the request context when the response will not be sent."""
+        if not self.started or self.result is not None:
+            return
+        try:
+            if self.view is not None:
+                self.view.close()
+        finally:
+            self.ctx.pop()
+
+    def _dispatch(self) -> Optional[Future]:
+        request_started.send(self.app, _async_wrapper=self.app.ensure_sync)
+        rv = self.app.preprocess_request()
+        if rv is None:
+            rv = self.app.dispatch_request()
+        if not isinstance(rv, SuspendedView):
+            # e.g. an automatic OPTIONS response
+            self.rv = rv
+            return None
+        self.view = rv
+        return self._advance()
+
+    def _advance(self, result=None, error: Optional[BaseException] = None) -> Optional[Future]:
+        future = self.view.advance(result, error)
+        if future is None:
+            self.rv = self.view.response
+        return future
+
+    def _step(self, func: Callable, *args) -> Optional[Future]:
+        error = None
+        try:
+            try:
+                future = func(*args)
+                if future is not None:
+                    return future
+                rv = self.rv
+            except Exception as e:
+                rv = self.app.handle_user_exception(e)
+            response = self.app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            response = self.app.handle_exception(e)
+
+        try:
+            # Same outer WSGI layers as every other response
+            compression = self.app.extensions.get('compression')
+            self.result = call_wsgi(compression.wrapping(response) if compression else response, self.environ)
+        finally:
+            if error is not None and self.app.should_ignore_error(error):
+                error = None
+            self.ctx.pop(error)
+        return None
+
+
+class AsyncLLMApp:
+    """ASGI application serving a Flask app; llm_view views wait without holding a thread."""
+
+    def __init__(self, app: Flask, threads: Optional[int] = None):
+        """
+        Args:
+            app: Application from create_app()
+            threads: Pool size for request work between waits (default: ASGI_THREADS)
+        """
+        self.flask_app = app
+        self.timeout = app.config['LLM_TIMEOUT_SECONDS']
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or app.config['ASGI_THREADS'], thread_name_prefix='asgi'
+        )
+        # A waiting request costs no thread, so far more may be admitted than under WSGI
+        configure_admission(app, app.config['ASGI_MAX_INFLIGHT_PER_PROCESS'])
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        environ = build_environ(scope, body)
+        if self._suspends(environ):
+            status, headers, payload = await self._run_suspendable(environ)
+        else:
+            loop = asyncio.get_running_loop()
+            status, headers, payload = await loop.run_in_executor(self.executor, call_wsgi, self.flask_app, environ)
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    def _suspends(self, environ: dict) -> bool:
+        """Whether the request is routed to an llm_view view."""
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        view = self.flask_app.view_functions.get(endpoint)
+        return getattr(view, 'suspends_on_llm', False)
+
+    async def _run_suspendable(self, environ: dict) -> Tuple[int, List[tuple], bytes]:
+        pending = _SuspendableRequest(self.flask_app, environ)
+        context = contextvars.copy_context()
+        step = self.executor.submit(context.run, pending.start)
+        try:
+            future = await asyncio.wrap_future(step)
+            while future is not None:
+                try:
+                    result, error = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout), None
+                except Exception as e:
+                    result, error = None, e
+                step = self.executor.submit(context.run, pending.resume, result, error)
+                future = await asyncio.wrap_future(step)
+        except asyncio.CancelledError:
+            # The server gave up on the request; clean up once the running step (if any) is done
+            step.add_done_callback(lambda _: self.executor.submit(context.run, pending.abandon))
+            raise
+        return pending.result
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> Optional[bytes]:
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
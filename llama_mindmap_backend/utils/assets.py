@@ -0,0 +1,233 @@
+"""Fingerprinted static assets with far-future caching.
+
+At startup every file under the static folder is hashed and given a
+fingerprinted name (css/style.css -> css/style.3f2a9c1b7e.css). Templates
+link to it through ``asset_url()``; since the URL changes whenever the
+content does, fingerprinted responses are sent with a one-year
+``Cache-Control: immutable``. Plain names keep working with ETag
+revalidation.
+
+Compressible files are served from ``<file>.br`` / ``<file>.gz`` written by
+``flask assets build`` when those are present and current, and are
+compressed in memory at startup otherwise.
+"""
+
+import logging
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, url_for
+
+from llama_mindmap_backend.utils.compression import available_encodings, compress, make_etag
+from llama_mindmap_backend.utils.page_cache import CachedPage, page_response
+
+
+logger = logging.getLogger(__name__)
+
+# Sidecar extension for each precompressed encoding
+SIDECAR_EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+    'application/manifest+json', 'font/ttf', 'font/otf', 'application/vnd.ms-fontobject'
+}
+
+# Files larger than this are streamed from disk instead of held in memory
+MAX_CACHED_SIZE = 1024 * 1024
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+@dataclass(frozen=True)
+class Asset:
+    """A static file, its fingerprinted name and (for small files) cached encodings."""
+    filename: str
+    fingerprinted: str
+    path: str
+    page: Optional[CachedPage]
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    """Whether a content type benefits from gzip/br."""
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def fingerprint_name(filename: str, digest: str) -> str:
+    """Insert a content digest before the extension: 'js/app.js' -> 'js/app.<digest>.js'."""
+    directory, base = os.path.split(filename)
+    stem, ext = os.path.splitext(base)
+    return os.path.join(directory, f"{stem}.{digest}{ext}").replace(os.sep, '/')
+
+
+def iter_static_files(static_folder: str) -> List[str]:
+    """Relative paths of the static files, excluding precompressed sidecars."""
+    files = []
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            if name.endswith(tuple(SIDECAR_EXTENSIONS.values())):
+                continue
+            files.append(os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, '/'))
+    return sorted(files)
+
+
+def _read_variant(path: str, encoding: str, body: bytes) -> bytes:
+    """Use a sidecar written by 'flask assets build' if it is current, else compress now."""
+    sidecar = path + SIDECAR_EXTENSIONS[encoding]
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(path):
+        with open(sidecar, 'rb') as f:
+            return f.read()
+    return compress(body, encoding)
+
+
+class AssetManifest:
+    """Map of logical and fingerprinted static names to assets."""
+
+    def __init__(self, static_folder: str, encodings=None):
+        """
+        Args:
+            static_folder: Directory to scan
+            encodings: Content-encodings to offer (defaults to all available)
+        """
+        self.static_folder = static_folder
+        self.encodings = available_encodings() if encodings is None else list(encodings)
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, Asset] = {}
+        self._by_fingerprint: Dict[str, Asset] = {}
+
+    def scan(self) -> int:
+        """
+        Hash every static file and prepare its cached encodings.
+
+        Returns:
+            Number of assets found
+        """
+        by_name, by_fingerprint = {}, {}
+        if os.path.isdir(self.static_folder):
+            for filename in iter_static_files(self.static_folder):
+                asset = self._load(filename)
+                by_name[filename] = asset
+                by_fingerprint[asset.fingerprinted] = asset
+        with self._lock:
+            self._by_name, self._by_fingerprint = by_name, by_fingerprint
+        return len(by_name)
+
+    def _load(self, filename: str) -> Asset:
+        path = os.path.join(self.static_folder, filename)
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = make_etag(body)
+        fingerprinted = fingerprint_name(filename, etag[:10])
+
+        page = None
+        if len(body) <= MAX_CACHED_SIZE:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            variants = {}
+            if is_compressible(mimetype) and len(body) >= MIN_COMPRESS_SIZE:
+                for encoding in self.encodings:
+                    encoded = _read_variant(path, encoding, body)
+                    if len(encoded) < len(body):
+                        variants[encoding] = (encoded, make_etag(body, encoding))
+            page = CachedPage(body=body, etag=etag, mimetype=mimetype, variants=variants)
+        return Asset(filename=filename, fingerprinted=fingerprinted, path=path, page=page)
+
+    def url_name(self, filename: str) -> str:
+        """Fingerprinted name for a static file, or the name itself if unknown."""
+        asset = self._by_name.get(filename)
+        return asset.fingerprinted if asset else filename
+
+    def lookup(self, name: str) -> Optional[tuple]:
+        """
+        Resolve a requested name.
+
+        Returns:
+            (asset, True if the name was fingerprinted), or None if unknown
+        """
+        asset = self._by_fingerprint.get(name)
+        if asset is not None:
+            return asset, True
+        asset = self._by_name.get(name)
+        return (asset, False) if asset is not None else None
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+def build_precompressed(static_folder: str, encodings=None) -> Dict[str, int]:
+    """
+    Write .br/.gz sidecars next to compressible static files.
+
+    Returns:
+        Counts of 'files' written and 'saved' bytes compared to the originals
+    """
+    counts = {'files': 0, 'saved': 0}
+    for filename in iter_static_files(static_folder):
+        mimetype = mimetypes.guess_type(filename)[0]
+        path = os.path.join(static_folder, filename)
+        if not is_compressible(mimetype) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        for encoding in encodings or available_encodings():
+            encoded = compress(body, encoding)
+            sidecar = path + SIDECAR_EXTENSIONS[encoding]
+            if len(encoded) >= len(body):
+                if os.path.exists(sidecar):
+                    os.remove(sidecar)
+                continue
+            with open(sidecar, 'wb') as f:
+                f.write(encoded)
+            counts['files'] += 1
+            counts['saved'] += len(body) - len(encoded)
+    return counts
+
+
+# Global manifest; None when fingerprinting is off
+_manifest: Optional[AssetManifest] = None
+_max_age = 31536000
+
+
+def get_asset_manifest() -> Optional[AssetManifest]:
+    """Get the asset manifest, or None if fingerprinting is disabled."""
+    return _manifest
+
+
+def asset_url(filename: str, **kwargs) -> str:
+    """url_for('static', ...) that links to the fingerprinted file when available."""
+    name = _manifest.url_name(filename) if _manifest is not None else filename
+    return url_for('static', filename=name, **kwargs)
+
+
+def serve_asset(app: Flask, filename: str) -> Response:
+    """Serve a static file, with immutable caching for fingerprinted names."""
+    match = _manifest.lookup(filename) if _manifest is not None else None
+    if match is None:
+        # Added after startup, or fingerprinting disabled
+        return app.send_static_file(filename)
+
+    asset, fingerprinted = match
+    cache_control = f"public, max-age={_max_age}, immutable" if fingerprinted else 'no-cache'
+    if asset.page is None:
+        response = app.send_static_file(asset.filename)
+        response.headers['Cache-Control'] = cache_control
+        return response
+    return page_response(asset.page, cache_control=cache_control)
+
+
+def init_assets(app: Flask) -> None:
+    """Fingerprint static files and expose asset_url() to templates."""
+    global _manifest, _max_age
+
+    _max_age = app.config['ASSET_MAX_AGE_SECONDS']
+    app.add_template_global(asset_url)
+
+    # Files change under a debug server, so only fingerprint fixed deployments
+    if not app.config['ASSET_FINGERPRINT_ENABLED'] or app.debug or not app.static_folder:
+        return
+
+    _manifest = AssetManifest(app.static_folder)
+    count = _manifest.scan()
+    logger.info(f"Fingerprinted {count} static files")
@@ -0,0 +1,215 @@
+"""Offline pre-generation of popular topics into the response store.
+
+Used by ``flask cache warm``. Topics come from recent conversation_created
+logs (or a file), generations run on a bounded thread pool behind a rate
+limiter, and each result is written to generated_responses as soon as it
+arrives. Pairs already in the store are skipped, so an interrupted run can
+simply be started again.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import GeneratedResponse, Log
+from llama_mindmap_backend.utils.llama_api import (
+    GenerationFailed, generate_analysis, generate_breakdown, generate_subtopics, generate_subtopics_batch
+)
+from llama_mindmap_backend.utils.token_usage import attribute_usage
+from llama_mindmap_backend.utils.topic_index import normalize_topic, save_response
+
+
+logger = logging.getLogger(__name__)
+
+# Generator for each stored kind; raises GenerationFailed rather than
+# returning placeholders, which must never end up in the store
+GENERATORS: Dict[str, Callable] = {
+    'expand': generate_subtopics,
+    'steps': generate_breakdown,
+    'analysis': generate_analysis
+}
+
+# Kinds that can generate several topics per provider call (failed topics are left out)
+PACKED_GENERATORS: Dict[str, Callable] = {
+    'expand': generate_subtopics_batch
+}
+
+
+class RateLimiter:
+    """Spaces calls evenly at a maximum rate, shared between threads."""
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: Calls per second (0 disables limiting)
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the next call may start."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def popular_topics(limit: int = 100, days: int = 30) -> List[str]:
+    """
+    Get the most common root topics of recent conversations.
+
+    Topics are grouped by normalized key, and each group is represented by its
+    most frequent spelling.
+
+    Args:
+        limit: Number of topics to return
+        days: How far back to look in the logs
+
+    Returns:
+        Topics, most popular first
+    """
+    root_topic = Log.event_data['root_topic'].as_string()
+    rows = db.session.execute(
+        select(root_topic, func.count().label('uses'))
+        .where(Log.event_type == 'conversation_created')
+        .where(Log.timestamp >= datetime.utcnow() - timedelta(days=days))
+        .where(root_topic.isnot(None))
+        .group_by(root_topic)
+        .order_by(func.count().desc())
+        # Spelling variants are merged below, so read past the limit
+        .limit(limit * 5)
+    ).all()
+
+    totals: Counter = Counter()
+    spellings: Dict[str, Counter] = defaultdict(Counter)
+    for topic, uses in rows:
+        topic = topic.strip()
+        if not topic:
+            continue
+        key = normalize_topic(topic)
+        totals[key] += uses
+        spellings[key][topic] += uses
+
+    return [spellings[key].most_common(1)[0][0] for key, _ in totals.most_common(limit)]
+
+
+def read_topics(path: str) -> List[str]:
+    """Read one topic per line, ignoring blank lines and '#' comments."""
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
+
+
+def pending_work(topics: Iterable[str], kinds: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    Get the (topic, kind) pairs not yet in the response store.
+
+    Topics sharing a normalized key are only generated once.
+    """
+    by_key: Dict[str, str] = {}
+    for topic in topics:
+        by_key.setdefault(normalize_topic(topic), topic)
+    if not by_key:
+        return []
+
+    kinds = list(kinds)
+    stored = set()
+    keys = list(by_key)
+    for start in range(0, len(keys), 500):
+        stored.update(db.session.execute(
+            select(GeneratedResponse.topic_key, GeneratedResponse.kind)
+            .where(GeneratedResponse.topic_key.in_(keys[start:start + 500]))
+            .where(GeneratedResponse.kind.in_(kinds))
+        ).all())
+
+    return [(topic, kind) for key, topic in by_key.items() for kind in kinds if (key, kind) not in stored]
+
+
+def make_jobs(work: List[Tuple[str, str]], pack_size: int) -> List[Tuple[str, List[str]]]:
+    """Group pairs into (kind, topics) jobs, packing kinds that support it."""
+    jobs = []
+    packable: Dict[str, List[str]] = defaultdict(list)
+    for topic, kind in work:
+        if kind in PACKED_GENERATORS and pack_size > 1:
+            packable[kind].append(topic)
+        else:
+            jobs.append((kind, [topic]))
+    for kind, topics in packable.items():
+        jobs.extend((kind, topics[start:start + pack_size]) for start in range(0, len(topics), pack_size))
+    return jobs
+
+
+def warm_topics(work: List[Tuple[str, str]], workers: int = 4, rate: float = 1.0, pack_size: int = 1,
+                progress: Optional[Callable[[int, int, int, str], None]] = None) -> Dict[str, int]:
+    """
+    Generate and store results for (topic, kind) pairs.
+
+    LLM calls run on a thread pool; results are written from the calling
+    thread, which must have an application context.
+
+    Args:
+        work: Pairs from pending_work()
+        workers: Concurrent LLM calls
+        rate: Maximum LLM calls started per second (0 for unlimited)
+        pack_size: Topics per call for kinds that support packing
+        progress: Called as progress(done, failed, total, label) after each pair
+
+    Returns:
+        Counts of 'stored' and 'failed' pairs; a pair the provider failed on is
+        not stored, so the next run retries it
+    """
+    limiter = RateLimiter(rate)
+    counts = {'stored': 0, 'failed': 0}
+
+    def generate(kind: str, topics: List[str]) -> Dict[str, object]:
+        limiter.wait()
+        with attribute_usage('system', 'cache_warm'):
+            if len(topics) > 1:
+                return PACKED_GENERATORS[kind](topics)
+            try:
+                return {topics[0]: GENERATORS[kind](topics[0])}
+            except GenerationFailed:
+                return {}
+
+    queue = iter(make_jobs(work, pack_size))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-warm') as pool:
+        pending = {}
+
+        def refill() -> None:
+            # Keep only a couple of calls per worker queued, so Ctrl-C stops quickly
+            while len(pending) < workers * 2:
+                job = next(queue, None)
+                if job is None:
+                    return
+                pending[pool.submit(generate, *job)] = job
+
+        refill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, topics = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to warm {kind} for {topics}: {e}")
+                    results = {}
+                for topic in topics:
+                    stored = topic in results and save_response(kind, topic, results[topic])
+                    counts['stored' if stored else 'failed'] += 1
+                    if progress:
+                        progress(counts['stored'], counts['failed'], len(work), f"{kind}: {topic}")
+            refill()
+
+    return counts
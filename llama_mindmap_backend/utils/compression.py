@@ -0,0 +1,265 @@
+"""Content-encoding helpers and response compression middleware.
+
+gzip is always available; Brotli ('br') is used when the optional ``brotli``
+package is installed. Negotiation follows Accept-Encoding q-values and
+prefers br over gzip when the client rates them equally.
+
+CompressionMiddleware compresses complete (Content-Length) responses of the
+configured types on the fly; streamed responses and bodies that are already
+encoded pass through untouched.
+"""
+
+import copy
+import gzip
+import hashlib
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from flask import Flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress data with a content-encoding.
+
+    Args:
+        data: Raw body
+        encoding: 'br' or 'gzip'
+        level: Compression level (defaults to the maximum, for bodies compressed once)
+
+    Returns:
+        Encoded body
+    """
+    if encoding == 'br':
+        if brotli is None:
+            raise ValueError("brotli is not installed")
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and so the ETag, identical across processes
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """
+    Pick the content-encoding to send.
+
+    Args:
+        accept_encoding: Accept-Encoding request header
+        available: Encodings on offer, most preferred first
+
+    Returns:
+        Chosen encoding, or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def make_etag(data: bytes, suffix: str = '') -> str:
+    """Strong ETag value (without quotes) for a body, optionally tagged with its encoding."""
+    digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+    return f"{digest}-{suffix}" if suffix else digest
+
+
+class CompressionStats:
+    """Thread-safe counters for on-the-fly response compression."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.skipped_small = 0
+        self.skipped_ratio = 0
+        self.streamed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.by_encoding = {}
+
+    def record(self, encoding: str, size_in: int, size_out: int, cpu_seconds: float) -> None:
+        """Record one compressed response."""
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+            self.cpu_seconds += cpu_seconds
+            self.by_encoding[encoding] = self.by_encoding.get(encoding, 0) + 1
+
+    def count(self, name: str) -> None:
+        """Count a response that was left uncompressed ('skipped_small', 'skipped_ratio' or 'streamed')."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_stats(self) -> dict:
+        """Get counters, overall ratio and average CPU time per compressed response."""
+        return {
+            'compressed': self.compressed,
+            'skipped_small': self.skipped_small,
+            'skipped_ratio': self.skipped_ratio,
+            'streamed': self.streamed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'avg_cpu_ms': round(self.cpu_seconds / self.compressed * 1000, 3) if self.compressed else None,
+            'by_encoding': dict(self.by_encoding)
+        }
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing large responses of selected content types."""
+
+    def __init__(self, app: Callable, mimetypes: Iterable[str] = ('application/json',), min_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4, stats: Optional[CompressionStats] = None):
+        """
+        Args:
+            app: WSGI application to wrap
+            mimetypes: Content types to compress (parameters such as charset are ignored)
+            min_size: Smallest body worth compressing, in bytes
+            gzip_level: gzip level (1-9)
+            brotli_quality: Brotli quality (0-11); on-the-fly work favours speed
+            stats: Counters to update
+        """
+        self.app = app
+        self.mimetypes = {mimetype.strip().lower() for mimetype in mimetypes if mimetype.strip()}
+        self.min_size = min_size
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self.encodings = available_encodings()
+        self.stats = stats or CompressionStats()
+
+    def wrapping(self, app: Callable) -> 'CompressionMiddleware':
+        """The same middleware, settings and counters around another WSGI app."""
+        wrapped = copy.copy(self)
+        wrapped.app = app
+        return wrapped
+
+    def _eligible(self, status: str, headers: list) -> bool:
+        if not status.startswith('200'):
+            return False
+        values = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in values or 'no-transform' in values.get('cache-control', '').lower():
+            return False
+        mimetype = values.get('content-type', '').split(';')[0].strip().lower()
+        return mimetype in self.mimetypes
+
+    def __call__(self, environ: dict, start_response: Callable):
+        encoding = negotiate_encoding(environ.get('HTTP_ACCEPT_ENCODING'), self.encodings)
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        state = {'passthrough': False}
+        written: List[bytes] = []
+
+        def capture(status, headers, exc_info=None):
+            if state['passthrough'] or not self._eligible(status, headers):
+                state['passthrough'] = True
+                return start_response(status, headers, exc_info)
+            if not any(name.lower() == 'content-length' for name, _ in headers):
+                # Streamed body: sending it as it is produced matters more than its size
+                self.stats.count('streamed')
+                state['passthrough'] = True
+                return start_response(status, headers, exc_info)
+            state['response'] = (status, headers)
+            return written.append
+
+        result = self.app(environ, capture)
+        if 'response' not in state:
+            state['passthrough'] = True
+            return result
+
+        try:
+            body = b''.join(written) + b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        status, headers = state['response']
+        if len(body) < self.min_size:
+            self.stats.count('skipped_small')
+            start_response(status, headers)
+            return [body]
+
+        started = time.thread_time()
+        encoded = compress(body, encoding, self.levels[encoding])
+        cpu_seconds = time.thread_time() - started
+        if len(encoded) >= len(body):
+            self.stats.count('skipped_ratio')
+            start_response(status, headers)
+            return [body]
+        self.stats.record(encoding, len(body), len(encoded), cpu_seconds)
+
+        new_headers, vary = [], []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'vary':
+                vary.append(value)
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                # The encoded body differs byte for byte; only weak validation still holds
+                value = f"W/{value}"
+            new_headers.append((name, value))
+        vary.append('Accept-Encoding')
+        new_headers += [
+            ('Content-Encoding', encoding),
+            ('Content-Length', str(len(encoded))),
+            ('Vary', ', '.join(vary))
+        ]
+        start_response(status, new_headers)
+        return [encoded]
+
+
+# Global counters for the installed middleware
+_stats = CompressionStats()
+
+
+def get_compression_stats() -> CompressionStats:
+    """Get response compression counters."""
+    return _stats
+
+
+def init_compression(app: Flask) -> None:
+    """Wrap the WSGI app with response compression when enabled."""
+    if not app.config['COMPRESSION_ENABLED']:
+        return
+    app.wsgi_app = app.extensions['compression'] = CompressionMiddleware(
+        app.wsgi_app,
+        mimetypes=app.config['COMPRESSION_MIMETYPES'].split(','),
+        min_size=app.config['COMPRESSION_MIN_SIZE'],
+        gzip_level=app.config['COMPRESSION_GZIP_LEVEL'],
+        brotli_quality=app.config['COMPRESSION_BROTLI_QUALITY'],
+        stats=_stats
+    )
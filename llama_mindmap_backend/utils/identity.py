@@ -0,0 +1,86 @@
+"""Per-request and short-lived cross-request cache of user identities."""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask, g, has_request_context
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import User
+from llama_mindmap_backend.utils.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Read-only snapshot of a user row, safe to share between sessions."""
+    id: uuid.UUID
+    username: str
+    email: str
+    profile_data: Optional[dict]
+    created_at: datetime
+
+
+# Global cache instance; entries are snapshots, never ORM objects
+_user_cache = TTLCache(maxsize=10000, ttl=60)
+
+
+def init_identity_cache(app: Flask) -> None:
+    """Size the user cache from application configuration."""
+    global _user_cache
+    _user_cache = TTLCache(
+        maxsize=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['USER_CACHE_TTL_SECONDS']
+    )
+
+
+def get_cached_user(user_id) -> Optional[CachedUser]:
+    """
+    Get a user snapshot, hitting the database only on a cache miss.
+
+    Lookups are memoized on flask.g for the rest of the request and kept in a
+    process-wide TTL cache between requests. Other processes see changes once
+    their entry expires (USER_CACHE_TTL_SECONDS).
+
+    Args:
+        user_id: User id as UUID or string (e.g. the JWT identity)
+
+    Returns:
+        CachedUser, or None if the user does not exist
+    """
+    try:
+        key = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+    request_cache = g.setdefault('_identity_cache', {}) if has_request_context() else {}
+    if key in request_cache:
+        return request_cache[key]
+
+    user = _user_cache.get(key)
+    if user is None:
+        row = db.session.get(User, key)
+        if row is not None:
+            user = CachedUser(
+                id=row.id,
+                username=row.username,
+                email=row.email,
+                profile_data=row.profile_data,
+                created_at=row.created_at
+            )
+            _user_cache.set(key, user)
+
+    request_cache[key] = user
+    return user
+
+
+def invalidate_user(user_id) -> None:
+    """Drop a user from the caches after it changed."""
+    try:
+        key = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+    except ValueError:
+        return
+    _user_cache.pop(key)
+    if has_request_context():
+        g.get('_identity_cache', {}).pop(key, None)
@@ -0,0 +1,100 @@
+"""Flask JSON provider backed by orjson, with a stdlib fallback.
+
+Routes can put UUIDs, datetimes and database rows in responses as they are:
+UUIDs become strings, dates and datetimes ISO 8601 strings (as
+``.isoformat()`` would produce), result rows (``Row``) objects and mapped
+model instances dicts of their columns. A model can keep columns out of its
+JSON form with a ``__json_exclude__`` tuple.
+
+orjson is used when installed; values it cannot encode (such as integers
+beyond 64 bits) fall back to the stdlib encoder for that response.
+"""
+
+import json
+import uuid
+from datetime import date, datetime, time
+from typing import Any, Union
+
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import NoInspectionAvailable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_default(o: Any) -> Any:
+    """
+    Convert values the JSON encoders do not know into encodable ones.
+
+    Raises:
+        TypeError: If the value has no JSON form
+    """
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Row):
+        return o._asdict()
+    try:
+        mapper = inspect(type(o))
+    except NoInspectionAvailable:
+        mapper = None
+    if mapper is not None and hasattr(mapper, 'column_attrs'):
+        exclude = getattr(o, '__json_exclude__', ())
+        return {attr.key: getattr(o, attr.key) for attr in mapper.column_attrs if attr.key not in exclude}
+    # Decimal, dataclasses and __html__ objects, as Flask's provider handles them
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider using orjson when available."""
+
+    default = staticmethod(encode_default)
+
+    def _orjson_options(self, indent: bool) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dump_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except TypeError:
+                pass
+        return json.dumps(
+            obj, default=self.default, ensure_ascii=self.ensure_ascii, sort_keys=self.sort_keys,
+            indent=2 if indent else None, separators=None if indent else (',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize to a JSON string (keyword arguments force the stdlib encoder)."""
+        if kwargs:
+            kwargs.setdefault('default', self.default)
+            return json.dumps(obj, **kwargs)
+        return self._dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize JSON (keyword arguments force the stdlib decoder)."""
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Build a JSON response without a str round trip; pretty-printed in debug mode."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._dump_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app: Flask) -> None:
+    """Install the fast JSON provider on the application."""
+    app.json = FastJSONProvider(app)
@@ -1,26 +1,80 @@
 """Simplified Hugging Face API client for LLM operations."""
 
 import os
+import re
+import json
 import time
 import logging
 import requests
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from llama_mindmap_backend.utils.analytics import record_llm_latency
+from llama_mindmap_backend.utils.llm_scheduler import get_scheduler
+from llama_mindmap_backend.utils.token_usage import get_token_tracker, record_token_usage
 
 
 logger = logging.getLogger(__name__)
 
+# Reasoning models (e.g. DeepSeek-R1) prefix answers with <think>...</think>;
+# an unterminated block means the answer was cut off while still thinking
+_THINK_RE = re.compile(r'<think>.*?(</think>|$)', re.DOTALL | re.IGNORECASE)
+
+# A bulleted or numbered line of a free-text list
+_LIST_ITEM_RE = re.compile(r'^(?:[•*-]|\d+[.)])\s*')
+
+
+def strip_think(text: str) -> Tuple[str, int]:
+    """
+    Remove reasoning blocks from a model response.
+
+    Returns:
+        Tuple of (cleaned text, number of characters removed)
+    """
+    cleaned = _THINK_RE.sub('', text).strip()
+    return cleaned, len(text.strip()) - len(cleaned)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for providers that do not report usage."""
+    return max(1, len(text) // 4)
+
+
+class GenerationFailed(Exception):
+    """
+    The provider gave no usable result.
+
+    Callers may answer the request with a fallback_* placeholder, but must not
+    store it for reuse.
+    """
+
 
 @dataclass
 class APIStats:
     """API usage statistics."""
     total_calls: int = 0
     total_response_time: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    think_chars_stripped: int = 0
+    structured_calls: int = 0
+    structured_parse_failures: int = 0
+    repairs: int = 0
+    repairs_completed: int = 0
+    repair_tokens: int = 0
+    tokens_saved: int = 0
+    packed_calls: int = 0
+    packed_topics: int = 0
+    packed_fallbacks: int = 0
     
     @property
     def average_response_time(self) -> float:
         """Calculate average response time."""
         return self.total_response_time / self.total_calls if self.total_calls > 0 else 0.0
+    
+    @property
+    def repair_rate(self) -> float:
+        """Fraction of structured list calls that needed a repair prompt."""
+        return self.repairs / self.structured_calls if self.structured_calls > 0 else 0.0
 
 
 class HuggingFaceClient:
@@ -38,22 +92,34 @@ class HuggingFaceClient:
         self.token = os.getenv('HUGGINGFACE_TOKEN', '')
         self.provider = os.getenv('HUGGINGFACE_PROVIDER', 'together')
         self.model = os.getenv('HUGGINGFACE_MODEL', 'deepseek-ai/DeepSeek-R1')
+        self.api_url = os.getenv('HUGGINGFACE_API_URL', 'https://router.huggingface.co/v1/chat/completions')
         self.timeout = int(os.getenv('HF_TIMEOUT_SECONDS', '30'))
+        self.structured_output = os.getenv('LLM_STRUCTURED_OUTPUT', 'false').lower() == 'true'
+        self.pack_size = max(1, int(os.getenv('LLM_PACK_SIZE', '5')))
         self.max_retries = 3
     
-    def make_request(self, prompt: str, max_tokens: int = 200) -> str:
+    def make_request(self, prompt: str, max_tokens: int = 200, operation: str = 'generate') -> str:
         """
         Make request to Hugging Face API.
         
         Args:
             prompt: Input prompt for the model
             max_tokens: Maximum tokens to generate
+            operation: Operation name used for latency analytics
             
         Returns:
-            Generated text response
+            Generated text response, without reasoning blocks
         """
-        url = "https://router.huggingface.co/v1/chat/completions"
+        return self.request_with_usage(prompt, max_tokens, operation)[0]
+    
+    def request_with_usage(self, prompt: str, max_tokens: int = 200,
+                           operation: str = 'generate') -> Tuple[str, int]:
+        """
+        Make request to Hugging Face API and report completion tokens.
         
+        Returns:
+            Tuple of (generated text without reasoning blocks, completion tokens)
+        """
         headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
@@ -71,15 +137,26 @@ class HuggingFaceClient:
             try:
                 start_time = time.time()
                 
-                response = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
+                response = requests.post(self.api_url, json=payload, headers=headers, timeout=self.timeout)
                 
                 duration = time.time() - start_time
                 self.stats.total_calls += 1
                 self.stats.total_response_time += duration
+                record_llm_latency(operation, duration)
                 
                 response.raise_for_status()
                 data = response.json()
-                return data["choices"][0]["message"]["content"].strip()
+                raw = data["choices"][0]["message"]["content"] or ''
+                usage = data.get("usage") or {}
+                prompt_tokens = usage.get("prompt_tokens") or estimate_tokens(prompt)
+                completion_tokens = usage.get("completion_tokens") or estimate_tokens(raw)
+                self.stats.prompt_tokens += prompt_tokens
+                self.stats.completion_tokens += completion_tokens
+                record_token_usage(self.model, operation, prompt_tokens, completion_tokens, duration)
+                
+                content, stripped = strip_think(raw)
+                self.stats.think_chars_stripped += stripped
+                return content, completion_tokens
                 
             except requests.exceptions.Timeout:
                 if attempt == self.max_retries - 1:
@@ -98,10 +175,8 @@ class HuggingFaceClient:
                     raise Exception(f"API error: {e}")
                 time.sleep(1 * (attempt + 1))
     
-    def parse_list_response(self, response: str, expected_count: int = 5) -> List[str]:
-        """Parse response into list of items."""
-        import re
-        
+    def clean_lines(self, response: str) -> List[str]:
+        """Split a free-text response into items, stripping bullets and numbering."""
         lines = [line.strip() for line in response.strip().split('\n') if line.strip()]
         
         cleaned_lines = []
@@ -111,11 +186,189 @@ class HuggingFaceClient:
             
             if line:
                 cleaned_lines.append(line)
+        return cleaned_lines
+    
+    def parse_list_response(self, response: str, expected_count: int = 5) -> List[str]:
+        """
+        Parse a free-text response into up to expected_count items.
         
-        while len(cleaned_lines) < expected_count:
-            cleaned_lines.append(f"Additional item {len(cleaned_lines) + 1}")
+        When some lines are bulleted or numbered only those are items, so a
+        preamble ("Sure, here you go:") or closing remark is dropped; otherwise
+        lines ending in a colon are taken as headings and skipped. A short
+        list is returned as is, never padded.
+        """
+        lines = [line.strip() for line in response.strip().split('\n') if line.strip()]
+        if any(_LIST_ITEM_RE.match(line) for line in lines):
+            lines = [line for line in lines if _LIST_ITEM_RE.match(line)]
+        else:
+            lines = [line for line in lines if not line.endswith(':')]
+        return self.clean_lines('\n'.join(lines))[:expected_count]
+    
+    def parse_json_list(self, response: str) -> Optional[List[str]]:
+        """
+        Parse a JSON array of strings out of a response.
+        
+        Accepts a bare array, an array wrapped in prose or a code fence, or an
+        object with an "items" array. Blank and duplicate items are dropped.
+        
+        Returns:
+            List of items, or None if no JSON array was found
+        """
+        start, end = response.find('['), response.rfind(']')
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(response[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(data, list):
+            return None
+        return self.clean_items(data)
+    
+    def clean_items(self, data: list) -> List[str]:
+        """Normalize decoded JSON items into unique, non-blank strings."""
+        items = []
+        seen = set()
+        for item in data:
+            if isinstance(item, dict):
+                item = next((value for value in item.values() if isinstance(value, str)), None)
+            if not isinstance(item, (str, int, float)):
+                continue
+            text = re.sub(r'\s+', ' ', str(item)).strip().lstrip('•-*').strip()
+            if text and text.lower() not in seen:
+                seen.add(text.lower())
+                items.append(text[:300])
+        return items
+    
+    def generate_list(self, prompt: str, topic: str, kind: str, expected_count: int = 5,
+                      max_tokens: int = 200, operation: str = 'generate') -> List[str]:
+        """
+        Generate a list of items, as JSON in structured mode or free text otherwise.
+        
+        In structured mode a short item is completed with one repair prompt
+        asking only for the missing items, rather than padding with
+        placeholders or regenerating the whole list.
         
-        return cleaned_lines[:expected_count]
+        Args:
+            prompt: Free-text prompt (structured mode appends its own output rules)
+            topic: Task the list is about, used in the repair prompt
+            kind: What an item is, e.g. 'sub-tasks' or 'steps'
+            expected_count: Number of items wanted
+            max_tokens: Maximum tokens for the full list
+            operation: Operation name used for analytics
+            
+        Returns:
+            expected_count items in free-text mode; up to expected_count in structured mode
+            
+        Raises:
+            Exception: If the API fails, no item could be parsed, or a free-text list is short
+        """
+        if not self.structured_output:
+            response = self.make_request(
+                f"{prompt}\n\nReturn exactly {expected_count} {kind}, one per line, without numbering or bullet points.",
+                max_tokens=max_tokens, operation=operation
+            )
+            items = self.parse_list_response(response, expected_count)
+            if len(items) < expected_count:
+                # Not padded: placeholders would be stored and reused like real items
+                raise ValueError(f"Only {len(items)} of {expected_count} {kind} in response")
+            return items
+        
+        self.stats.structured_calls += 1
+        response, full_tokens = self.request_with_usage(
+            f"{prompt}\n\nRespond with only a JSON array of exactly {expected_count} strings, one per item, "
+            f"and no other text.",
+            max_tokens=max_tokens, operation=operation
+        )
+        items = self.parse_json_list(response)
+        if items is None:
+            self.stats.structured_parse_failures += 1
+            items = [line for line in self.clean_lines(response) if not line.startswith(('[', ']', '`'))]
+        items = items[:expected_count]
+        
+        missing = expected_count - len(items)
+        if missing > 0 and items:
+            self.stats.repairs += 1
+            existing = json.dumps(items, ensure_ascii=False)
+            repair_prompt = (
+                f"Task: {topic}\n"
+                f"These {kind} already exist: {existing}\n"
+                f"Give {missing} more distinct {kind} for the task that are not in that list. "
+                f"Respond with only a JSON array of {missing} strings."
+            )
+            repair_budget = max(40, max_tokens * missing // expected_count + 20)
+            try:
+                repair, repair_tokens = self.request_with_usage(
+                    repair_prompt, max_tokens=repair_budget, operation=f"{operation}_repair"
+                )
+                self.stats.repair_tokens += repair_tokens
+                # A full regeneration would have cost about as much as the first response
+                self.stats.tokens_saved += max(0, full_tokens - repair_tokens)
+                seen = {item.lower() for item in items}
+                for item in self.parse_json_list(repair) or []:
+                    if item.lower() not in seen and len(items) < expected_count:
+                        seen.add(item.lower())
+                        items.append(item)
+                if len(items) == expected_count:
+                    self.stats.repairs_completed += 1
+            except Exception as e:
+                logger.warning(f"Repair prompt failed for '{topic}': {e}")
+        
+        if not items:
+            raise ValueError("No items in structured response")
+        return items
+
+
+    def parse_json_object(self, response: str) -> Optional[dict]:
+        """Parse the outermost JSON object out of a response, or None."""
+        start, end = response.find('{'), response.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            data = json.loads(response[start:end + 1])
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    
+    def expand_packed(self, topics: List[str], expected_count: int = 5) -> Dict[str, List[str]]:
+        """
+        Expand several topics with a single request.
+        
+        Topics are keyed t1..tN in the prompt and the model is asked for one
+        JSON object mapping each key to its sub-tasks. Topics whose list is
+        missing or short are left out of the result so the caller can retry
+        them individually.
+        
+        Args:
+            topics: Topics to expand (at most pack_size is sensible)
+            expected_count: Sub-tasks per topic
+            
+        Returns:
+            Dict of topic to sub-tasks for the topics that parsed completely
+        """
+        keys = {f"t{i}": topic for i, topic in enumerate(topics, 1)}
+        listing = '\n'.join(f"{key}: {topic}" for key, topic in keys.items())
+        prompt = f"""Break down each of the following tasks into exactly {expected_count} smaller, actionable sub-tasks.
+Each sub-task must be distinct, specific, and contribute to completing its task.
+
+Tasks:
+{listing}
+
+Respond with only a JSON object mapping each task key to an array of exactly {expected_count} strings,
+for example {{"t1": ["...", "..."]}}, and no other text."""
+        
+        self.stats.packed_calls += 1
+        self.stats.packed_topics += len(topics)
+        response = self.make_request(prompt, max_tokens=200 * len(topics) + 50, operation='expand_packed')
+        data = self.parse_json_object(response) or {}
+        
+        results = {}
+        for key, topic in keys.items():
+            value = data.get(key)
+            items = self.clean_items(value) if isinstance(value, list) else []
+            if len(items) >= expected_count:
+                results[topic] = items[:expected_count]
+        return results
 
 
 # Global client instance
@@ -130,58 +383,149 @@ def get_client() -> HuggingFaceClient:
     return _client
 
 
-def expand_topic(topic: str) -> List[str]:
-    """Expand topic into subtopics."""
+def reset_client() -> None:
+    """Drop the global client so the next call creates a fresh one (e.g. in a forked worker)."""
+    global _client
+    _client = None
+
+
+def fallback_subtopics(topic: str) -> List[str]:
+    """Placeholder subtopics for when the provider fails (never stored for reuse)."""
+    return [
+        f"Research and planning for {topic}",
+        f"Preparation and setup for {topic}",
+        f"Implementation of {topic}",
+        f"Testing and validation of {topic}",
+        f"Completion and review of {topic}"
+    ]
+
+
+def fallback_steps(topic: str) -> List[str]:
+    """Placeholder steps for when the provider fails (never stored for reuse)."""
+    return [
+        f"Plan and research {topic}",
+        f"Gather necessary resources for {topic}",
+        f"Begin implementation of {topic}",
+        f"Complete the main work for {topic}",
+        f"Review and finalize {topic}"
+    ]
+
+
+def fallback_analysis(topic: str) -> str:
+    """Placeholder analysis for when the provider fails (never stored for reuse)."""
+    return f"Analysis of {topic}: This task requires systematic approach and careful execution."
+
+
+def generate_subtopics(topic: str) -> List[str]:
+    """
+    Expand topic into subtopics.
+    
+    Raises:
+        GenerationFailed: If the provider gave no usable result
+    """
     client = get_client()
     
     prompt = f"""Break down the following task into exactly 5 smaller, actionable sub-tasks.
 Each sub-task must be distinct, specific, and contribute to completing the main task.
 
-Task: {topic}
-
-Return exactly 5 sub-tasks, one per line, without numbering or bullet points."""
+Task: {topic}"""
 
     try:
-        response = client.make_request(prompt, max_tokens=200)
-        return client.parse_list_response(response, 5)
+        return client.generate_list(prompt, topic, 'sub-tasks', 5, max_tokens=200, operation='expand')
     except Exception as e:
         logger.error(f"Expand topic failed for '{topic}': {e}")
-        return [
-            f"Research and planning for {topic}",
-            f"Preparation and setup for {topic}",
-            f"Implementation of {topic}",
-            f"Testing and validation of {topic}",
-            f"Completion and review of {topic}"
-        ]
+        raise GenerationFailed(f"Expand topic failed: {e}") from e
+
+
+def pack_topics(topics: List[str]) -> List[List[str]]:
+    """
+    Split distinct topics into packs of up to LLM_PACK_SIZE.
+    
+    A trailing single topic is returned as a pack of one, to be expanded
+    with generate_subtopics.
+    """
+    pack_size = get_client().pack_size
+    unique = list(dict.fromkeys(topics))
+    return [unique[start:start + pack_size] for start in range(0, len(unique), pack_size)]
+
+
+def generate_subtopics_packed(topics: List[str]) -> Dict[str, List[str]]:
+    """
+    Expand several topics with a single request.
+    
+    Returns:
+        Dict of topic to subtopics for the topics the response covered; the
+        rest are counted as packing fallbacks for the caller to expand singly
+        
+    Raises:
+        GenerationFailed: If the request failed
+    """
+    client = get_client()
+    try:
+        results = client.expand_packed(topics, 5)
+    except Exception as e:
+        logger.error(f"Packed expand failed for {len(topics)} topics: {e}")
+        client.stats.packed_fallbacks += len(topics)
+        raise GenerationFailed(f"Packed expand failed: {e}") from e
+    client.stats.packed_fallbacks += len(topics) - len(results)
+    return results
+
 
+def generate_subtopics_batch(topics: List[str]) -> Dict[str, List[str]]:
+    """
+    Expand several topics in the calling thread, packing them per request.
+    
+    Topics the packed response did not cover are expanded one by one. Views
+    schedule each of these calls separately instead (see utils/llm_views.py).
+    
+    Returns:
+        Dict of topic to subtopics for each distinct topic that was generated;
+        topics the provider failed on are left out
+    """
+    results: Dict[str, List[str]] = {}
+    for pack in pack_topics(topics):
+        if len(pack) > 1:
+            try:
+                results.update(generate_subtopics_packed(pack))
+            except GenerationFailed:
+                pass
+        for topic in pack:
+            if topic not in results:
+                try:
+                    results[topic] = generate_subtopics(topic)
+                except GenerationFailed:
+                    pass
+    return results
 
-def breakdown_topic(topic: str) -> List[str]:
-    """Break down topic into actionable steps."""
+
+def generate_breakdown(topic: str) -> List[str]:
+    """
+    Break down topic into actionable steps.
+    
+    Raises:
+        GenerationFailed: If the provider gave no usable result
+    """
     client = get_client()
     
     prompt = f"""Create exactly 5 clear, actionable steps to complete the following task.
 Each step should be practical and easy to follow.
 
-Task: {topic}
-
-Return exactly 5 steps, one per line, without numbering or bullet points."""
+Task: {topic}"""
 
     try:
-        response = client.make_request(prompt, max_tokens=250)
-        return client.parse_list_response(response, 5)
+        return client.generate_list(prompt, topic, 'steps', 5, max_tokens=250, operation='breakdown')
     except Exception as e:
         logger.error(f"Breakdown topic failed for '{topic}': {e}")
-        return [
-            f"Plan and research {topic}",
-            f"Gather necessary resources for {topic}",
-            f"Begin implementation of {topic}",
-            f"Complete the main work for {topic}",
-            f"Review and finalize {topic}"
-        ]
+        raise GenerationFailed(f"Breakdown topic failed: {e}") from e
 
 
-def analyze_topic(topic: str) -> str:
-    """Provide analysis of a topic."""
+def generate_analysis(topic: str) -> str:
+    """
+    Provide analysis of a topic.
+    
+    Raises:
+        GenerationFailed: If the provider failed or returned nothing
+    """
     client = get_client()
     
     prompt = f"""Analyze the following task in no more than 100 words.
@@ -192,18 +536,20 @@ Task: {topic}
 Return a single paragraph analysis."""
 
     try:
-        response = client.make_request(prompt, max_tokens=150)
-        return response.strip() or f"Analysis of {topic}: This task requires careful planning and execution."
+        response = client.make_request(prompt, max_tokens=150, operation='analyze')
     except Exception as e:
         logger.error(f"Analyze topic failed for '{topic}': {e}")
-        return f"Analysis of {topic}: This task requires systematic approach and careful execution."
+        raise GenerationFailed(f"Analyze topic failed: {e}") from e
+    if not response.strip():
+        raise GenerationFailed("Empty analysis")
+    return response.strip()
 
 
 def test_api_connection() -> bool:
     """Test API connection."""
     try:
         client = get_client()
-        result = client.make_request("Respond with 'connection test successful'", max_tokens=30)
+        result = client.make_request("Respond with 'connection test successful'", max_tokens=30, operation='test')
         return "successful" in result.lower() or "connection" in result.lower()
     except Exception as e:
         logger.error(f"API connection test failed: {e}")
@@ -222,7 +568,28 @@ def get_api_stats() -> dict:
             "endpoint": "Hugging Face Inference Providers",
             "model": client.model,
             "provider": client.provider,
-            "token_configured": bool(client.token)
+            "token_configured": bool(client.token),
+            "prompt_tokens": client.stats.prompt_tokens,
+            "completion_tokens": client.stats.completion_tokens,
+            "think_chars_stripped": client.stats.think_chars_stripped,
+            "structured_output": {
+                "enabled": client.structured_output,
+                "calls": client.stats.structured_calls,
+                "parse_failures": client.stats.structured_parse_failures,
+                "repairs": client.stats.repairs,
+                "repairs_completed": client.stats.repairs_completed,
+                "repair_rate": client.stats.repair_rate,
+                "repair_tokens": client.stats.repair_tokens,
+                "tokens_saved": client.stats.tokens_saved
+            },
+            "packing": {
+                "pack_size": client.pack_size,
+                "calls": client.stats.packed_calls,
+                "topics": client.stats.packed_topics,
+                "fallbacks": client.stats.packed_fallbacks
+            },
+            "token_usage": get_token_tracker().get_stats(),
+            "scheduler": get_scheduler().get_stats()
         }
     except Exception:
         return {
@@ -230,5 +597,6 @@ def get_api_stats() -> dict:
             "total_response_time": 0.0,
             "average_response_time": 0.0,
             "using_huggingface": False,
-            "error": "Client not initialized"
+            "error": "Client not initialized",
+            "scheduler": get_scheduler().get_stats()
         }
\ No newline at end of file
@@ -0,0 +1,410 @@
+"""Per-user fair-share scheduling of LLM work.
+
+Routes submit LLM calls tagged with a user key instead of calling
+``utils/llama_api.py`` directly. Each user has a bounded FIFO queue, and a
+fixed pool of dispatcher threads picks the next call with deficit round
+robin: every time a user's queue comes up it earns ``quantum * weight``
+credits and may dispatch one call per credit. A user bulk-expanding a huge
+map therefore only gets their share of provider concurrency while other
+users' single clicks are interleaved.
+
+Calls are also tagged with a lane. Interactive calls (a user waiting on a
+click) are always dispatched before queued background calls (prefetch, cache
+warming, bulk generation), and background calls may never occupy the
+dispatcher threads reserved for the interactive lane. When the background
+queue overflows, its oldest calls are cancelled instead of refusing new ones.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from flask import Flask, has_request_context, request
+
+from llama_mindmap_backend.utils.admission import AdmissionRejected, rate_limit_key
+from llama_mindmap_backend.utils.token_usage import attribute_usage, check_token_budget
+
+
+logger = logging.getLogger(__name__)
+
+# Number of recent queue-wait samples kept for percentiles
+WAIT_SAMPLES = 1000
+
+# Dispatch lanes, highest priority first
+LANE_INTERACTIVE = 'interactive'
+LANE_BACKGROUND = 'background'
+LANES = (LANE_INTERACTIVE, LANE_BACKGROUND)
+
+
+class UserQueueFull(AdmissionRejected):
+    """Raised when a user already has the maximum number of queued LLM calls."""
+    status = 429
+
+
+class LLMTask:
+    """A queued LLM call."""
+
+    __slots__ = ('user_key', 'lane', 'func', 'args', 'kwargs', 'future', 'context', 'enqueued_at')
+
+    def __init__(self, user_key: str, lane: str, func: Callable, args: tuple, kwargs: dict):
+        self.user_key = user_key
+        self.lane = lane
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        # Run with the submitter's context variables (e.g. usage attribution)
+        self.context = contextvars.copy_context()
+        self.enqueued_at = time.monotonic()
+
+
+def _percentile(samples: list, percentile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+    return ordered[index]
+
+
+class _Lane:
+    """Per-user queues of one lane, served by deficit round robin."""
+
+    def __init__(self, quantum: float):
+        self.quantum = quantum
+        self.queues: Dict[str, Deque[LLMTask]] = {}
+        self.weights: Dict[str, float] = {}
+        self.deficit: Dict[str, float] = defaultdict(float)
+        self.active: Deque[str] = deque()
+        self.queued = 0
+        self.running = 0
+        self.submitted = 0
+        self.dispatched = 0
+        self.rejected = 0
+        self.preempted = 0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def push(self, task: LLMTask, weight: float) -> None:
+        queue = self.queues.get(task.user_key)
+        if queue is None:
+            queue = self.queues[task.user_key] = deque()
+            self.active.append(task.user_key)
+        queue.append(task)
+        self.weights[task.user_key] = max(weight, 0.01)
+        self.queued += 1
+        self.submitted += 1
+
+    def pop(self) -> LLMTask:
+        """Pick the next task by deficit round robin."""
+        while True:
+            user_key = self.active[0]
+            if self.deficit[user_key] < 1:
+                self.deficit[user_key] += self.quantum * self.weights[user_key]
+                if self.deficit[user_key] < 1:
+                    self.active.rotate(-1)
+                    continue
+
+            task = self.queues[user_key].popleft()
+            self.deficit[user_key] -= 1
+            self._after_remove(user_key)
+            if user_key in self.queues and self.deficit[user_key] < 1:
+                self.active.rotate(-1)
+            return task
+
+    def pop_oldest(self) -> LLMTask:
+        """Remove the longest-waiting task, whichever user it belongs to."""
+        user_key = min(self.queues, key=lambda key: self.queues[key][0].enqueued_at)
+        task = self.queues[user_key].popleft()
+        self._after_remove(user_key)
+        return task
+
+    def discard(self, task: LLMTask) -> bool:
+        """Remove a task that is still waiting (e.g. cancelled by its caller)."""
+        queue = self.queues.get(task.user_key)
+        if queue is None or task not in queue:
+            return False
+        queue.remove(task)
+        self._after_remove(task.user_key)
+        return True
+
+    def _after_remove(self, user_key: str) -> None:
+        self.queued -= 1
+        if not self.queues[user_key]:
+            # Idle users do not bank credits
+            del self.queues[user_key]
+            self.deficit.pop(user_key, None)
+            self.active.remove(user_key)
+
+
+class FairShareScheduler:
+    """Deficit round robin over per-user queues, in priority lanes, with a fixed dispatch pool."""
+
+    def __init__(self, concurrency: int = 4, max_queue_per_user: int = 5, quantum: float = 1.0,
+                 retry_after: int = 5, interactive_reserved: int = 1, max_background_queue: int = 100):
+        """
+        Args:
+            concurrency: Dispatcher threads, i.e. LLM calls in flight at once
+            max_queue_per_user: Interactive calls a single user may have waiting
+            quantum: Credits granted per round to a user of weight 1
+            retry_after: Retry-After value sent when a user's queue is full
+            interactive_reserved: Dispatcher threads background calls may never use
+            max_background_queue: Background calls kept waiting before the oldest are cancelled
+        """
+        self.concurrency = concurrency
+        self.max_queue_per_user = max_queue_per_user
+        self.retry_after = retry_after
+        # Always leave background work at least one thread
+        self.interactive_reserved = max(0, min(interactive_reserved, concurrency - 1))
+        self.max_background_queue = max_background_queue
+
+        self._cond = threading.Condition()
+        self._lanes: Dict[str, _Lane] = {lane: _Lane(quantum) for lane in LANES}
+        self._threads: list = []
+        self._user_waits: Dict[str, Deque[float]] = {}
+
+    def submit(self, user_key: str, func: Callable, *args, weight: float = 1.0,
+               lane: str = LANE_INTERACTIVE, **kwargs) -> Future:
+        """
+        Queue an LLM call for a user.
+
+        Args:
+            user_key: Fairness key (user id, or client IP for anonymous calls)
+            func: Function performing the LLM call
+            weight: Share of dispatch slots relative to weight-1 users
+            lane: LANE_INTERACTIVE or LANE_BACKGROUND
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            Future resolved with func's result. Background futures may be
+            cancelled if the call is preempted before it starts; cancelling
+            the future of a waiting call removes it from the queue.
+
+        Raises:
+            UserQueueFull: If the user already has max_queue_per_user interactive calls waiting
+        """
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+        self._ensure_started()
+        task = LLMTask(user_key, lane, func, args, kwargs)
+        preempted = []
+
+        with self._cond:
+            queues = self._lanes[lane]
+            if lane == LANE_INTERACTIVE:
+                queue = queues.queues.get(user_key)
+                if queue is not None and len(queue) >= self.max_queue_per_user:
+                    queues.rejected += 1
+                    raise UserQueueFull("Too many queued LLM requests for this user", self.retry_after)
+            queues.push(task, weight)
+            while lane == LANE_BACKGROUND and queues.queued > self.max_background_queue:
+                preempted.append(queues.pop_oldest())
+                queues.preempted += 1
+            self._cond.notify()
+
+        for old in preempted:
+            old.future.cancel()
+        # A caller that gives up (timeout) frees its queue slot right away
+        task.future.add_done_callback(lambda future: future.cancelled() and self._discard(task))
+        return task.future
+
+    def _discard(self, task: LLMTask) -> None:
+        with self._cond:
+            self._lanes[task.lane].discard(task)
+
+    def run(self, user_key: str, func: Callable, *args, weight: float = 1.0,
+            lane: str = LANE_INTERACTIVE, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Submit a call and wait for its result."""
+        return self.submit(user_key, func, *args, weight=weight, lane=lane, **kwargs).result(timeout=timeout)
+
+    def _next_task(self) -> Optional[LLMTask]:
+        """Pick the next dispatchable task, if any (caller holds the lock)."""
+        interactive = self._lanes[LANE_INTERACTIVE]
+        if interactive.active:
+            return interactive.pop()
+
+        background = self._lanes[LANE_BACKGROUND]
+        if background.active and background.running < self.concurrency - self.interactive_reserved:
+            return background.pop()
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task()
+                lane = self._lanes[task.lane]
+                self._record_wait(task, time.monotonic() - task.enqueued_at)
+                lane.running += 1
+                lane.dispatched += 1
+
+            try:
+                if task.future.set_running_or_notify_cancel():
+                    try:
+                        result = task.context.run(task.func, *task.args, **task.kwargs)
+                    except BaseException as e:
+                        task.future.set_exception(e)
+                    else:
+                        task.future.set_result(result)
+            finally:
+                with self._cond:
+                    lane.running -= 1
+                    if task.lane == LANE_BACKGROUND:
+                        # A background slot freed up; an idle worker may take it
+                        self._cond.notify()
+
+    def _record_wait(self, task: LLMTask, wait: float) -> None:
+        self._lanes[task.lane].waits.append(wait)
+        if task.lane != LANE_INTERACTIVE:
+            return
+        samples = self._user_waits.get(task.user_key)
+        if samples is None:
+            samples = self._user_waits[task.user_key] = deque(maxlen=100)
+        samples.append(wait)
+
+    def _ensure_started(self) -> None:
+        """Start dispatcher threads on first use (and again after a fork)."""
+        if len(self._threads) == self.concurrency and all(t.is_alive() for t in self._threads):
+            return
+        with self._cond:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.concurrency:
+                thread = threading.Thread(
+                    target=self._worker, name=f'llm-dispatch-{len(self._threads)}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def get_stats(self, top_users: int = 10) -> dict:
+        """Get queue depth and queue-wait metrics per lane."""
+        with self._cond:
+            lanes = {}
+            for name, lane in self._lanes.items():
+                waits = list(lane.waits)
+                lanes[name] = {
+                    'running': lane.running,
+                    'queued': lane.queued,
+                    'queued_users': len(lane.queues),
+                    'submitted': lane.submitted,
+                    'dispatched': lane.dispatched,
+                    'rejected': lane.rejected,
+                    'preempted': lane.preempted,
+                    'queue_wait_p50': round(_percentile(waits, 50), 4),
+                    'queue_wait_p95': round(_percentile(waits, 95), 4),
+                    'queue_wait_max': round(max(waits), 4) if waits else 0.0
+                }
+            queued = {
+                user: len(queue) for user, queue in self._lanes[LANE_INTERACTIVE].queues.items()
+            }
+            user_waits = {
+                user: round(_percentile(list(samples), 95), 4)
+                for user, samples in self._user_waits.items()
+            }
+
+        busiest = sorted(queued.items(), key=lambda item: item[1], reverse=True)[:top_users]
+        slowest = sorted(user_waits.items(), key=lambda item: item[1], reverse=True)[:top_users]
+        return {
+            'concurrency': self.concurrency,
+            'interactive_reserved': self.interactive_reserved,
+            'lanes': lanes,
+            'busiest_queues': dict(busiest),
+            'user_queue_wait_p95': dict(slowest)
+        }
+
+
+def parse_tier_weights(value: str) -> Dict[str, float]:
+    """Parse 'free:1,pro:4' into {'free': 1.0, 'pro': 4.0}."""
+    weights = {}
+    for item in value.split(','):
+        if ':' in item:
+            tier, weight = item.split(':', 1)
+            try:
+                weights[tier.strip()] = float(weight)
+            except ValueError:
+                logger.warning(f"Ignoring invalid tier weight: {item}")
+    return weights
+
+
+# Global scheduler instance and tier weights
+_scheduler = FairShareScheduler()
+_tier_weights: Dict[str, float] = {}
+
+
+def get_scheduler() -> FairShareScheduler:
+    """Get the global scheduler."""
+    return _scheduler
+
+
+def init_llm_scheduler(app: Flask) -> None:
+    """Create the global scheduler from application configuration."""
+    global _scheduler, _tier_weights
+    _scheduler = FairShareScheduler(
+        concurrency=app.config['LLM_DISPATCH_CONCURRENCY'],
+        max_queue_per_user=app.config['LLM_USER_QUEUE_DEPTH'],
+        retry_after=app.config['LLM_ADMISSION_RETRY_AFTER'],
+        interactive_reserved=app.config['LLM_INTERACTIVE_RESERVED'],
+        max_background_queue=app.config['LLM_BACKGROUND_QUEUE_SIZE']
+    )
+    _tier_weights = parse_tier_weights(app.config['LLM_TIER_WEIGHTS'])
+
+
+def user_weight(user_id: Optional[str]) -> float:
+    """Get a user's scheduling weight from the 'tier' in their profile."""
+    default = _tier_weights.get('default', 1.0)
+    if not user_id:
+        return default
+
+    from llama_mindmap_backend.utils.identity import get_cached_user
+
+    user = get_cached_user(user_id)
+    tier = (user.profile_data or {}).get('tier') if user else None
+    return _tier_weights.get(tier, default) if tier else default
+
+
+def request_identity() -> tuple:
+    """
+    Get the fairness key and user id for the current request.
+
+    Returns:
+        Tuple of ('user:<id>' or 'ip:<address>', user id or None)
+    """
+    key = rate_limit_key()
+    return key, key[len('user:'):] if key.startswith('user:') else None
+
+
+def current_endpoint() -> str:
+    """Endpoint name that LLM usage is attributed to."""
+    return (request.endpoint or request.path) if has_request_context() else 'background'
+
+
+def submit_llm_task(user_key: str, func: Callable, *args, lane: str = LANE_BACKGROUND,
+                    user_id: Optional[str] = None, endpoint: Optional[str] = None, **kwargs) -> Future:
+    """
+    Queue an LLM call and return without waiting for it.
+
+    Views wait on the future through LLMCall (utils/llm_views.py); prefetch
+    and bulk work keep it.
+
+    Args:
+        user_key: Fairness key for the queue
+        func: LLM function from utils/llama_api.py
+        lane: LANE_INTERACTIVE when a user is waiting on the result, else LANE_BACKGROUND
+        user_id: Authenticated user id used to look up the tier weight and token budget
+        endpoint: Name token usage is attributed to (default: the current Flask endpoint)
+        *args, **kwargs: Arguments for func
+
+    Returns:
+        Future resolved with func's result, or cancelled if preempted
+
+    Raises:
+        TokenBudgetExceeded: If the user's daily token budget is used up
+        UserQueueFull: If the user's interactive queue is full
+    """
+    check_token_budget(user_key, user_id)
+    weight = user_weight(user_id)
+    with attribute_usage(user_key, endpoint or current_endpoint()):
+        return _scheduler.submit(user_key, func, *args, weight=weight, lane=lane, **kwargs)
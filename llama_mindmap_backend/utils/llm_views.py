@@ -0,0 +1,204 @@
+"""Views that wait on the LLM without holding a database connection.
+
+An LLM-bound view is written as a generator: it does its reads, yields an
+``LLMCall`` for each provider call it needs, receives the result at the
+``yield`` (or the call's exception raised there) and then writes and
+returns its response as usual::
+
+    @bp.route('/nodes/<node_id>/steps', methods=['POST'])
+    @jwt_required()
+    @llm_view
+    def generate_steps(node_id):
+        node = ...
+        steps = yield LLMCall(
+            f"user:{user_id}", generate_breakdown, node.content, lane=LANE_INTERACTIVE, user_id=user_id
+        )
+        ...
+        return jsonify(...)
+
+The database session is closed while the call is pending, so its
+connection goes back to the pool for the (possibly minutes long) wait and a
+new one is checked out only to persist the result. Objects loaded before the
+``yield`` are detached by then: read their loaded attributes, but persist
+through queries rather than by modifying them.
+
+Expanding several topics takes one call per pack and one per topic a pack
+missed; ``yield from expand_in_packs(...)`` makes each its own call, so each
+is queued and timed out separately.
+
+Under a WSGI server the view is driven to completion in its request thread.
+Under asgi.py (see utils/asgi.py) it is returned suspended, and the event
+loop awaits the call without holding a thread at all.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import wraps
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from flask import current_app
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.utils.admission import get_admission_controller
+from llama_mindmap_backend.utils.llama_api import (
+    GenerationFailed, generate_subtopics, generate_subtopics_packed, pack_topics
+)
+from llama_mindmap_backend.utils.llm_scheduler import submit_llm_task
+
+
+# Set while utils/asgi.py dispatches a request: views are returned suspended
+_suspend = contextvars.ContextVar('llm_view_suspend', default=False)
+
+# Raised by the driver when a call outlives LLM_TIMEOUT_SECONDS (distinct types before Python 3.11)
+_TIMEOUTS = (TimeoutError, FutureTimeoutError, asyncio.TimeoutError)
+
+
+class LLMCall:
+    """An LLM call a view waits on."""
+
+    __slots__ = ('user_key', 'func', 'args', 'kwargs', 'lane', 'user_id')
+
+    def __init__(self, user_key: str, func: Callable, *args, lane: str, user_id: Optional[str] = None, **kwargs):
+        """
+        Args:
+            user_key: Fairness key for the scheduler queue
+            func: LLM function from utils/llama_api.py
+            lane: LANE_INTERACTIVE when a user is waiting on the result, else LANE_BACKGROUND
+            user_id: Authenticated user id (tier weight and token budget)
+            *args, **kwargs: Arguments for func
+        """
+        self.user_key = user_key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.lane = lane
+        self.user_id = user_id
+
+    def submit(self) -> Future:
+        """Queue the call on the fair-share scheduler (needs the request context)."""
+        return submit_llm_task(
+            self.user_key, self.func, *self.args, lane=self.lane, user_id=self.user_id, **self.kwargs
+        )
+
+
+def expand_in_packs(user_key: str, topics: List[str], lane: str,
+                    user_id: Optional[str] = None) -> Generator[LLMCall, Any, Dict[str, List[str]]]:
+    """
+    Expand topics from a view, one LLMCall per pack and per topic a pack missed.
+
+    Use as ``generated = yield from expand_in_packs(...)``.
+
+    Returns:
+        Dict of topic to subtopics for each distinct topic that was generated;
+        topics the provider failed on are left out
+    """
+    results: Dict[str, List[str]] = {}
+    for pack in pack_topics(topics):
+        if len(pack) > 1:
+            try:
+                results.update((yield LLMCall(
+                    user_key, generate_subtopics_packed, pack, lane=lane, user_id=user_id
+                )))
+            except GenerationFailed:
+                pass
+        for topic in pack:
+            if topic not in results:
+                try:
+                    results[topic] = yield LLMCall(
+                        user_key, generate_subtopics, topic, lane=lane, user_id=user_id
+                    )
+                except GenerationFailed:
+                    pass
+    return results
+
+
+class SuspendedView:
+    """An LLM-bound view paused at the call it waits on."""
+
+    def __init__(self, steps: Generator):
+        self._steps = steps
+        self.response = None
+
+    def advance(self, result: Any = None, error: Optional[BaseException] = None) -> Optional[Future]:
+        """
+        Resume the view until it waits on its next LLM call or returns.
+
+        Runs in the request context. Exceptions the view does not handle
+        propagate to the caller. A call that timed out is raised inside the
+        view as GenerationFailed, so it is answered like any provider failure.
+
+        Args:
+            result: Result of the call the view waits on
+            error: Exception the call failed with, raised inside the view
+
+        Returns:
+            Future of the next call, or None once the view has returned (see response)
+        """
+        if isinstance(error, _TIMEOUTS):
+            error = GenerationFailed("LLM call timed out")
+        while True:
+            try:
+                call = self._steps.send(result) if error is None else self._steps.throw(error)
+            except StopIteration as done:
+                self.response = done.value
+                return None
+            try:
+                future = call.submit()
+            except Exception as e:
+                # Budget or per-user queue limits: the view answers these itself
+                result, error = None, e
+                continue
+            # Nothing is written across the wait; hand the connection back
+            db.session.close()
+            return future
+
+    def close(self) -> None:
+        """Abandon the view (e.g. the client went away); releases its admission slot."""
+        self._steps.close()
+
+
+def _admitted(steps: Generator) -> Generator:
+    # Entered on the first advance, after the view's decorators (e.g. jwt_required) ran
+    with get_admission_controller().admit():
+        return (yield from steps)
+
+
+def run_to_completion(view: SuspendedView) -> Any:
+    """Drive a view in the calling thread, blocking on each LLM call."""
+    timeout = current_app.config['LLM_TIMEOUT_SECONDS']
+    future = view.advance()
+    while future is not None:
+        try:
+            result, error = future.result(timeout=timeout), None
+        except FutureTimeoutError as e:
+            # Like asyncio.wait_for under utils/asgi.py: drop the call if it has not started
+            future.cancel()
+            result, error = None, e
+        except Exception as e:
+            result, error = None, e
+        future = view.advance(result, error)
+    return view.response
+
+
+def llm_view(view):
+    """
+    Decorate a generator view that yields LLMCall objects.
+
+    The view runs under admission control like llm_bound views. Under a WSGI
+    server it is driven to completion here; while utils/asgi.py dispatches it,
+    the suspended view is returned for the event loop to drive.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        suspended = SuspendedView(_admitted(view(*args, **kwargs)))
+        if _suspend.get():
+            return suspended
+        return run_to_completion(suspended)
+    wrapper.suspends_on_llm = True
+    return wrapper
+
+
+def dispatch_suspended() -> contextvars.Token:
+    """Have llm_view views in the current context return SuspendedView (used by utils/asgi.py)."""
+    return _suspend.set(True)
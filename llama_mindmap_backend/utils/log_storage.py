@@ -0,0 +1,273 @@
+"""Time-partitioned storage, retention and daily rollups for the logs table.
+
+On Postgres ``logs`` is a native range-partitioned table with one partition
+per month (``logs_YYYY_MM``) plus a default partition. On other databases
+(SQLite) ``logs`` holds the current month and closed months are moved into
+``logs_YYYY_MM`` archive tables. In both cases retention drops whole months
+once every row in them is older than LOG_RETENTION_DAYS, after rolling each
+day up into ``log_daily_summaries``.
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import Column, MetaData, Table, delete, func, insert, inspect, literal, select, text
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import Log, LogDailySummary
+from llama_mindmap_backend.utils.scheduler import exclusive_job, schedule_job
+
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PATTERN = re.compile(r'^logs_(\d{4})_(\d{2})$')
+DEFAULT_PARTITION = 'logs_default'
+
+
+def month_start(day: date) -> date:
+    """Get the first day of the month containing day."""
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    """Shift a first-of-month date by count months."""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Get the partition/archive table name for a month."""
+    return f"logs_{month.year:04d}_{month.month:02d}"
+
+
+def list_partitions() -> List[date]:
+    """List months that have a partition or archive table, oldest first."""
+    months = []
+    for name in inspect(db.engine).get_table_names():
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _is_postgres() -> bool:
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _is_partitioned() -> bool:
+    """Check whether logs was created as a partitioned table."""
+    result = db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'logs'"
+    ))
+    return result.first() is not None
+
+
+def _archive_table(name: str) -> Table:
+    """Build a Table with the logs columns (without constraints) under another name."""
+    return Table(name, MetaData(), *[
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in Log.__table__.columns
+    ])
+
+
+def _source_table(day: date) -> Table:
+    """Get the table holding raw rows for day."""
+    if not _is_postgres():
+        name = partition_name(month_start(day))
+        if inspect(db.engine).has_table(name):
+            return _archive_table(name)
+    return Log.__table__
+
+
+def ensure_partitions(months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Create Postgres partitions for the current month and months_ahead more.
+
+    Does nothing on other databases, where archive tables are created when a
+    month is closed.
+
+    Returns:
+        Names of partitions that were checked or created
+    """
+    if not _is_postgres():
+        return []
+
+    if not inspect(db.engine).has_table(Log.__tablename__):
+        # Created later with its default partition (see models/log.py)
+        return []
+    if not _is_partitioned():
+        logger.warning("logs is not a partitioned table - recreate it to enable partitioning")
+        return []
+
+    if months_ahead is None:
+        months_ahead = current_app.config['LOG_PARTITION_MONTHS_AHEAD']
+    first = month_start(today or datetime.utcnow().date())
+
+    names = []
+    for offset in range(months_ahead + 1):
+        month = add_months(first, offset)
+        name = partition_name(month)
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        names.append(name)
+
+    db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF logs DEFAULT"))
+    db.session.commit()
+    return names
+
+
+def rollup_day(day: date) -> int:
+    """
+    Aggregate one day of raw logs into log_daily_summaries.
+
+    Existing summary rows for the day are replaced, so re-running is safe.
+    A day without raw rows (e.g. already dropped by retention) keeps its
+    summary rows untouched.
+
+    Args:
+        day: UTC day to aggregate
+
+    Returns:
+        Number of summary rows written
+    """
+    source = _source_table(day)
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    in_day = (source.c.timestamp >= start) & (source.c.timestamp < end)
+
+    if db.session.execute(select(source.c.id).where(in_day).limit(1)).first() is None:
+        return 0
+
+    db.session.execute(delete(LogDailySummary).where(LogDailySummary.day == day))
+
+    aggregate = select(
+        literal(day, LogDailySummary.day.type),
+        source.c.user_id,
+        source.c.event_type,
+        func.count()
+    ).where(in_day).group_by(source.c.user_id, source.c.event_type)
+
+    result = db.session.execute(insert(LogDailySummary).from_select(
+        ['day', 'user_id', 'event_type', 'count'], aggregate
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def rollup_month(month: date) -> None:
+    """Roll up every day of a month."""
+    day = month
+    while day < add_months(month, 1):
+        rollup_day(day)
+        day += timedelta(days=1)
+
+
+def archive_closed_months(today: Optional[date] = None) -> List[str]:
+    """
+    Move rows of closed months out of logs into per-month tables.
+
+    Only used on databases without native partitioning.
+
+    Returns:
+        Names of archive tables that received rows
+    """
+    if _is_postgres():
+        return []
+
+    current = month_start(today or datetime.utcnow().date())
+    logs = Log.__table__
+    oldest = db.session.execute(
+        select(func.min(logs.c.timestamp)).where(logs.c.timestamp < datetime.combine(current, datetime.min.time()))
+    ).scalar()
+
+    archived = []
+    if oldest is None:
+        return archived
+
+    month = month_start(oldest.date())
+    while month < current:
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        in_month = (logs.c.timestamp >= start) & (logs.c.timestamp < end)
+        month = add_months(month, 1)
+
+        if db.session.execute(select(logs.c.id).where(in_month).limit(1)).first() is None:
+            continue
+
+        archive = _archive_table(partition_name(start.date()))
+        archive.create(db.session.connection(), checkfirst=True)
+        columns = [column.name for column in logs.columns]
+        db.session.execute(insert(archive).from_select(columns, select(logs).where(in_month)))
+        db.session.execute(delete(logs).where(in_month))
+        db.session.commit()
+        archived.append(archive.name)
+
+    return archived
+
+
+def enforce_retention(retention_days: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Drop partitions or archive tables whose rows are all past retention.
+
+    Each month is rolled up before it is dropped.
+
+    Args:
+        retention_days: Days of raw logs to keep (defaults to LOG_RETENTION_DAYS)
+        today: Reference day, mainly for backfills
+
+    Returns:
+        Names of dropped tables
+    """
+    if retention_days is None:
+        retention_days = current_app.config['LOG_RETENTION_DAYS']
+    if retention_days <= 0:
+        return []
+
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+
+    dropped = []
+    for month in list_partitions():
+        if add_months(month, 1) > cutoff:
+            continue
+        name = partition_name(month)
+        rollup_month(month)
+        db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.session.commit()
+        dropped.append(name)
+        logger.info(f"Dropped expired log partition {name}")
+
+    return dropped
+
+
+def run_log_maintenance() -> None:
+    """Roll up yesterday, prepare partitions and apply retention."""
+    today = datetime.utcnow().date()
+    ensure_partitions(today=today)
+    rollup_day(today - timedelta(days=1))
+    archive_closed_months(today=today)
+    enforce_retention(today=today)
+
+
+def init_log_storage(app: Flask) -> None:
+    """Create partitions at startup and schedule daily log maintenance."""
+    # Log inserts fail while logs has no partition, so this cannot wait for
+    # the scheduler (which may be disabled); one worker does it, the others skip
+    with app.app_context():
+        try:
+            if _is_postgres():
+                with exclusive_job('log_partitions_startup') as acquired:
+                    if acquired:
+                        ensure_partitions()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to create log partitions: {e}")
+
+    # Later months are created ahead by the daily maintenance
+    schedule_job(app, run_log_maintenance, 'log_maintenance', 'cron', singleton=True,
+                 hour=app.config['LOG_MAINTENANCE_HOUR'], minute=0)
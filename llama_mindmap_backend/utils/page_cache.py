@@ -0,0 +1,136 @@
+"""In-memory cache of fully rendered HTML pages.
+
+The landing page only varies by device type, so it is rendered once per
+device type and kept together with its ETag and precompressed variants.
+Serving it is then a dictionary lookup plus content negotiation; a client
+revalidating with If-None-Match gets a 304 without a body.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Flask, Response, request
+
+from llama_mindmap_backend.utils.compression import (
+    available_encodings, compress, make_etag, negotiate_encoding
+)
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """A rendered page and its encoded variants as (body, etag) pairs."""
+    body: bytes
+    etag: str
+    mimetype: str = 'text/html'
+    variants: Dict[str, Tuple[bytes, str]] = field(default_factory=dict)
+
+
+def build_page(html: str, encodings=(), min_size: int = 512, mimetype: str = 'text/html') -> CachedPage:
+    """
+    Encode a rendered page and precompress it.
+
+    Args:
+        html: Rendered page
+        encodings: Content-encodings to precompute
+        min_size: Bodies smaller than this are not compressed
+        mimetype: Response mimetype
+    """
+    body = html.encode('utf-8')
+    variants = {}
+    if len(body) >= min_size:
+        for encoding in encodings:
+            encoded = compress(body, encoding)
+            if len(encoded) < len(body):
+                variants[encoding] = (encoded, make_etag(body, encoding))
+    return CachedPage(body=body, etag=make_etag(body), mimetype=mimetype, variants=variants)
+
+
+class PageCache:
+    """Rendered pages keyed by a small, fixed set of keys (e.g. device type)."""
+
+    def __init__(self, enabled: bool = True, encodings=None):
+        """
+        Args:
+            enabled: Cache pages; when False every request renders again
+            encodings: Content-encodings to precompute (defaults to all available)
+        """
+        self.enabled = enabled
+        self.encodings = available_encodings() if encodings is None else list(encodings)
+        self._lock = threading.Lock()
+        self._pages: Dict[str, CachedPage] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, render: Callable[[], str]) -> CachedPage:
+        """Get a cached page, rendering and storing it on first use."""
+        page = self._pages.get(key)
+        if page is not None:
+            self.hits += 1
+            return page
+
+        self.misses += 1
+        page = build_page(render(), self.encodings)
+        if self.enabled:
+            with self._lock:
+                self._pages.setdefault(key, page)
+        return page
+
+    def clear(self) -> None:
+        """Drop all cached pages (e.g. after templates or assets change)."""
+        with self._lock:
+            self._pages.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache contents and hit counters."""
+        return {
+            'enabled': self.enabled,
+            'pages': sorted(self._pages),
+            'encodings': self.encodings,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def page_response(page: CachedPage, vary: Optional[str] = None, cache_control: str = 'no-cache') -> Response:
+    """
+    Answer the current request with a cached page.
+
+    Picks the best precompressed variant for Accept-Encoding, and answers 304
+    when If-None-Match already names the variant being served.
+
+    Args:
+        page: Page to send
+        vary: Request headers the page depends on besides Accept-Encoding
+        cache_control: Cache-Control header ('no-cache' makes browsers revalidate)
+    """
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'), list(page.variants))
+    body, etag = page.variants[encoding] if encoding else (page.body, page.etag)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=page.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    if vary:
+        response.vary.add(vary)
+    return response
+
+
+# Global page cache
+_page_cache = PageCache()
+
+
+def get_page_cache() -> PageCache:
+    """Get the global page cache."""
+    return _page_cache
+
+
+def init_page_cache(app: Flask) -> None:
+    """Configure the page cache; pages are always re-rendered in debug mode."""
+    global _page_cache
+    _page_cache = PageCache(enabled=app.config['PAGE_CACHE_ENABLED'] and not app.debug)
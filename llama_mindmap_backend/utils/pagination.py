@@ -0,0 +1,103 @@
+"""Keyset (cursor) pagination helpers for list endpoints."""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+
+    Args:
+        created_at: Timestamp of the last row
+        row_id: Primary key of the last row
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([created_at.isoformat(), str(row_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Args:
+        cursor: Opaque cursor string from a previous page
+
+    Returns:
+        Tuple of (created_at, id) to continue after
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def parse_page_size(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Parse a ?limit= value and clamp it to [1, MAX_PAGE_SIZE]."""
+    try:
+        limit = int(value) if value else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def apply_keyset(query, created_col, id_col, cursor: Optional[str], limit: int):
+    """
+    Apply newest-first keyset ordering and the cursor position to a query.
+
+    One extra row is fetched so callers can tell whether another page exists
+    without issuing a COUNT.
+
+    Args:
+        query: SQLAlchemy query to paginate
+        created_col: Timestamp column used as the primary sort key
+        id_col: Unique column used as the tie-breaker
+        cursor: Cursor from the previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        Query ordered by (created_col, id_col) descending, limited to limit + 1
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_col < created_at,
+            and_(created_col == created_at, id_col < row_id)
+        ))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Trim the look-ahead row and build the cursor for the next page.
+
+    Args:
+        rows: Rows returned by a query built with apply_keyset()
+        limit: Requested page size
+
+    Returns:
+        Tuple of (page rows, next cursor or None when this is the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
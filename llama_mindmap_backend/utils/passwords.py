@@ -0,0 +1,138 @@
+"""Password hashing offloaded to a bounded process pool.
+
+Hashing and verification are deliberately CPU-heavy. Running them on a
+dedicated process pool keeps request threads free to serve other requests
+during login bursts, and the bounded queue turns overload into a fast
+"busy" answer instead of an ever-growing backlog.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a job did not finish in time."""
+
+
+def _hash_password(password: str, method: str, salt_length: int) -> str:
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify_password(pwhash: str, password: str) -> bool:
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """Hash and verify passwords on a process pool with a bounded queue."""
+
+    def __init__(self, method: str = 'pbkdf2:sha256:600000', salt_length: int = 16,
+                 workers: int = 2, queue_size: int = 32, timeout: float = 10.0):
+        """
+        Args:
+            method: werkzeug hash method, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'
+            salt_length: Salt length in characters
+            workers: Pool processes; 0 hashes inline on the request thread
+            queue_size: Jobs allowed to wait for a free process
+            timeout: Seconds to wait for a result before giving up
+        """
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers > 0 else None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._target_prefix: Optional[str] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the pool on first use, so it is started after any fork."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._pool
+
+    def _run(self, func: Callable, *args):
+        if self._slots is None:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        try:
+            future = self._get_pool().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("Password hashing timed out")
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured method."""
+        return self._run(_hash_password, password, self.method, self.salt_length)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Check a password against a stored hash."""
+        return self._run(_verify_password, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Check whether a stored hash uses different parameters than configured."""
+        if self._target_prefix is None:
+            # werkzeug expands shorthand methods ('scrypt') to their full parameters
+            self._target_prefix = _hash_password('', self.method, 1).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._target_prefix
+
+    def reset_after_fork(self) -> None:
+        """Forget a pool inherited from the parent process; the child starts its own on first use."""
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def shutdown(self) -> None:
+        """Stop pool processes."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# Global hasher instance
+_hasher: Optional[PasswordHasher] = None
+
+
+def init_password_hasher(app: Flask) -> None:
+    """Create the global hasher from application configuration."""
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+    _hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_size=app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT_SECONDS']
+    )
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the global hasher, creating an inline default if not initialized."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(workers=0)
+    return _hasher
@@ -0,0 +1,262 @@
+"""Speculative prefetch of steps and analysis for freshly expanded nodes.
+
+After an expansion, breakdown/analysis generations for the new children are
+queued on the background LLM lane and their results are held in memory only.
+When the user later asks for steps or analysis of one of those nodes, the
+route takes the prefetched result (or joins the call if it is already
+running) and writes it to the database as usual. Nothing is persisted for
+children the user never opens.
+
+Each kind of prefetch tracks how many of its results were actually used. A
+kind whose hit rate falls below PREFETCH_MIN_HIT_RATE is only issued for a
+small probe fraction of expansions, so it can recover if usage changes.
+
+Results stay in the process that issued them, so prefetch only pays off with
+a single worker; gunicorn.conf.py turns it off when it runs several.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, TimeoutError
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from flask import Flask
+
+from llama_mindmap_backend.utils.llama_api import generate_analysis, generate_breakdown
+from llama_mindmap_backend.utils.admission import AdmissionRejected
+from llama_mindmap_backend.utils.llm_scheduler import LANE_BACKGROUND, submit_llm_task
+from llama_mindmap_backend.utils.topic_index import find_response
+
+
+logger = logging.getLogger(__name__)
+
+# Generator for each prefetchable kind; a failed generation raises, so a
+# placeholder is never handed out as a prefetched result
+GENERATORS: Dict[str, Callable] = {
+    'steps': generate_breakdown,
+    'analysis': generate_analysis
+}
+
+
+class Prefetcher:
+    """Bounded in-memory store of speculative LLM results."""
+
+    def __init__(self, enabled: bool = False, kinds: Iterable[str] = ('steps', 'analysis'),
+                 user_budget: int = 30, ttl: float = 600, max_entries: int = 5000,
+                 min_hit_rate: float = 0.2, min_samples: int = 50, probe_rate: float = 0.1,
+                 wait_timeout: Optional[float] = None):
+        """
+        Args:
+            enabled: Whether expansions trigger prefetch at all
+            kinds: Kinds to prefetch ('steps', 'analysis')
+            user_budget: Prefetch calls allowed per user per hour
+            ttl: Seconds an unused result is kept before it counts as wasted
+            max_entries: Results kept in memory; the oldest are dropped beyond this
+            min_hit_rate: Hit rate below which a kind is only probed
+            min_samples: Outcomes needed before the hit rate is trusted
+            probe_rate: Fraction of expansions still prefetched for a disabled kind
+            wait_timeout: Seconds a click waits for a prefetch that is already running
+        """
+        self.enabled = enabled
+        self.kinds = [kind for kind in kinds if kind in GENERATORS]
+        self.user_budget = user_budget
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_hit_rate = min_hit_rate
+        self.min_samples = min_samples
+        self.probe_rate = probe_rate
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[Future, float]]" = OrderedDict()
+        self._user_calls: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[str, Deque[bool]] = {kind: deque(maxlen=min_samples * 4) for kind in GENERATORS}
+        self.issued = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.over_budget = 0
+
+    def schedule(self, user_id: str, nodes: Iterable[Tuple[str, str]]) -> int:
+        """
+        Queue background generations for freshly created nodes.
+
+        Args:
+            user_id: Owner of the nodes
+            nodes: (node_id, content) pairs
+
+        Returns:
+            Number of prefetch calls queued
+        """
+        if not self.enabled:
+            return 0
+
+        self._expire()
+        kinds = [kind for kind in self.kinds if self._kind_active(kind)]
+        queued = 0
+        for node_id, content in nodes:
+            for kind in kinds:
+                if find_response(kind, content) is not None:
+                    # The click will be served from a stored generation anyway
+                    continue
+                if not self._take_budget(user_id):
+                    self.over_budget += 1
+                    return queued
+                try:
+                    future = submit_llm_task(
+                        f"user:{user_id}", GENERATORS[kind], content, lane=LANE_BACKGROUND,
+                        user_id=user_id, endpoint=f"prefetch.{kind}"
+                    )
+                except AdmissionRejected:
+                    # Queue full or token budget used up
+                    return queued
+                self._store((str(user_id), str(node_id), kind), future)
+                queued += 1
+        return queued
+
+    def take(self, user_id: str, node_id: str, kind: str):
+        """
+        Get a prefetched result for a node, removing it from the store.
+
+        A finished result is returned immediately and a running call is
+        joined. A call still waiting in the background queue is cancelled,
+        because the interactive path will be dispatched sooner.
+
+        Returns:
+            The generated result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.pop((str(user_id), str(node_id), kind), None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        future, _ = entry
+        if future.cancel():
+            self.misses += 1
+            self._record(kind, False)
+            return None
+
+        try:
+            result = future.result(timeout=self.wait_timeout)
+        except (CancelledError, TimeoutError, Exception) as e:
+            logger.warning(f"Prefetched {kind} for node {node_id} unavailable: {e!r}")
+            self.misses += 1
+            self._record(kind, False)
+            return None
+
+        self.hits += 1
+        self._record(kind, True)
+        return result
+
+    def discard(self, user_id: str, node_id: str) -> None:
+        """Drop any prefetched results for a node (e.g. it was deleted)."""
+        with self._lock:
+            entries = [self._entries.pop((str(user_id), str(node_id), kind), None) for kind in GENERATORS]
+        for entry in entries:
+            if entry is not None:
+                entry[0].cancel()
+
+    def _store(self, key: Tuple[str, str, str], future: Future) -> None:
+        evicted = []
+        with self._lock:
+            self._entries[key] = (future, time.monotonic())
+            self.issued += 1
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        for (_, _, kind), (old, _) in evicted:
+            old.cancel()
+            self.wasted += 1
+            self._record(kind, False)
+
+    def _expire(self) -> None:
+        """Drop results nobody asked for within the TTL and count them as wasted."""
+        cutoff = time.monotonic() - self.ttl
+        expired = []
+        with self._lock:
+            while self._entries:
+                key, (future, created_at) = next(iter(self._entries.items()))
+                if created_at >= cutoff:
+                    break
+                self._entries.popitem(last=False)
+                expired.append((key[2], future))
+            hour_ago = time.monotonic() - 3600
+            self._user_calls = {
+                user: calls for user, calls in self._user_calls.items() if calls and calls[-1] >= hour_ago
+            }
+        for kind, future in expired:
+            future.cancel()
+            self.wasted += 1
+            self._record(kind, False)
+
+    def _take_budget(self, user_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            calls = self._user_calls.setdefault(str(user_id), deque())
+            while calls and calls[0] < now - 3600:
+                calls.popleft()
+            if len(calls) >= self.user_budget:
+                return False
+            calls.append(now)
+            return True
+
+    def _record(self, kind: str, hit: bool) -> None:
+        with self._lock:
+            self._outcomes[kind].append(hit)
+
+    def hit_rate(self, kind: str) -> Optional[float]:
+        """Recent fraction of prefetched results that were used, or None if too few samples."""
+        outcomes = self._outcomes[kind]
+        if len(outcomes) < self.min_samples:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def _kind_active(self, kind: str) -> bool:
+        rate = self.hit_rate(kind)
+        if rate is None or rate >= self.min_hit_rate:
+            return True
+        return random.random() < self.probe_rate
+
+    def get_stats(self) -> dict:
+        """Get prefetch counters and per-kind hit rates."""
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'issued': self.issued,
+            'hits': self.hits,
+            'misses': self.misses,
+            'wasted': self.wasted,
+            'over_budget': self.over_budget,
+            'hit_rate': {kind: self.hit_rate(kind) for kind in self.kinds}
+        }
+
+
+# Global prefetcher instance
+_prefetcher = Prefetcher()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Get the global prefetcher."""
+    return _prefetcher
+
+
+def init_prefetch(app: Flask) -> None:
+    """Create the prefetcher from application configuration."""
+    global _prefetcher
+    _prefetcher = Prefetcher(
+        enabled=app.config['PREFETCH_ENABLED'],
+        kinds=[kind.strip() for kind in app.config['PREFETCH_KINDS'].split(',') if kind.strip()],
+        user_budget=app.config['PREFETCH_USER_BUDGET'],
+        ttl=app.config['PREFETCH_TTL_SECONDS'],
+        max_entries=app.config['PREFETCH_MAX_ENTRIES'],
+        min_hit_rate=app.config['PREFETCH_MIN_HIT_RATE'],
+        min_samples=app.config['PREFETCH_MIN_SAMPLES'],
+        probe_rate=app.config['PREFETCH_PROBE_RATE'],
+        wait_timeout=app.config['LLM_TIMEOUT_SECONDS']
+    )
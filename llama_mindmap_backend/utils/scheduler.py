@@ -0,0 +1,228 @@
+"""Background job scheduler built on APScheduler."""
+
+import atexit
+import logging
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import text
+
+from llama_mindmap_backend.extensions import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# Global scheduler instance
+_scheduler = None
+
+# Registered jobs by id, kept so a forked worker can re-create them
+_jobs = {}
+
+# Flushes running on their own threads while the scheduler is disabled, by id
+_flushes = {}
+
+
+def init_scheduler(app: Flask) -> None:
+    """
+    Start the background scheduler when enabled in configuration.
+
+    Every gunicorn worker runs its own scheduler. Jobs that maintain
+    per-process state (flushing in-memory counters) run in each of them;
+    jobs registered with singleton=True run in one process at a time.
+
+    Args:
+        app: Flask application whose context jobs run in
+    """
+    if not app.config.get('SCHEDULER_ENABLED') or app.testing:
+        return
+
+    if _scheduler is not None:
+        return
+
+    if _start_scheduler():
+        atexit.register(shutdown_scheduler)
+        logger.info("Background scheduler started")
+
+
+def _start_scheduler() -> bool:
+    global _scheduler
+
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler
+    except ImportError:
+        logger.warning("APScheduler not installed - background jobs disabled")
+        return False
+
+    _scheduler = BackgroundScheduler(timezone='UTC', job_defaults={'coalesce': True, 'max_instances': 1})
+    _scheduler.start()
+    return True
+
+
+def schedule_job(app: Flask, func: Callable, job_id: str, trigger: str, singleton: bool = False,
+                 **trigger_args) -> None:
+    """
+    Register a job that runs inside the application context.
+
+    Does nothing when the scheduler is disabled.
+
+    Args:
+        app: Flask application to push a context for
+        func: Job function taking no arguments
+        job_id: Unique job identifier (re-registering replaces the job)
+        trigger: APScheduler trigger name ('cron', 'interval' or 'date')
+        singleton: Run in one process only; the other workers skip the run (see exclusive_job)
+        **trigger_args: Trigger arguments such as hour=3 or seconds=30
+    """
+    if _scheduler is None:
+        return
+
+    def run_in_context():
+        _run_job(app, func, job_id, singleton)
+
+    _jobs[job_id] = (run_in_context, trigger, trigger_args)
+    _scheduler.add_job(run_in_context, trigger, id=job_id, replace_existing=True, **trigger_args)
+
+
+def _run_job(app: Flask, func: Callable, job_id: str, singleton: bool = False) -> None:
+    with app.app_context():
+        try:
+            if not singleton:
+                func()
+                return
+            with exclusive_job(job_id) as acquired:
+                if acquired:
+                    func()
+                else:
+                    logger.debug(f"Scheduled job {job_id} is running in another process; skipped")
+        except Exception as e:
+            logger.error(f"Scheduled job {job_id} failed: {e}")
+
+
+class _FlushThread(threading.Thread):
+    """Runs a job every few seconds on a daemon thread."""
+
+    def __init__(self, app: Flask, func: Callable, job_id: str, seconds: float):
+        super().__init__(name=f"flush-{job_id}", daemon=True)
+        self.app = app
+        self.func = func
+        self.job_id = job_id
+        self.seconds = seconds
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.seconds):
+            _run_job(self.app, self.func, self.job_id)
+
+
+def schedule_flush(app: Flask, func: Callable, job_id: str, seconds: float) -> None:
+    """
+    Periodically flush a per-process buffer, whether or not the scheduler is enabled.
+
+    In-memory counters grow until flushed, and other processes only see them
+    once written, so this does not depend on SCHEDULER_ENABLED: the job runs
+    on the scheduler when it is running and on a daemon thread otherwise.
+
+    Args:
+        app: Flask application to push a context for
+        func: Flush function taking no arguments
+        job_id: Unique job identifier
+        seconds: Interval between flushes
+    """
+    if _scheduler is not None:
+        schedule_job(app, func, job_id, 'interval', seconds=seconds)
+        return
+    if app.testing:
+        return
+
+    previous = _flushes.get(job_id)
+    if previous is not None:
+        previous.stopped.set()
+    _flushes[job_id] = _FlushThread(app, func, job_id, seconds)
+    _flushes[job_id].start()
+
+
+@contextmanager
+def exclusive_job(name: str) -> Iterator[bool]:
+    """
+    Hold a lock on a job name across processes, without waiting for it.
+
+    On PostgreSQL this is a session advisory lock, which covers every worker
+    on every host sharing the database; elsewhere it is a lock file in the
+    instance folder, which covers the workers of one host.
+
+    Args:
+        name: Job name
+
+    Yields:
+        True if the lock was taken, False if another process holds it
+    """
+    if db.engine.dialect.name == 'postgresql':
+        key = zlib.crc32(name.encode('utf-8'))
+        with db.engine.connect() as conn:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
+        return
+
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with open(os.path.join(current_app.instance_path, f"{name}.lock"), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_scheduler() -> Optional[object]:
+    """Get the running scheduler, or None when disabled."""
+    return _scheduler
+
+
+def shutdown_scheduler() -> None:
+    """Stop the scheduler and flush threads without waiting for running jobs."""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
+    for flush in _flushes.values():
+        flush.stopped.set()
+
+
+def restart_scheduler_after_fork() -> None:
+    """
+    Give a forked worker its own running scheduler.
+
+    The parent's scheduler thread does not exist in the child, so the jobs
+    registered before the fork are added to a fresh scheduler.
+    """
+    global _scheduler
+
+    # Inherited flush threads and scheduler only refer to the parent's (now absent) threads
+    for job_id, flush in list(_flushes.items()):
+        _flushes[job_id] = _FlushThread(flush.app, flush.func, job_id, flush.seconds)
+        _flushes[job_id].start()
+
+    _scheduler = None
+    if not _jobs or not _start_scheduler():
+        return
+    for job_id, (run_in_context, trigger, trigger_args) in _jobs.items():
+        _scheduler.add_job(run_in_context, trigger, id=job_id, replace_existing=True, **trigger_args)
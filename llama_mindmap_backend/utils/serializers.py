@@ -0,0 +1,121 @@
+"""Precompiled serializers derived from the marshmallow schemas.
+
+The schemas in ``schemas/`` declare which fields each resource exposes and in
+what order. ``Serializer`` turns that declaration into plain attribute-picking
+functions, compiled once per field set, so dumping a row is a tuple of
+attribute lookups rather than a walk over marshmallow field objects. Value
+conversion (UUIDs, datetimes) is left to the JSON provider.
+
+Routes accept a ``fields=`` query parameter (e.g. ``?fields=id,content``)
+naming a subset of the schema fields. The same subset drives both the
+columns selected from the database and the keys of the output.
+"""
+
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+from marshmallow import Schema
+
+from llama_mindmap_backend.models import Conversation, Log, Node, User
+from llama_mindmap_backend.schemas import ConversationSchema, LogSchema, NodeSchema, UserSchema
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names a field the resource does not have."""
+
+
+class Serializer:
+    """Dump objects to dicts with the fields of a marshmallow schema."""
+
+    def __init__(self, schema: Type[Schema], model: Optional[type] = None,
+                 default: Optional[Iterable[str]] = None, extra: Iterable[str] = ()):
+        """
+        Args:
+            schema: Schema declaring the fields and their order
+            model: Mapped model the fields are columns of, for column selection
+            default: Fields returned when ?fields= is absent (defaults to all)
+            extra: Computed fields accepted in ?fields= that are not model columns
+        """
+        self.schema = schema
+        self.model = model
+        self.fields: Tuple[str, ...] = tuple(schema().fields) + tuple(extra)
+        self.default: Tuple[str, ...] = tuple(default) if default is not None else self.fields
+        self.extra = frozenset(extra)
+        self._compiled: Dict[Tuple[str, ...], Callable[[Any], dict]] = {}
+
+    def parse(self, value: Optional[str]) -> Tuple[str, ...]:
+        """
+        Resolve a ?fields= value to field names in schema order.
+
+        A value naming no field at all (e.g. ``?fields=,``) means the default set.
+
+        Raises:
+            InvalidFields: If a name is not a field of the schema
+        """
+        if not value or not value.strip():
+            return self.default
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+        if not requested:
+            return self.default
+        unknown = requested.difference(self.fields)
+        if unknown:
+            raise InvalidFields(
+                f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(self.fields)}"
+            )
+        return tuple(name for name in self.fields if name in requested)
+
+    def columns(self, fields: Iterable[str], required: Iterable[str] = ()) -> list:
+        """
+        Model columns to select for a field set.
+
+        Args:
+            fields: Fields to output
+            required: Columns the route needs besides the output (e.g. keys for nesting or paging)
+        """
+        names = [name for name in self.fields if name not in self.extra and (name in fields or name in required)]
+        return [getattr(self.model, name) for name in names]
+
+    def compile(self, fields: Tuple[str, ...]) -> Callable[[Any], dict]:
+        """Get the dump function for a field set, building it on first use."""
+        dump = self._compiled.get(fields)
+        if dump is None:
+            if len(fields) == 1:
+                name = fields[0]
+                dump = lambda obj: {name: getattr(obj, name)}  # noqa: E731
+            elif fields:
+                getter = attrgetter(*fields)
+                dump = lambda obj: dict(zip(fields, getter(obj)))  # noqa: E731
+            else:
+                dump = lambda obj: {}  # noqa: E731
+            self._compiled[fields] = dump
+        return dump
+
+    def dump(self, obj: Any, fields: Optional[Tuple[str, ...]] = None) -> dict:
+        """Dump one object (ORM instance, row or any object with the attributes)."""
+        return self.compile(self.default if fields is None else fields)(obj)
+
+    def dump_many(self, objs: Iterable[Any], fields: Optional[Tuple[str, ...]] = None) -> List[dict]:
+        """Dump a sequence of objects."""
+        dump = self.compile(self.default if fields is None else fields)
+        return [dump(obj) for obj in objs]
+
+
+# Mind map nodes; parent_id and conversation_id are implied by the nesting
+node_serializer = Serializer(
+    NodeSchema, Node, default=('id', 'content', 'level', 'steps', 'analysis', 'created_at')
+)
+
+# Conversation listings, with the computed node count
+conversation_serializer = Serializer(
+    ConversationSchema, Conversation, default=('id', 'root_topic', 'created_at', 'node_count'),
+    extra=('node_count',)
+)
+
+# Admin user listing; profile_data only when asked for
+user_list_serializer = Serializer(UserSchema, User, default=('id', 'username', 'email', 'created_at'))
+
+# A user's own profile
+profile_serializer = Serializer(UserSchema, User)
+
+# Admin activity log
+log_serializer = Serializer(LogSchema, Log, default=('user_id', 'event_type', 'event_data', 'timestamp'))
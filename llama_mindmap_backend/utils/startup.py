@@ -0,0 +1,58 @@
+"""Cold-start timing for the application factory.
+
+create_app() runs each setup phase inside ``StartupTimer.phase()``. The
+durations, together with the time it took to import the package, are logged
+once and kept in ``app.extensions['startup']`` for /api/web/status.
+benchmarks/bench_startup.py adds a per-module import breakdown.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from flask import Flask
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Wall-clock durations of named startup phases."""
+
+    def __init__(self, import_seconds: Optional[float] = None):
+        """
+        Args:
+            import_seconds: Time spent importing the package, if measured
+        """
+        self.import_seconds = import_seconds
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block; repeated names accumulate."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def report(self) -> dict:
+        """Durations in milliseconds: package import, create_app total and each phase."""
+        return {
+            'import_ms': round(self.import_seconds * 1000, 2) if self.import_seconds is not None else None,
+            'create_app_ms': round((time.perf_counter() - self._started) * 1000, 2),
+            'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+        }
+
+    def finish(self, app: Flask) -> dict:
+        """Store the report on the app and log a one-line summary."""
+        report = self.report()
+        app.extensions['startup'] = report
+        phases = ', '.join(f"{name} {ms:.1f}" for name, ms in report['phases_ms'].items())
+        message = f"App created in {report['create_app_ms']:.1f} ms ({phases})"
+        if report['import_ms'] is not None:
+            message += f"; package import {report['import_ms']:.1f} ms"
+        logger.info(message)
+        return report
@@ -0,0 +1,214 @@
+"""Access token revocation checked without a database round trip.
+
+Revocations live in an in-process dict, so the flask_jwt_extended blocklist
+check is a constant-time lookup. They are also published to a store shared
+by every process (TOKEN_REVOCATION_BACKEND): the token_revocations table
+('database', the default) or a Redis sorted set at REDIS_URL ('redis').
+Each process pulls entries newer than its last sync at most every
+TOKEN_REVOCATION_SYNC_SECONDS. 'memory' keeps revocations local to one
+process and is only suitable for a single worker.
+
+Tokens carry their issue time in milliseconds (iat_ms), so revoking a
+user's tokens also catches those issued earlier in the same second, while
+the fresh token handed out right after still passes.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from llama_mindmap_backend.extensions import db, jwt
+from llama_mindmap_backend.models import TokenRevocation
+
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'mindmap:token_revocations'
+
+
+class DatabaseBackend:
+    """Revocation entries in the token_revocations table."""
+
+    def publish(self, entry: str, at: float) -> None:
+        # Own connection: the request's session may hold unrelated pending work
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(TokenRevocation).values(entry=entry, revoked_at=at))
+        except IntegrityError:
+            # Same entry published before
+            pass
+
+    def fetch(self, since: float) -> List[str]:
+        with db.engine.connect() as conn:
+            return list(conn.execute(
+                select(TokenRevocation.entry).where(TokenRevocation.revoked_at >= since)
+            ).scalars())
+
+    def prune(self, before: float) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(delete(TokenRevocation).where(TokenRevocation.revoked_at < before))
+
+
+class RedisBackend:
+    """Revocation entries in a Redis sorted set scored by publish time."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def publish(self, entry: str, at: float) -> None:
+        self.client.zadd(REDIS_KEY, {entry: at})
+
+    def fetch(self, since: float) -> List[str]:
+        entries = self.client.zrangebyscore(REDIS_KEY, since, '+inf')
+        return [entry.decode('utf-8') if isinstance(entry, bytes) else entry for entry in entries]
+
+    def prune(self, before: float) -> None:
+        self.client.zremrangebyscore(REDIS_KEY, '-inf', before)
+
+
+class RevocationStore:
+    """Revoked token ids and per-user "issued before" cutoffs."""
+
+    def __init__(self, backend=None, sync_interval: float = 5.0, max_token_age: float = 86400):
+        """
+        Args:
+            backend: Shared store (DatabaseBackend or RedisBackend), or None for this process only
+            sync_interval: Seconds between pulls from the backing store
+            max_token_age: Token lifetime; older revocations are pruned
+        """
+        self._backend = backend
+        self.sync_interval = sync_interval
+        self.max_token_age = max_token_age
+        self._revoked: Dict[str, float] = {}
+        self._user_cutoffs: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._next_sync = 0.0
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        """Revoke a single token until it expires."""
+        self._apply(f"jti|{jti}|{expires_at}")
+        self._publish(f"jti|{jti}|{expires_at}")
+
+    def revoke_user_tokens(self, user_id: str, issued_before: Optional[float] = None) -> None:
+        """Revoke every token of a user issued before a time (default now, to the millisecond)."""
+        # Whole milliseconds, like iat_ms: a token issued right after is never before the cutoff
+        cutoff_ms = int((issued_before if issued_before is not None else time.time()) * 1000)
+        entry = f"user|{user_id}|{cutoff_ms / 1000:.3f}"
+        self._apply(entry)
+        self._publish(entry)
+
+    def is_revoked(self, jwt_payload: dict) -> bool:
+        """Check a decoded token against local revocations."""
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+
+        if jwt_payload.get('jti') in self._revoked:
+            return True
+        cutoff = self._user_cutoffs.get(str(jwt_payload.get('sub')))
+        return cutoff is not None and issued_at(jwt_payload) < cutoff
+
+    def sync(self) -> None:
+        """Pull revocations published by other processes and prune expired ones."""
+        self._next_sync = time.monotonic() + self.sync_interval
+        if self._backend is None:
+            self._prune()
+            return
+
+        now = time.time()
+        try:
+            entries = self._backend.fetch(self._last_sync - 1)
+        except Exception as e:
+            logger.warning(f"Token revocation sync failed: {e}")
+            return
+
+        for entry in entries:
+            self._apply(entry)
+        self._last_sync = now
+        self._prune()
+
+    def _apply(self, entry: str) -> None:
+        kind, key, value = entry.split('|')
+        with self._lock:
+            if kind == 'jti':
+                self._revoked[key] = float(value)
+            else:
+                self._user_cutoffs[key] = max(float(value), self._user_cutoffs.get(key, 0.0))
+
+    def _publish(self, entry: str) -> None:
+        if self._backend is None:
+            return
+        now = time.time()
+        try:
+            self._backend.publish(entry, now)
+            self._backend.prune(now - self.max_token_age)
+        except Exception as e:
+            logger.warning(f"Failed to publish token revocation: {e}")
+
+    def _prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._user_cutoffs = {
+                user: cutoff for user, cutoff in self._user_cutoffs.items()
+                if cutoff > now - self.max_token_age
+            }
+
+    def __len__(self) -> int:
+        return len(self._revoked) + len(self._user_cutoffs)
+
+
+def issued_at(jwt_payload: dict) -> float:
+    """Issue time of a token, to the millisecond when it carries iat_ms."""
+    if 'iat_ms' in jwt_payload:
+        return jwt_payload['iat_ms'] / 1000
+    return float(jwt_payload.get('iat', 0))
+
+
+# Global store instance
+_store = RevocationStore()
+
+
+def get_revocation_store() -> RevocationStore:
+    """Get the global revocation store."""
+    return _store
+
+
+def init_token_revocation(app: Flask) -> None:
+    """Create the revocation store from application configuration."""
+    global _store
+
+    backend_name = app.config['TOKEN_REVOCATION_BACKEND']
+    backend = None
+    if backend_name == 'redis':
+        try:
+            import redis
+            backend = RedisBackend(redis.Redis.from_url(app.config['REDIS_URL']))
+        except ImportError:
+            logger.warning("redis not installed - sharing token revocations through the database")
+            backend = DatabaseBackend()
+    elif backend_name == 'database':
+        backend = DatabaseBackend()
+
+    _store = RevocationStore(
+        backend=backend,
+        sync_interval=app.config['TOKEN_REVOCATION_SYNC_SECONDS'],
+        max_token_age=app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    )
+
+
+@jwt.additional_claims_loader
+def add_issue_time(identity) -> dict:
+    """Stamp tokens with a millisecond issue time (iat has whole seconds)."""
+    return {'iat_ms': int(time.time() * 1000)}
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header: dict, jwt_payload: dict) -> bool:
+    """flask_jwt_extended hook run for every @jwt_required request."""
+    return _store.is_revoked(jwt_payload)
@@ -0,0 +1,292 @@
+"""Token usage and cost accounting for LLM calls.
+
+Every provider call records its prompt/completion tokens and latency against
+the requester and endpoint that caused it. Attribution travels in a context
+variable set by the LLM scheduler before a call is queued, so it survives
+the hop to the dispatcher thread. Usage is summed in memory and flushed to
+``token_usage_hourly`` with additive upserts.
+
+Optional daily budgets (TOKEN_BUDGET_DAILY_PER_USER, overridable per user via
+profile_data['daily_token_budget']) are checked before a call is queued.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import func, select
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import TokenUsageHourly
+from llama_mindmap_backend.utils.admission import AdmissionRejected
+from llama_mindmap_backend.utils.analytics import hour_floor, upsert_totals
+from llama_mindmap_backend.utils.cache import TTLCache
+from llama_mindmap_backend.utils.scheduler import schedule_flush
+
+
+logger = logging.getLogger(__name__)
+
+# (user_key, endpoint) the current LLM call is attributed to
+_attribution: ContextVar[Tuple[str, str]] = ContextVar('llm_attribution', default=('system', 'unknown'))
+
+GROUP_COLUMNS = {
+    'user': TokenUsageHourly.user_key,
+    'endpoint': TokenUsageHourly.endpoint,
+    'model': TokenUsageHourly.model,
+    'operation': TokenUsageHourly.operation
+}
+
+
+class TokenBudgetExceeded(AdmissionRejected):
+    """Raised when a user has used up their daily token budget."""
+    status = 429
+
+
+@contextmanager
+def attribute_usage(user_key: str, endpoint: str) -> Iterator[None]:
+    """Attribute LLM calls made (or queued) inside the block to a requester and endpoint."""
+    token = _attribution.set((user_key, endpoint))
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """Parse 'model=0.5:1.5,...' (USD per 1M prompt:completion tokens)."""
+    prices = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        model, rates = item.rsplit('=', 1)
+        try:
+            prompt_rate, completion_rate = (float(rate) for rate in rates.split(':'))
+        except ValueError:
+            logger.warning(f"Ignoring invalid token price: {item}")
+            continue
+        prices[model.strip()] = (prompt_rate, completion_rate)
+    return prices
+
+
+class TokenUsageTracker:
+    """Thread-safe usage counters with periodic database flushes."""
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None, budget_cache_ttl: float = 60):
+        """
+        Args:
+            prices: Model to (prompt, completion) USD per 1M tokens
+            budget_cache_ttl: Seconds a user's flushed daily total is cached
+        """
+        self.prices = prices or {}
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, Dict[str, int]] = {}
+        self._totals: Dict[str, Dict[str, Dict[str, int]]] = {
+            'model': defaultdict(_zero), 'endpoint': defaultdict(_zero), 'user': defaultdict(_zero)
+        }
+        self._flushed_today = TTLCache(maxsize=10000, ttl=budget_cache_ttl)
+
+    def record(self, model: str, operation: str, prompt_tokens: int, completion_tokens: int,
+               seconds: float) -> None:
+        """Record one provider call against the current attribution."""
+        user_key, endpoint = _attribution.get()
+        key = (hour_floor(datetime.utcnow()), user_key[:100], endpoint[:100], model[:200], operation[:50])
+        with self._lock:
+            values = self._pending.setdefault(key, _zero())
+            for target in (values, self._totals['model'][model], self._totals['endpoint'][endpoint],
+                           self._totals['user'][user_key]):
+                target['calls'] += 1
+                target['prompt_tokens'] += prompt_tokens
+                target['completion_tokens'] += completion_tokens
+                target['latency_ms'] += int(seconds * 1000)
+
+    def flush(self) -> int:
+        """
+        Write pending usage to the database (requires an application context).
+
+        Returns:
+            Number of aggregate rows upserted
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            upsert_totals(TokenUsageHourly, ['hour', 'user_key', 'endpoint', 'model', 'operation'], pending)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Token usage flush failed: {e}")
+            with self._lock:
+                for key, values in pending.items():
+                    target = self._pending.setdefault(key, _zero())
+                    for column, amount in values.items():
+                        target[column] += amount
+            return 0
+
+        # Flushed totals changed; re-read them on the next budget check
+        for key in pending:
+            self._flushed_today.pop(key[1])
+        return len(pending)
+
+    def used_today(self, user_key: str) -> int:
+        """Tokens a requester used since UTC midnight, across processes (up to the last flushes)."""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        flushed = self._flushed_today.get(user_key)
+        if flushed is None or flushed[0] != today:
+            total = db.session.execute(
+                select(func.coalesce(func.sum(TokenUsageHourly.prompt_tokens + TokenUsageHourly.completion_tokens), 0))
+                .where(TokenUsageHourly.user_key == user_key, TokenUsageHourly.hour >= today)
+            ).scalar()
+            flushed = (today, int(total))
+            self._flushed_today.set(user_key, flushed)
+
+        with self._lock:
+            pending = sum(
+                values['prompt_tokens'] + values['completion_tokens']
+                for key, values in self._pending.items() if key[1] == user_key and key[0] >= today
+            )
+        return flushed[1] + pending
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimated USD cost, or None when the model has no configured price."""
+        rates = self.prices.get(model)
+        if rates is None:
+            return None
+        return round((prompt_tokens * rates[0] + completion_tokens * rates[1]) / 1_000_000, 6)
+
+    def get_stats(self, top_users: int = 10) -> dict:
+        """Get usage totals since process start."""
+        with self._lock:
+            by_model = {model: dict(values) for model, values in self._totals['model'].items()}
+            by_endpoint = {endpoint: dict(values) for endpoint, values in self._totals['endpoint'].items()}
+            users = sorted(
+                self._totals['user'].items(),
+                key=lambda item: item[1]['prompt_tokens'] + item[1]['completion_tokens'],
+                reverse=True
+            )[:top_users]
+
+        for model, values in by_model.items():
+            values['estimated_cost'] = self.cost(model, values['prompt_tokens'], values['completion_tokens'])
+        return {
+            'by_model': by_model,
+            'by_endpoint': by_endpoint,
+            'top_users': {user: dict(values) for user, values in users},
+            'pending_rows': len(self._pending)
+        }
+
+
+def _zero() -> Dict[str, int]:
+    return {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'latency_ms': 0}
+
+
+# Global tracker and budget settings
+_tracker = TokenUsageTracker()
+_daily_budget = 0
+
+
+def get_token_tracker() -> TokenUsageTracker:
+    """Get the global usage tracker."""
+    return _tracker
+
+
+def record_token_usage(model: str, operation: str, prompt_tokens: int, completion_tokens: int,
+                       seconds: float) -> None:
+    """Record one provider call against the current attribution."""
+    _tracker.record(model, operation, prompt_tokens, completion_tokens, seconds)
+
+
+def flush_token_usage() -> int:
+    """Flush pending usage (requires an application context)."""
+    return _tracker.flush()
+
+
+def check_token_budget(user_key: str, user_id: Optional[str]) -> None:
+    """
+    Refuse a call when an authenticated user has used up today's budget.
+
+    Args:
+        user_key: Fairness key of the requester ('user:<id>' or 'ip:<address>')
+        user_id: Authenticated user id, or None for anonymous requests
+
+    Raises:
+        TokenBudgetExceeded: If the user's daily budget is exhausted
+    """
+    if not user_id:
+        return
+
+    from llama_mindmap_backend.utils.identity import get_cached_user
+
+    budget = _daily_budget
+    user = get_cached_user(user_id)
+    if user is not None and (user.profile_data or {}).get('daily_token_budget') is not None:
+        budget = int(user.profile_data['daily_token_budget'])
+    if budget <= 0:
+        return
+
+    if _tracker.used_today(user_key) >= budget:
+        now = datetime.utcnow()
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        raise TokenBudgetExceeded("Daily token budget exhausted", int((midnight - now).total_seconds()) + 1)
+
+
+def token_usage_report(start: datetime, end: datetime, group_by: str = 'user',
+                       limit: int = 50) -> List[dict]:
+    """
+    Get token usage in a window grouped by requester, endpoint, model or operation.
+
+    Returns:
+        Rows ordered by total tokens, with estimated cost when every model has a price
+    """
+    column = GROUP_COLUMNS[group_by]
+    prompt = func.sum(TokenUsageHourly.prompt_tokens)
+    completion = func.sum(TokenUsageHourly.completion_tokens)
+    query = select(
+        column, TokenUsageHourly.model, func.sum(TokenUsageHourly.calls), prompt, completion,
+        func.sum(TokenUsageHourly.latency_ms)
+    ).where(
+        TokenUsageHourly.hour >= hour_floor(start),
+        TokenUsageHourly.hour < end
+    ).group_by(column, TokenUsageHourly.model)
+
+    rows: Dict[str, dict] = {}
+    for key, model, calls, prompt_tokens, completion_tokens, latency_ms in db.session.execute(query):
+        row = rows.setdefault(key, {
+            group_by: key, 'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+            'latency_ms': 0, 'estimated_cost': 0.0
+        })
+        row['calls'] += int(calls)
+        row['prompt_tokens'] += int(prompt_tokens)
+        row['completion_tokens'] += int(completion_tokens)
+        row['latency_ms'] += int(latency_ms)
+        cost = _tracker.cost(model, int(prompt_tokens), int(completion_tokens))
+        row['estimated_cost'] = None if cost is None or row['estimated_cost'] is None else row['estimated_cost'] + cost
+
+    result = sorted(rows.values(), key=lambda row: row['prompt_tokens'] + row['completion_tokens'], reverse=True)
+    for row in result[:limit]:
+        row['total_tokens'] = row['prompt_tokens'] + row['completion_tokens']
+        row['avg_latency_ms'] = round(row.pop('latency_ms') / row['calls'], 1) if row['calls'] else 0.0
+        if row['estimated_cost'] is not None:
+            row['estimated_cost'] = round(row['estimated_cost'], 6)
+    return result[:limit]
+
+
+def init_token_usage(app: Flask) -> None:
+    """Configure prices and budgets, and schedule periodic flushes."""
+    global _tracker, _daily_budget
+
+    _tracker = TokenUsageTracker(prices=parse_prices(app.config['LLM_TOKEN_PRICES']))
+    _daily_budget = app.config['TOKEN_BUDGET_DAILY_PER_USER']
+
+    def flush_on_exit():
+        with app.app_context():
+            flush_token_usage()
+
+    atexit.register(flush_on_exit)
+    schedule_flush(app, flush_token_usage, 'token_usage_flush', app.config['TOKEN_USAGE_FLUSH_SECONDS'])
@@ -0,0 +1,415 @@
+"""Reuse of LLM output across near-duplicate topics.
+
+Topics are normalized (case, accents, punctuation, stop-words, plurals and
+word order) into a key such as 'basic learn python', so "learn python basics"
+and "Learn the basics of Python" share one stored generation. Keys that still
+differ slightly are matched with MinHash signatures over their words and an
+LSH band index: a lookup only compares against topics sharing at least one
+band bucket, then picks the candidate with the highest exact Jaccard
+similarity above TOPIC_SIMILARITY_THRESHOLD.
+
+Generations are stored in the generated_responses table. The index itself
+only holds keys, is capped at TOPIC_INDEX_MAX_TOPICS (oldest evicted first)
+and is saved to TOPIC_INDEX_PATH so restarts do not rebuild it from the
+database.
+"""
+
+import atexit
+import gzip
+import hashlib
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import select
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.models import GeneratedResponse
+from llama_mindmap_backend.utils.scheduler import schedule_job
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Negation, direction, order and quantity words are kept (see MEANING_WORDS)
+STOP_WORDS = frozenset("""
+a about again all also an and any are as at be because been being between both but by can could did
+do does doing during each for from further had has have having how i if into is it its itself just me
+my of once only or other our own same should so some such than that the their them then there these
+they this those through to too until very was we were what when where which while who whom why will
+with would you your
+""".split())
+
+# Words that flip or shift a topic's meaning: "things to do before surgery"
+# and "... after surgery" must not share a generation, even as near-duplicates
+MEANING_WORDS = frozenset("""
+above after against before below down few least less more most no nor not off on out over under up
+without
+""".split())
+
+
+def _singular(word: str) -> str:
+    """Very light plural folding: 'basics' -> 'basic', 'classes' -> 'class'."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    Normalize a topic into an order-independent key.
+
+    Args:
+        topic: Topic as entered by the user
+
+    Returns:
+        Sorted, de-duplicated content words joined by spaces
+
+    Example:
+        >>> normalize_topic("Learn the basics of Python")
+        'basic learn python'
+        >>> normalize_topic("Things to do before surgery") != normalize_topic("Things to do after surgery")
+        True
+        >>> normalize_topic("How to not lose weight") != normalize_topic("How to lose weight")
+        True
+    """
+    text = unicodedata.normalize('NFKD', topic).encode('ascii', 'ignore').decode('ascii').lower()
+    words = _TOKEN_RE.findall(text)
+    content = {_singular(word) for word in words if word not in STOP_WORDS}
+    # A topic made only of stop-words still needs a key
+    return ' '.join(sorted(content or set(words)))[:500]
+
+
+@lru_cache(maxsize=100000)
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class TopicIndex:
+    """MinHash/LSH index over normalized topic keys."""
+
+    def __init__(self, bands: int = 4, rows: int = 2, threshold: float = 0.8,
+                 max_topics: int = 200000, max_bucket: int = 64, seed: int = 1):
+        """
+        Args:
+            bands: LSH bands; more bands find lower-similarity candidates
+            rows: MinHash values per band; more rows make buckets stricter
+            threshold: Minimum Jaccard similarity for a match
+            max_topics: Keys kept before the oldest are evicted
+            max_bucket: Keys kept per bucket, bounding lookup cost for common words
+            seed: Seed for the MinHash permutations (must match saved snapshots)
+        """
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.max_bucket = max_bucket
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._buckets: Dict[int, List[str]] = {}
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+
+    def _signature(self, words: frozenset) -> List[int]:
+        hashes = [_word_hash(word) for word in words] or [0]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, key: str) -> List[int]:
+        signature = self._signature(frozenset(key.split()))
+        # Hashes of int tuples are stable across processes, unlike str hashes
+        return [
+            hash((band, *signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: str) -> None:
+        """Index a normalized key, evicting the oldest keys when full."""
+        band_keys = self._band_keys(key)
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys[key] = None
+            for band_key in band_keys:
+                bucket = self._buckets.setdefault(band_key, [])
+                bucket.append(key)
+                if len(bucket) > self.max_bucket:
+                    del bucket[0]
+            evicted = []
+            while len(self._keys) > self.max_topics:
+                evicted.append(self._keys.popitem(last=False)[0])
+
+        for old in evicted:
+            self._unlink(old)
+
+    def remove(self, key: str) -> None:
+        """Drop a key from the index."""
+        with self._lock:
+            if key not in self._keys:
+                return
+            del self._keys[key]
+        self._unlink(key)
+
+    def _unlink(self, key: str) -> None:
+        band_keys = self._band_keys(key)
+        with self._lock:
+            for band_key in band_keys:
+                bucket = self._buckets.get(band_key)
+                if bucket and key in bucket:
+                    bucket.remove(key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def query(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Find the indexed key most similar to a normalized key.
+
+        Returns:
+            (matching key, Jaccard similarity), or None below the threshold
+        """
+        self.lookups += 1
+        if key in self._keys:
+            self.exact_hits += 1
+            return key, 1.0
+
+        words = frozenset(key.split())
+        band_keys = self._band_keys(key)
+        with self._lock:
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(self._buckets.get(band_key, ()))
+
+        meaning = words & MEANING_WORDS
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            candidate_words = frozenset(candidate.split())
+            if candidate_words & MEANING_WORDS != meaning:
+                continue
+            score = _jaccard(words, candidate_words)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+        self.similar_hits += 1
+        return best, best_score
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def save(self, path: str) -> None:
+        """Write the indexed keys (oldest first) to a gzip snapshot, atomically."""
+        with self._lock:
+            keys = list(self._keys)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Every worker saves; each writes its own temporary file and the last replace wins
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=directory or None)
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                f.write(f"#topic-index v{SNAPSHOT_VERSION} bands={self.bands} rows={self.rows} seed={self.seed}\n")
+                for key in keys:
+                    f.write(key + '\n')
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path: str) -> int:
+        """
+        Add the keys of a snapshot written by save().
+
+        Returns:
+            Number of keys read
+        """
+        count = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = f.readline()
+            if not header.startswith(f"#topic-index v{SNAPSHOT_VERSION}"):
+                raise ValueError(f"Unsupported topic index snapshot: {header.strip()}")
+            for line in f:
+                key = line.rstrip('\n')
+                if key:
+                    self.add(key)
+                    count += 1
+        return count
+
+    def get_stats(self) -> dict:
+        """Get index size and hit counters."""
+        return {
+            'topics': len(self._keys),
+            'buckets': len(self._buckets),
+            'lookups': self.lookups,
+            'exact_hits': self.exact_hits,
+            'similar_hits': self.similar_hits
+        }
+
+
+# Global index; None while topic reuse is disabled
+_index: Optional[TopicIndex] = None
+_snapshot_path: Optional[str] = None
+_last_sync: Optional[datetime] = None
+
+
+def get_topic_index() -> Optional[TopicIndex]:
+    """Get the global topic index, or None if topic reuse is disabled."""
+    return _index
+
+
+def find_response(kind: str, topic: str) -> Any:
+    """
+    Get a stored generation for the same or a near-duplicate topic.
+
+    Args:
+        kind: 'expand', 'steps' or 'analysis'
+        topic: Topic as entered by the user
+
+    Returns:
+        Stored payload, or None if no similar topic was generated before
+    """
+    if _index is None:
+        return None
+
+    match = _index.query(normalize_topic(topic))
+    if match is None:
+        return None
+    row = db.session.get(GeneratedResponse, (match[0], kind))
+    return row.payload if row is not None else None
+
+
+def store_response(kind: str, topic: str, payload: Any) -> None:
+    """Store a generation for reuse and index its topic, if topic reuse is enabled."""
+    if _index is None:
+        return
+    save_response(kind, topic, payload)
+
+
+def save_response(kind: str, topic: str, payload: Any) -> bool:
+    """
+    Write a generation to the response store, whether or not reuse is enabled here.
+
+    Returns:
+        True if the row was written
+    """
+    key = normalize_topic(topic)
+    try:
+        db.session.merge(GeneratedResponse(topic_key=key, kind=kind, topic=topic[:500], payload=payload))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to store generated {kind} for reuse: {e}")
+        return False
+    if _index is not None:
+        _index.add(key)
+    return True
+
+
+def sync_topic_index() -> int:
+    """
+    Index keys stored by other processes since the last sync.
+
+    Returns:
+        Number of rows read
+    """
+    global _last_sync
+    if _index is None:
+        return 0
+
+    query = select(GeneratedResponse.topic_key, GeneratedResponse.created_at)
+    if _last_sync is not None:
+        query = query.where(GeneratedResponse.created_at >= _last_sync)
+    query = query.order_by(GeneratedResponse.created_at)
+
+    count = 0
+    for key, created_at in db.session.execute(query.execution_options(yield_per=1000)):
+        _index.add(key)
+        _last_sync = created_at
+        count += 1
+    return count
+
+
+def save_topic_index() -> None:
+    """Write the index snapshot, if persistence is configured."""
+    if _index is None or not _snapshot_path:
+        return
+    try:
+        _index.save(_snapshot_path)
+    except OSError as e:
+        logger.error(f"Failed to save topic index: {e}")
+
+
+def maintain_topic_index() -> None:
+    """Scheduled job: pick up other processes' topics, then persist the index."""
+    sync_topic_index()
+    save_topic_index()
+
+
+def init_topic_index(app: Flask) -> None:
+    """Load or build the topic index and schedule its sync and snapshots when enabled."""
+    global _index, _snapshot_path, _last_sync
+
+    if not app.config.get('TOPIC_REUSE_ENABLED'):
+        return
+
+    _index = TopicIndex(
+        bands=app.config['TOPIC_INDEX_BANDS'],
+        rows=app.config['TOPIC_INDEX_ROWS'],
+        threshold=app.config['TOPIC_SIMILARITY_THRESHOLD'],
+        max_topics=app.config['TOPIC_INDEX_MAX_TOPICS']
+    )
+    _snapshot_path = app.config['TOPIC_INDEX_PATH']
+
+    if _snapshot_path and os.path.exists(_snapshot_path):
+        try:
+            loaded = _index.load(_snapshot_path)
+            # Only rows newer than the snapshot need to come from the database
+            _last_sync = datetime.utcfromtimestamp(os.path.getmtime(_snapshot_path))
+            logger.info(f"Loaded {loaded} topics from {_snapshot_path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load topic index snapshot: {e}")
+
+    with app.app_context():
+        try:
+            sync_topic_index()
+        except Exception as e:
+            logger.error(f"Failed to build topic index from database: {e}")
+
+    schedule_job(app, maintain_topic_index, 'topic_index_maintenance', 'interval',
+                 seconds=app.config['TOPIC_INDEX_SYNC_SECONDS'])
+    atexit.register(save_topic_index)
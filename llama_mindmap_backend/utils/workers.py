@@ -0,0 +1,46 @@
+"""Process lifecycle hooks for pre-forking servers (gunicorn with preload_app).
+
+With preloading, create_app() runs once in the master and workers are forked
+from it, sharing the imported code, templates, fingerprinted assets and the
+topic index copy-on-write. State tied to the master's process does not
+survive the fork and is reset in each worker: pooled database connections
+(sockets shared with the master), background threads and process pools,
+and the LLM client.
+"""
+
+import logging
+import os
+
+from flask import Flask
+
+from llama_mindmap_backend.extensions import db
+from llama_mindmap_backend.utils.app_logging import restart_logging_after_fork
+from llama_mindmap_backend.utils.llama_api import reset_client
+from llama_mindmap_backend.utils.passwords import get_password_hasher
+from llama_mindmap_backend.utils.scheduler import restart_scheduler_after_fork, shutdown_scheduler
+
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_fork() -> None:
+    """Run in the master before workers are forked: stop its background scheduler."""
+    # Workers run their own; jobs left in the master would only duplicate them
+    shutdown_scheduler()
+
+
+def reset_after_fork(app: Flask) -> None:
+    """
+    Run in each worker right after the fork.
+
+    Args:
+        app: Application created in the master
+    """
+    with app.app_context():
+        # close=False leaves the master's connections alone; the worker opens its own
+        db.engine.dispose(close=False)
+    restart_logging_after_fork()
+    get_password_hasher().reset_after_fork()
+    reset_client()
+    restart_scheduler_after_fork()
+    logger.info(f"Worker {os.getpid()} reset after fork")
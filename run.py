@@ -1,22 +1,19 @@
 #!/usr/bin/env python3
-"""Simplified run script with device template verification."""
+"""Simplified run script with device template verification.
+
+Starts Flask's single-process development server; production deployments
+run gunicorn with gunicorn.conf.py and wsgi.py instead.
+"""
 
 import os
 import sys
 from pathlib import Path
 
 
-def load_env_file() -> None:
-    """Load environment variables from .env file."""
-    env_path = Path('.env')
-    if env_path.exists():
+def check_env_file() -> None:
+    """Report whether a .env file exists (the config module loads it on import)."""
+    if Path('.env').exists():
         print("Loading environment variables from .env")
-        with open(env_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ.setdefault(key.strip(), value.strip())
     else:
         print(".env file not found! Please create one with your configuration.")
 
@@ -59,7 +56,7 @@ def verify_static_files() -> None:
 
 def main() -> None:
     """Main function to run the application."""
-    load_env_file()
+    check_env_file()
     verify_templates()
     verify_static_files()
     
@@ -81,6 +78,7 @@ def main() -> None:
         print(f"  - Force Mobile: http://{host}:{port}/force/mobile")
         print(f"  - Force Tablet: http://{host}:{port}/force/tablet")
         print(f"  - Device Info: http://{host}:{port}/device-info")
+        print("\nDevelopment server only; in production run: gunicorn (see gunicorn.conf.py)")
         print("="*60)
         
         app.run(debug=debug, host=host, port=port)
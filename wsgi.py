@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+    gunicorn                      # reads gunicorn.conf.py, serves wsgi:app
+
+run.py starts Flask's single-process development server and is meant for
+local use only.
+"""
+
+from llama_mindmap_backend import create_app
+
+app = create_app()